@@ -0,0 +1,97 @@
+""" Binary codec benchmark for soap.
+
+Compares the size of a payload as JSON and as ``soap.binary``, and the time it takes to
+get from the bytes to a validated value: ``json.loads`` and ``deserialize`` against
+``soap.binary.loads``, and the same for the way back.
+
+    python benchmarks/bench_binary.py --records 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from soap import (
+    SchemaModel,
+    SchemaNode,
+    Relationship,
+    Int,
+    String,
+    Boolean,
+    DateTime,
+    iso8601,
+)
+from soap import binary
+
+
+class ItemSchema(SchemaModel):
+    id = SchemaNode(Int())
+    sku = SchemaNode(String())
+    quantity = SchemaNode(Int())
+    gift = SchemaNode(Boolean())
+
+
+class OrderSchema(SchemaModel):
+    id = SchemaNode(Int())
+    customer = SchemaNode(String())
+    paid = SchemaNode(Boolean())
+    created = SchemaNode(DateTime())
+    total = SchemaNode(Int())
+    items = SchemaNode(Relationship('ItemSchema'), missing=[])
+
+
+def orders(count):
+    start = datetime(2024, 1, 1, tzinfo=iso8601.UTC)
+    return [{
+        'id': num,
+        'customer': 'customer-%s' % (num % 97),
+        'paid': num % 3 == 0,
+        'created': start + timedelta(seconds=num * 37),
+        'total': num * 125,
+        'items': [{'id': num * 10 + item, 'sku': 'SKU-%05d' % item, 'quantity': item + 1,
+                   'gift': item == 0} for item in range(4)],
+    } for num in range(count)]
+
+
+def timed(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return (time.perf_counter() - start) / len(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--records', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    schema = OrderSchema()
+    values = orders(args.records)
+
+    def to_json(value):
+        serialized = schema.serialize(value)
+        serialized['created'] = value['created'].strftime('%Y-%m-%dT%H:%M:%SZ')
+        return json.dumps(serialized).encode('utf-8')
+
+    json_data = [to_json(value) for value in values]
+    binary_data = [binary.dumps(schema, value) for value in values]
+    json_size = sum(map(len, json_data)) / float(len(values))
+    binary_size = sum(map(len, binary_data)) / float(len(values))
+
+    json_decode = timed(lambda data: schema.deserialize(json.loads(data.decode('utf-8'))), json_data)
+    binary_decode = timed(lambda data: binary.loads(schema, data), binary_data)
+    json_encode = timed(lambda value: json.dumps(schema.serialize(value)), values)
+    binary_encode = timed(lambda value: binary.dumps(schema, value), values)
+
+    print('%-28s %10s %10s' % ('per record', 'json', 'binary'))
+    print('%-28s %10.0f %10.0f' % ('bytes', json_size, binary_size))
+    print('%-28s %10.1f %10.1f' % ('decode and validate (us)', json_decode * 1e6, binary_decode * 1e6))
+    print('%-28s %10.1f %10.1f' % ('serialize and encode (us)', json_encode * 1e6, binary_encode * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+""" Import-time benchmark for soap, based on ``python -X importtime``.
+
+Runs ``import soap`` in fresh interpreters, reports the cumulative import time of
+the soap package and every module it pulled in, and exits non-zero if soap starts
+importing one of the heavy modules it used to import eagerly, or if the median
+import time goes over ``--max-us``.  Requires Python 3.7+ for ``-X importtime``.
+
+    python benchmarks/bench_import.py --runs 20 --max-us 2000
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that `import soap` must never pull in
+FORBIDDEN = ('colander', 'pprint', 're', 'time', 'datetime', 'soap.iso8601')
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run_once(env):
+    """ Returns a list of (module, self_us, cumulative_us, level) for one fresh
+        ``import soap``. """
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', 'import soap'],
+                            cwd=ROOT, env=env, stderr=subprocess.PIPE)
+    _, err = proc.communicate()
+    if proc.returncode:
+        raise SystemExit(err.decode('utf-8', 'replace'))
+
+    rows = []
+    for line in err.decode('utf-8', 'replace').splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def soap_subtree(rows):
+    """ -X importtime prints children before their parent, so the modules imported by
+        soap are the deeper rows directly preceding the top-level 'soap' row. """
+    for index, (module, _, _, level) in enumerate(rows):
+        if module == 'soap':
+            break
+    else:
+        raise SystemExit('soap was not imported')
+
+    subtree = [rows[index]]
+    for row in reversed(rows[:index]):
+        if row[3] <= level:
+            break
+        subtree.append(row)
+    return subtree
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-us', type=int, default=None,
+                        help='fail if the median cumulative import time exceeds this')
+    args = parser.parse_args(argv)
+
+    # Bytecode has to be cached, otherwise we are timing the compiler.
+    cache = tempfile.mkdtemp(prefix='soap-importtime-')
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    try:
+        run_once(env)
+        timings = []
+        imported = set()
+        for _ in range(args.runs):
+            subtree = soap_subtree(run_once(env))
+            timings.append(subtree[0][2])
+            imported.update(row[0] for row in subtree)
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print('import soap: min %dus, median %dus, max %dus over %d runs'
+          % (timings[0], median, timings[-1], args.runs))
+    print('modules imported: %s' % ', '.join(sorted(imported)))
+
+    failures = []
+    heavy = sorted(imported.intersection(FORBIDDEN))
+    if heavy:
+        failures.append('import soap pulls in %s' % ', '.join(heavy))
+    if args.max_us is not None and median > args.max_us:
+        failures.append('median import time %dus exceeds %dus' % (median, args.max_us))
+    for failure in failures:
+        print('REGRESSION: %s' % failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
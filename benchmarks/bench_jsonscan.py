@@ -0,0 +1,97 @@
+""" JSON decoding benchmark for soap.
+
+Compares ``json.loads`` and ``deserialize`` against ``soap.jsonscan.loads``, for orders
+as a client would send them, with members the schema doesn't have, and for the same
+orders with a field that isn't valid.
+
+    python benchmarks/bench_jsonscan.py --records 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from soap import (
+    SchemaModel,
+    SchemaNode,
+    Relationship,
+    Sequence,
+    Int,
+    String,
+    Boolean,
+    DateTime,
+    Range,
+    Invalid,
+)
+from soap import jsonscan
+
+
+class ItemSchema(SchemaModel):
+    id = SchemaNode(Int())
+    sku = SchemaNode(String())
+    quantity = SchemaNode(Int(), validator=Range(1, 100))
+    gift = SchemaNode(Boolean())
+
+
+class OrderSchema(SchemaModel):
+    id = SchemaNode(Int())
+    customer = SchemaNode(String())
+    paid = SchemaNode(Boolean())
+    created = SchemaNode(DateTime())
+    total = SchemaNode(Int())
+    tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+    items = SchemaNode(Relationship('ItemSchema'), missing=[])
+
+
+def orders(count):
+    return [{
+        'id': num,
+        'customer': 'customer-%s' % (num % 97),
+        'paid': num % 3 == 0,
+        'created': '2024-01-01T00:%02d:%02dZ' % (num // 60 % 60, num % 60),
+        'total': num * 125,
+        'tags': ['web', 'priority'] if num % 5 == 0 else ['web'],
+        'items': [{'id': num * 10 + item, 'sku': 'SKU-%05d' % item, 'quantity': item + 1,
+                   'gift': item == 0, 'thumbnail': 'https://cdn.example.com/%s.png' % item}
+                  for item in range(4)],
+        # what the client sends along, that the schema doesn't have
+        'client': {'version': '4.2.1', 'locale': 'en-US', 'screen': [1920, 1080]},
+        'del_key': None,
+    } for num in range(count)]
+
+
+def timed(function, values):
+    start = time.perf_counter()
+    for value in values:
+        try:
+            function(value)
+        except Invalid:
+            pass
+    return (time.perf_counter() - start) / len(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--records', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    schema = OrderSchema()
+    values = orders(args.records)
+    valid = [json.dumps(value) for value in values]
+    invalid = [json.dumps(dict(value, total='%s.5' % value['total'])) for value in values]
+    for text in valid[:10]:
+        assert jsonscan.loads(schema, text) == schema.deserialize(json.loads(text))
+
+    print('%-20s %14s %14s %8s' % ('per record (us)', 'json+deserialize', 'jsonscan', 'speedup'))
+    for name, data in (('valid', valid), ('invalid', invalid)):
+        baseline = timed(lambda text: schema.deserialize(json.loads(text)), data)
+        scanned = timed(lambda text: jsonscan.loads(schema, text), data)
+        print('%-20s %14.1f %14.1f %7.2fx' % (name, baseline * 1e6, scanned * 1e6,
+                                              baseline / scanned))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+""" Regex validation benchmark for soap.
+
+Times ``soap.Regex`` with Python's backtracking ``re`` against ``linear=True`` (see
+``soap.automata``), on typical field patterns with valid and invalid values, and on
+pathological patterns that backtrack exponentially or quadratically in ``re``.  The
+pathological inputs for ``re`` are kept short enough to finish; the linear matcher gets
+inputs a thousand times longer.
+
+    python benchmarks/bench_regex.py --repeat 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from soap import Invalid, Regex
+
+TYPICAL = [
+    ('email', r'(?i)^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}$',
+     ['bob.smith@example.com', 'not an email']),
+    ('slug', r'^[a-z0-9]+(?:-[a-z0-9]+)*$', ['some-article-title-2024', 'Not A Slug']),
+    ('phone', r'^\+?\d{1,3}[- ]?\(?\d{3}\)?[- ]?\d{3}[- ]?\d{4}$', ['+1 (555) 123-4567', '555-12']),
+    ('uuid', r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+     ['123e4567-e89b-12d3-a456-426614174000', '123e4567-e89b']),
+]
+
+# name, pattern, input for re, input for the linear matcher
+PATHOLOGICAL = [
+    ('nested', r'^(a+)+$', 'a' * 22 + '!', 'a' * 22000 + '!'),
+    ('alternation', r'^(a|aa)+$', 'a' * 30 + '!', 'a' * 30000 + '!'),
+    ('quadratic', r'^[a-z]+[a-z]*\d$', 'a' * 3000 + '!', 'a' * 3000000 + '!'),
+]
+
+
+def per_call(validator, values, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            try:
+                validator(value, None, None, None)
+            except Invalid:
+                pass
+    return (time.perf_counter() - start) / (repeat * len(values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print('%-12s %12s %12s' % ('typical', 're us', 'linear us'))
+    for name, pattern, values in TYPICAL:
+        backtracking = per_call(Regex(pattern), values, args.repeat)
+        linear = per_call(Regex(pattern, linear=True, max_steps=None), values, args.repeat)
+        print('%-12s %12.2f %12.2f' % (name, backtracking * 1e6, linear * 1e6))
+
+    print('')
+    print('%-12s %10s %12s %10s %12s' % ('pathological', 're chars', 're ms', 'linear chars', 'linear ms'))
+    for name, pattern, short, long in PATHOLOGICAL:
+        backtracking = per_call(Regex(pattern), [short], 1)
+        linear = per_call(Regex(pattern, linear=True, max_steps=None), [long], 1)
+        print('%-12s %10d %12.1f %10d %12.1f' % (name, len(short), backtracking * 1e3,
+                                                  len(long), linear * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+""" Thread scaling benchmark for soap.
+
+Deserializes and serializes the same relationship-heavy payload from a
+``concurrent.futures.ThreadPoolExecutor`` with an increasing number of workers,
+and reports the throughput and speedup over a single worker.  On a regular
+CPython build the GIL keeps the speedup around 1x; on a free-threaded build
+(python3.13t and later) soap should scale with the number of cores, since
+deserialize/serialize share no mutable state and registry lookups take no lock.
+
+    python benchmarks/bench_threads.py --workers 1 2 4 8 --records 20000
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from soap import (
+    SchemaModel,
+    SchemaNode,
+    Relationship,
+    Int,
+    String,
+    Boolean,
+    DateTime,
+)
+
+
+class ChildSchema(SchemaModel):
+    id = SchemaNode(Int())
+    name = SchemaNode(String())
+    parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+
+class TestSchema(SchemaModel):
+    id = SchemaNode(Int())
+    name = SchemaNode(String())
+    booly = SchemaNode(Boolean())
+    datey = SchemaNode(DateTime())
+    sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+    sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+
+JSON = {
+    'id': '0',
+    'name': 'blah',
+    'booly': 'true',
+    'datey': '2007-01-25T12:00:00Z',
+    'sub_node': {'id': 0, 'name': 'sub_blah'},
+    'sub_seq_nodes': [{
+        'id': str(num),
+        'name': 'sub_seq_blah_%s' % num,
+        'parent_node': {'id': 0, 'name': 'blah', 'booly': 'false', 'datey': '2007-01-25T12:00:00Z'}
+    } for num in range(5)]
+}
+
+
+def work(count):
+    schema = TestSchema()
+    for _ in range(count):
+        payload = schema.deserialize(JSON)
+        schema.serialize(payload)
+    return count
+
+
+def run(workers, records):
+    per_task = 100
+    tasks = [per_task] * (records // per_task)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        done = sum(executor.map(work, tasks))
+        elapsed = time.perf_counter() - start
+    return done / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('%s, GIL %s, %s cpus' % (sys.version.split()[0], 'enabled' if gil else 'disabled',
+                                    os.cpu_count()))
+
+    work(100)
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args.records)
+        baseline = baseline or rate
+        print('%3d workers: %10.0f records/s  %5.2fx' % (workers, rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
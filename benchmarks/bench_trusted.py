@@ -0,0 +1,92 @@
+""" Trusted deserialization benchmark for soap.
+
+Compares the throughput of ``deserialize`` with every check, with ``trusted=True``, and
+with ``trusted=True`` verifying one call in ``--verify``, on orders whose fields have
+the kind of validators a real schema has.
+
+    python benchmarks/bench_trusted.py --records 2000 --verify 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from soap import (
+    SchemaModel,
+    SchemaNode,
+    Relationship,
+    Int,
+    String,
+    Boolean,
+    Length,
+    Range,
+    Regex,
+    Email,
+)
+
+
+class ItemSchema(SchemaModel):
+    id = SchemaNode(Int(), validator=Range(_min=1))
+    sku = SchemaNode(String(), validator=[Length(_max=16), Regex(r'^SKU-\d+$')])
+    quantity = SchemaNode(Int(), validator=Range(1, 100))
+    gift = SchemaNode(Boolean())
+
+
+class OrderSchema(SchemaModel):
+    id = SchemaNode(Int(), validator=Range(_min=1))
+    customer = SchemaNode(String(), validator=Length(1, 64))
+    email = SchemaNode(String(), validator=Email())
+    paid = SchemaNode(Boolean())
+    total = SchemaNode(Int(), validator=Range(_min=0))
+    items = SchemaNode(Relationship('ItemSchema'), missing=[])
+
+
+def orders(count):
+    return [{
+        'id': num + 1,
+        'customer': 'customer-%s' % (num % 97),
+        'email': 'customer-%s@example.com' % (num % 97),
+        'paid': num % 3 == 0,
+        'total': num * 125,
+        'items': [{'id': num * 10 + item + 1, 'sku': 'SKU-%05d' % item, 'quantity': item + 1,
+                   'gift': item == 0} for item in range(4)],
+    } for num in range(count)]
+
+
+def throughput(function, values, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            function(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(values) / best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--verify', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    schema = OrderSchema()
+    values = orders(args.records)
+
+    results = [
+        ('validated', throughput(schema.deserialize, values)),
+        ('trusted', throughput(lambda value: schema.deserialize(value, trusted=True), values)),
+        ('trusted, verify 1 in %s' % args.verify,
+         throughput(lambda value: schema.deserialize(value, trusted=True, verify=args.verify),
+                    values)),
+    ]
+    base = results[0][1]
+    print('%-28s %14s %8s' % ('mode', 'records/s', 'speedup'))
+    for name, rate in results:
+        print('%-28s %14.0f %7.2fx' % (name, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
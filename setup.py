@@ -7,13 +7,11 @@ README = open(os.path.join(here, 'README.md')).read()
 CHANGES = open(os.path.join(here, 'CHANGES.md')).read()
 
 requires = [
-    'colander',
     'sphinx'
 ]
 
 tests_require = requires + [
     'nose',
-    'colander',
     'mock'
 ]
 
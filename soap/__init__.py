@@ -1,10 +1,19 @@
-import re
-import time
-import datetime
-import pprint
-from colander import iso8601
+__version__ = '0.0.1'
+
+try:
+    from thread import allocate_lock, _local
+except ImportError:
+    from _thread import allocate_lock, _local
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
 
 falsey = ['', {}, []]
+# the types of the falsey values, checked first so that values like numpy arrays never
+# get compared to them
+falsey_types = (string_types, dict, list)
 
 
 class Invalid(Exception):
@@ -21,6 +30,9 @@ class Invalid(Exception):
     mapping of exceptions that is identical to the value being parsed.
     """
     pos = None
+    # where the invalid value starts in the text it was decoded from, see soap.jsonscan
+    offset = None
+    max_str_depth = 100
 
     def __init__(self, msg, node):
         self.msg = msg
@@ -28,8 +40,20 @@ class Invalid(Exception):
         self.children = []
 
     def __str__(self):
-        """  Return a formatted representation of the exception """
-        return pprint.pformat(self.asdict())
+        """  Return a formatted representation of the exception.  Errors nested deeper than
+            ``max_str_depth`` are elided, as ``pprint`` recurses through them. """
+        import pprint
+        errors = self.asdict()
+        stack = [(errors, 1)]
+        while stack:
+            returned, depth = stack.pop()
+            for key, value in returned.items() if type(returned) is dict else ():
+                if type(value) is dict:
+                    if depth >= self.max_str_depth:
+                        returned[key] = '...'
+                    else:
+                        stack.append((value, depth + 1))
+        return pprint.pformat(errors)
 
     __repr__ = __str__
 
@@ -54,17 +78,25 @@ class Invalid(Exception):
         """ Returns a representation of the exception in dict() form.  This is commonly
             used in the view of the application during error reporting.  The structure
             of this dict, strictly mimics that of the value that is being deserialized. """
-        if self.children:
-            returned = {}
-            for child in self.children:
-                key = child._keyname()
-                returned[key] = child.asdict()
-            return returned
-
-        # so we always return a list
-        if type(self.msg) is list:
-            return self.msg
-        return [self.msg]
+        if not self.children:
+            # so we always return a list
+            if type(self.msg) is list:
+                return self.msg
+            return [self.msg]
+
+        # with a stack rather than recursion, as the iterative engine raises errors for
+        # values nested arbitrarily deep
+        result = {}
+        stack = [(self, result)]
+        while stack:
+            exc, returned = stack.pop()
+            for child in exc.children:
+                if child.children:
+                    returned[child._keyname()] = nested = {}
+                    stack.append((child, nested))
+                else:
+                    returned[child._keyname()] = child.asdict()
+        return result
 
 
 #
@@ -76,6 +108,8 @@ class null(object):
     def __nonzero__(self):
         return False
 
+    __bool__ = __nonzero__
+
     def __repr__(self):
         return '<soap.null>'
 
@@ -87,6 +121,10 @@ class Int(object):
         of type :class:`soap.Int`. """
 
     def deserialize(self, value, mapping, node, model):
+        budget = getattr(model, '_budget', None)
+        if budget is not None and budget.max_digits is not None:
+            budget.check_digits(value, node)
+
         try:
             return int(value)
         except Exception:
@@ -105,6 +143,10 @@ class String(object):
         of type :class:`soap.String` """
 
     def deserialize(self, value, mapping, node, model):
+        budget = getattr(model, '_budget', None)
+        if budget is not None and budget.max_length is not None:
+            budget.check_length(value, node)
+
         try:
             return str(value)
         except Exception:
@@ -118,19 +160,25 @@ class String(object):
 
 class DateTime(object):
     """ Represents a DateTime datatype in a schema.  This is an identical implementation
-        to colander's DateTime object.  iso8601 is actually a module in colander itself.
-        Like all other datatypes, an instance of this class can be passed into a
-        :class:`soap.SchemaNode` to create a SchemaNode of type :class:`soap.DateTime` """
+        to colander's DateTime object, parsing dates with :mod:`soap.iso8601`, which is
+        only imported once a DateTime is created.  Like all other datatypes, an instance of
+        this class can be passed into a :class:`soap.SchemaNode` to create a SchemaNode of
+        type :class:`soap.DateTime` """
 
     def __init__(self, default_tzinfo=None):
+        from soap import iso8601
+
         if default_tzinfo is None:
             default_tzinfo = iso8601.Utc()
         self.default_tzinfo = default_tzinfo
 
     def deserialize(self, value, mapping, node, model):
+        from soap import iso8601
+
         try:
             result = iso8601.parse_date(value, default_timezone=self.default_tzinfo)
         except (iso8601.ParseError, TypeError):
+            import datetime
             try:
                 year, month, day = map(int, value.split('-', 2))
                 result = datetime.datetime(year, month, day,
@@ -141,6 +189,7 @@ class DateTime(object):
 
     def serialize(self, value, depth, mapping, node, model):
         if value is not None:
+            import time
             dt_str = time.mktime(value.timetuple())
             return dt_str
         return None
@@ -170,6 +219,108 @@ class Boolean(object):
         return False
 
 
+class Choice(object):
+    """ Represents a categorical datatype, whose value has to be one of ``choices``.  The choices
+        can be a list of values, a dict from the values that are accepted to the ones they
+        deserialize into, or a Python enum, whose members are accepted by value or by name.
+        ``aliases`` is a dict of other values that are accepted for one of the choices.
+
+        Strings are matched regardless of case unless ``case_sensitive`` is set.  All of this is
+        worked out once, into a lookup table for deserializing and a reverse one for serializing,
+        so neither does more than one dict lookup.  Like all other datatypes, an instance of this
+        class can be passed into a :class:`soap.SchemaNode` to create a SchemaNode of type
+        :class:`soap.Choice` """
+
+    # how many of the choices the message of an Invalid lists
+    max_shown = 10
+
+    def __init__(self, choices, aliases=None, case_sensitive=False, msg=None):
+        self.case_sensitive = case_sensitive
+
+        names = []
+        if hasattr(choices, '__members__'):
+            pairs = [(member.value, member) for member in choices]
+            names = list(choices.__members__.items())
+        elif isinstance(choices, dict):
+            pairs = list(choices.items())
+        else:
+            pairs = [(choice, choice) for choice in choices]
+
+        self.table = {}
+        self.reverse = {}
+        for external, internal in pairs:
+            self.table[self.fold(external)] = internal
+            self.reverse.setdefault(internal, external)
+        for name, member in names:
+            self.table.setdefault(self.fold(name), member)
+        for alias, external in (aliases or {}).items():
+            try:
+                self.table[self.fold(alias)] = self.table[self.fold(external)]
+            except KeyError:
+                raise ValueError('The alias %r is for %r, which is not one of the choices' %
+                                 (alias, external))
+
+        allowed = [str(external) for external, _ in pairs]
+        shown = ', '.join(allowed[:self.max_shown])
+        if len(allowed) > self.max_shown:
+            shown += ', ... (%s more)' % (len(allowed) - self.max_shown)
+        self.msg = msg if msg else 'SchemaNode is not one of: %s' % shown
+
+    def fold(self, value):
+        if self.case_sensitive or not isinstance(value, string_types):
+            return value
+        return value.lower()
+
+    def deserialize(self, value, mapping, node, model):
+        if not self.case_sensitive and isinstance(value, string_types):
+            value = value.lower()
+        try:
+            return self.table[value]
+        except (KeyError, TypeError):
+            raise Invalid(self.msg, node)
+
+    def deserialize_many(self, values, node, model):
+        """ Deserializes a whole column of values for the Sequence ``node``, reporting the
+            invalid ones by index.  Only used when its child has no preparer or validator. """
+
+        child = node.children[0]
+        table = self.table
+        folded = values
+        if not self.case_sensitive:
+            folded = [value.lower() if isinstance(value, string_types) else value
+                      for value in values]
+        try:
+            deserialized = [table[value] for value in folded]
+            if (not child.required or model.trusted or
+                    not any(isinstance(value, falsey_types) and value in falsey
+                            for value in deserialized)):
+                return deserialized
+        except (KeyError, TypeError):
+            pass
+
+        # one value at a time, to find out which are invalid
+        exc = None
+        deserialized = []
+        for num, value in enumerate(values):
+            try:
+                deserialized.append(child.deserialize(value, mapping=value, model=model))
+            except Invalid as e:
+                if exc is None:
+                    exc = Invalid('Sequence Errors', node)
+                exc.add(e, num)
+        if exc is not None:
+            raise exc
+        return deserialized
+
+    def serialize(self, value, depth, mapping, node, model):
+        if value is None:
+            return None
+        try:
+            return self.reverse[value]
+        except (KeyError, TypeError):
+            raise ValueError('%r is not one of the choices of %s' % (value, node.name))
+
+
 class Mapping(object):
     """ Represents a Mapping datatype, or a set of key/value pairs in other words.  This datatype
         is commonly known as dict() in Python or as an object in Javascript.  This datatype
@@ -235,12 +386,35 @@ class Sequence(object):
         deserialization, are packaged into a parent exception.  This allows us to represent
         exceptions in an identical structure as the value being deserialized.  We also retain
         the index count in the sequence, so exceptions are logged specific to an index in the
-        sequence. """
+        sequence.
+
+        A Sequence of :class:`soap.Int`, :class:`soap.Boolean` or :class:`soap.DateTime` can
+        be deserialized into a typed array instead of a list, by passing ``output='array'``
+        for an ``array.array``, or ``output='numpy'`` for a numpy array.  See
+        :mod:`soap.arrays` for the details. """
+
+    def __init__(self, output=None):
+        if output not in (None, 'array', 'numpy'):
+            raise ValueError('output must be None, \'array\' or \'numpy\', not %r' % (output,))
+        self.output = output
 
     def deserialize(self, value, mapping, node, model):
         validated = self.validate(value, mapping, node, model)
         child = node.children[0]
 
+        budget = getattr(model, '_budget', None)
+        if budget is not None and budget.max_items is not None:
+            budget.check_items(validated, node)
+
+        if self.output is not None:
+            from soap import arrays
+            return arrays.deserialize(self, validated, node, model)
+
+        many = getattr(child._type, 'deserialize_many', None)
+        if (many is not None and budget is None and not child.preparer and
+                (not child.validator or model.trusted)):
+            return many(validated, node, model)
+
         exc = None
         deserialized = []
         for num, value in enumerate(validated):
@@ -259,6 +433,10 @@ class Sequence(object):
     def serialize(self, value, depth, mapping, node, model):
         child = node.children[0]
 
+        if self.output is not None:
+            from soap import arrays
+            value = arrays.unpack(self, value, node)
+
         serialized = []
         for item in value:
             serialized.append(child.serialize(item, depth, mapping=item, model=model))
@@ -283,51 +461,139 @@ class Relationship(object):
          ... code-block:: python
 
              test_schema = SchemaNode(Relationship('TestSchema'))
+
+         Passing a ``limit`` serializes a list relationship a window at a time, into a page
+         with the ``total`` count of the collection if asked for.  See :mod:`soap.paging`.
     """
     name = ''
+    limit = None
+    total = False
 
-    def __init__(self, name, uselist=True):
+    def __init__(self, name, uselist=True, limit=None, total=False):
         self.name = name
         self.uselist = uselist
+        self.limit = limit
+        self.total = total
 
     def deserialize(self, value, mapping, node, model):
-        inst = model._models[self.name]
-        inst = inst if isinstance(inst, SchemaModel) else inst(name=node.name,
-                                                               missing=node.missing)
+        schema_model = self.resolve(node, model)
 
-        if self.uselist:
-            schema_model = SchemaNode(Sequence(),
-                                      inst,
-                                      name=node.name,
-                                      missing=node.missing)
-        else:
-            schema_model = inst
+        budget = getattr(model, '_budget', None)
+        if budget is None:
+            return schema_model.deserialize(value, mapping=value, model=model)
 
-        return schema_model.deserialize(value, mapping=value, model=model)
+        budget.enter(node)
+        try:
+            return schema_model.deserialize(value, mapping=value, model=model)
+        finally:
+            budget.nesting -= 1
 
     def serialize(self, value, depth, mapping, node, model):
         if depth < model.max_depth:
             # WE MUST GO TO DEEPER DREAM STATE
             depth += 1
 
-            inst = model._models[self.name]
-            inst = inst if isinstance(inst, SchemaModel) else inst(name=node.name,
-                                                                   missing=node.missing)
-
-            if self.uselist:
-                schema_model = SchemaNode(Sequence(),
-                                          inst,
-                                          name=node.name,
-                                          missing=node.missing)
-            else:
-                schema_model = inst
-
+            schema_model = self.resolve(node, model)
+            batch = model._batch
+            if batch is not None and self.name in batch.loaders:
+                return batch.defer(self, schema_model, value, depth)
+            if self.uselist and (self.limit is not None or model.windows):
+                from soap import paging
+                options = paging.window(self, node, model)
+                if options is not None:
+                    return paging.serialize(schema_model, value, options, depth, model)
             return schema_model.serialize(value, depth, mapping=value, model=model)
         else:
             if self.uselist:
                 return []
             return {}
 
+    def resolve(self, node, model):
+        """ Looks up the :class:`soap.SchemaModel` this relationship points to in the
+            ``model``'s registry, and returns the node that ``node``'s value should be
+            processed with, which is a :class:`soap.Sequence` of them if ``uselist`` is set. """
+
+        inst = model._models[self.name]
+        inst = inst if isinstance(inst, SchemaModel) else inst(name=node.name,
+                                                               missing=node.missing)
+
+        if self.uselist:
+            return SchemaNode(Sequence(),
+                              inst,
+                              name=node.name,
+                              missing=node.missing)
+        return inst
+
+
+class Polymorphic(object):
+    """ A datatype that represents one of several :class:`soap.SchemaModel`s, chosen by the
+        value of a discriminator field.  ``choices`` maps the values of the discriminator to
+        the names of the SchemaModels, like :class:`soap.Relationship` would name them, or to
+        the SchemaModels themselves:
+
+        .. code-block:: python
+
+            event = SchemaNode(Polymorphic('kind', {
+                'click': 'ClickEvent',
+                'scroll': 'ScrollEvent',
+            }))
+
+        The SchemaModel is looked up in ``choices`` directly, instead of trying each one in
+        turn, both when deserializing and serializing, and the errors are only those of the
+        chosen SchemaModel.  The discriminator itself is only deserialized if the
+        SchemaModels have a field for it.
+    """
+
+    def __init__(self, discriminator, choices):
+        self.discriminator = discriminator
+        self.choices = dict(choices)
+
+    def deserialize(self, value, mapping, node, model):
+        schema_model = self.select(value, node, model)
+
+        budget = getattr(model, '_budget', None)
+        if budget is None:
+            return schema_model.deserialize(value, mapping=value, model=model)
+
+        budget.enter(node)
+        try:
+            return schema_model.deserialize(value, mapping=value, model=model)
+        finally:
+            budget.nesting -= 1
+
+    def serialize(self, value, depth, mapping, node, model):
+        if value is None:
+            return {}
+
+        try:
+            schema_model = self.select(value, node, model)
+        except Invalid as e:
+            raise ValueError(e.msg)
+        return schema_model.serialize(value, depth, mapping=value, model=model)
+
+    def select(self, value, node, model):
+        """ Returns the :class:`soap.SchemaModel` for ``value``, which ``node``'s value
+            should be processed with. """
+
+        try:
+            key = value.get(self.discriminator)
+        except AttributeError:
+            raise Invalid('SchemaNode is not a mapping type.', node)
+        if key is None:
+            raise Invalid('The field named \'%s\' is missing.' % self.discriminator, node)
+
+        try:
+            inst = self.choices[key]
+        except (KeyError, TypeError):
+            raise Invalid('\'%s\' is not one of %s.' % (
+                key, ', '.join(sorted(str(choice) for choice in self.choices))), node)
+
+        if isinstance(inst, string_types):
+            inst = model._models[inst]
+        if isinstance(inst, SchemaModel):
+            return inst
+        return inst(name=node.name, missing=node.missing)
+
 
 #
 # Validators
@@ -349,8 +615,16 @@ class Length(object):
 
 
 class Regex(object):
-    def __init__(self, regex, msg=None):
-        if isinstance(regex, basestring):
+    """ Validates that a string matches ``regex`` at its start.
+
+        With ``linear=True`` the pattern is matched in time linear in the length of the
+        string, see :mod:`soap.automata`, and strings that take more than ``max_steps`` to
+        match are invalid.  Patterns the linear matcher doesn't support raise a ValueError,
+        unless ``fallback`` is set, in which case they are matched with ``re``. """
+
+    def __init__(self, regex, msg=None, linear=False, fallback=False, max_steps=1000000):
+        if isinstance(regex, string_types):
+            import re
             self.match_object = re.compile(regex)
         else:
             self.match_object = regex
@@ -359,15 +633,40 @@ class Regex(object):
         else:
             self.msg = msg
 
+        self.automaton = None
+        self.max_steps = max_steps
+        if linear:
+            from soap import automata
+            try:
+                self.automaton = automata.compile(self.match_object)
+            except automata.Unsupported:
+                if not fallback:
+                    raise
+
+    def configuration(self):
+        """ Returns what the validator was configured with, for :mod:`soap.fingerprints`,
+            leaving out the states the linear matcher builds as strings are matched. """
+        return {'regex': self.match_object, 'msg': self.msg, 'max_steps': self.max_steps,
+                'linear': self.automaton is not None}
+
     def __call__(self, value, mapping, node, model):
-        if self.match_object.match(value) is None:
+        if self.automaton is None:
+            if self.match_object.match(value) is None:
+                raise Invalid(self.msg, node)
+            return
+
+        matched = self.automaton.match(value, self.max_steps)
+        if matched is None:
+            raise Invalid('String is too long to match the expected pattern', node)
+        if not matched:
             raise Invalid(self.msg, node)
 
 
 class Email(Regex):
-    def __init__(self):
+    def __init__(self, linear=False, max_steps=1000000):
         msg = 'Invalid email address'
-        super(Email, self).__init__('(?i)^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}$', msg=msg)
+        super(Email, self).__init__(r'(?i)^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}$', msg=msg,
+                                    linear=linear, max_steps=max_steps)
 
 
 class Range(object):
@@ -385,10 +684,191 @@ class Range(object):
                 raise Invalid('Greater than maximum value of %s' % self.max, node)
 
 
+def _frozen(value):
+    """ Returns a hashable stand-in for ``value``, turning dicts and lists into tuples. """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _frozen(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class Unique(object):
+    """ Validates that no two elements of a sequence are equal, or have an equal ``key(element)``,
+        in one pass over it.  Every later duplicate is reported at its index, like the errors
+        of a :class:`soap.Sequence`. """
+
+    def __init__(self, key=None, msg='Duplicate of the element at index %s'):
+        self.key = key
+        self.msg = msg
+
+    def __call__(self, value, mapping, node, model):
+        key = self.key
+        seen = {}
+        exc = None
+        for num, element in enumerate(value):
+            found = key(element) if key is not None else element
+            if found is None:
+                continue
+            try:
+                hash(found)
+            except TypeError:
+                found = _frozen(found)
+            first = seen.setdefault(found, num)
+            if first != num:
+                if exc is None:
+                    exc = Invalid('Sequence Errors', node)
+                exc.add(Invalid(self.msg % first, node), num)
+        if exc is not None:
+            raise exc
+
+
+class UniqueBy(Unique):
+    """ Validates that the elements of a :class:`soap.Relationship` list have different values
+        for the field ``name``, ``'id'`` by default.  Elements without one are skipped. """
+
+    def __init__(self, name='id', msg=None):
+        msg = msg if msg else 'Duplicate %s of the element at index %%s' % name
+        super(UniqueBy, self).__init__(lambda element: element.get(name), msg)
+
+
+class SubsetOf(object):
+    """ Validates that every element of a sequence, or its ``key(element)``, is one of
+        ``choices``.  Every other element is reported at its index. """
+
+    def __init__(self, choices, key=None, msg='Not one of the allowed values'):
+        self.choices = frozenset(choices)
+        self.key = key
+        self.msg = msg
+
+    def __call__(self, value, mapping, node, model):
+        choices, key = self.choices, self.key
+        exc = None
+        for num, element in enumerate(value):
+            found = key(element) if key is not None else element
+            try:
+                allowed = found in choices
+            except TypeError:
+                allowed = False
+            if not allowed:
+                if exc is None:
+                    exc = Invalid('Sequence Errors', node)
+                exc.add(Invalid(self.msg, node), num)
+        if exc is not None:
+            raise exc
+
+
+class ContainsAll(object):
+    """ Validates that each of ``required`` is an element of a sequence, or the ``key(element)``
+        of one of them. """
+
+    def __init__(self, required, key=None, msg='Missing required values: %s'):
+        self.required = frozenset(required)
+        self.key = key
+        self.msg = msg
+
+    def __call__(self, value, mapping, node, model):
+        key, required = self.key, self.required
+        found = set()
+        for element in value:
+            element = key(element) if key is not None else element
+            try:
+                if element in required:
+                    found.add(element)
+            except TypeError:
+                continue
+        missing = required - found
+        if missing:
+            raise Invalid(self.msg % ', '.join(sorted(str(v) for v in missing)), node)
+
+
 #
 # Core
 #
 
+class Budget(object):
+    """ Keeps track of the resources used by a single deserialize call, so that hostile
+        input can't keep a worker busy.  One is created for every call to ``deserialize``
+        on a schema that has any of the following limits set, either on the schema, or
+        as keyword arguments to ``deserialize`` itself:
+
+        max_nesting
+          The deepest that :class:`soap.Relationship`s may be nested in the value.
+        max_items
+          The longest a :class:`soap.Sequence` may be.
+        max_length
+          The longest a :class:`soap.String` may be.
+        max_digits
+          The longest string of digits that :class:`soap.Int` will convert.
+        max_nodes
+          The total number of nodes that may be deserialized.
+        timeout
+          The number of seconds the deserialization may take.
+
+        The first four raise a regular :class:`soap.Invalid` for the offending node.  Running
+        out of nodes or time aborts the deserialization straight away, with an
+        :class:`soap.Invalid` for the whole schema.
+    """
+
+    limits = ('max_nesting', 'max_items', 'max_length', 'max_digits', 'max_nodes', 'timeout')
+
+    def __init__(self, model):
+        for limit in self.limits:
+            setattr(self, limit, getattr(model, limit))
+
+        self.nesting = 0
+        self.nodes = 0
+        self.deadline = None
+        if self.timeout is not None:
+            import time
+            self.clock = time.time
+            self.deadline = self.clock() + self.timeout
+
+    @classmethod
+    def start(cls, model):
+        """ Returns a new Budget for the limits set on ``model``, or None if it has none. """
+        for limit in cls.limits:
+            if getattr(model, limit) is not None:
+                return cls(model)
+        return None
+
+    def visit(self, node):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded('Exceeded the maximum of %s nodes.' % self.max_nodes)
+        if self.deadline is not None and self.clock() > self.deadline:
+            raise BudgetExceeded('Exceeded the time limit of %s seconds.' % self.timeout)
+
+    def enter(self, node):
+        if self.max_nesting is not None and self.nesting >= self.max_nesting:
+            raise Invalid('Nested deeper than the maximum of %s.' % self.max_nesting, node)
+        self.nesting += 1
+
+    def check_items(self, value, node):
+        if len(value) > self.max_items:
+            raise Invalid('Longer than the maximum of %s items.' % self.max_items, node)
+
+    def check_length(self, value, node):
+        if isinstance(value, string_types) and len(value) > self.max_length:
+            raise Invalid('Longer than the maximum length of %s.' % self.max_length, node)
+
+    def check_digits(self, value, node):
+        if isinstance(value, string_types) and len(value.strip()) > self.max_digits:
+            raise Invalid('Longer than the maximum of %s digits.' % self.max_digits, node)
+
+
+class BudgetExceeded(Exception):
+    """ Raised when a :class:`soap.Budget` runs out of nodes or time.  This deliberately
+        isn't an :class:`soap.Invalid`, so that Mappings and Sequences don't carry on
+        with their other children.  The top level ``deserialize`` turns it into one. """
+
+    def __init__(self, msg):
+        super(BudgetExceeded, self).__init__(msg)
+        self.msg = msg
+
+
 class SchemaNode(object):
     """ The main object used to represent each element in a schema.  That element
         could be a Mapping, Sequence, String, Integer, it doesn't matter.  """
@@ -401,6 +881,43 @@ class SchemaNode(object):
     preparer = None
     max_depth = 2
 
+    # use soap.engine instead of recursing, which SchemaModels with relationships do
+    # unless told otherwise
+    iterative = False
+
+    # deserialize SchemaModels into records instead of dicts, see soap.records
+    records = False
+
+    # serialize into tables of entities, keyed by ``identity``, see soap.normalize
+    normalized = False
+    identity = 'id'
+
+    # reuse serialized SchemaModel values, keyed by ``identity`` and ``version``, see
+    # soap.caching
+    cache = None
+    version = None
+
+    # windows of list relationships by node name, see soap.paging
+    windows = None
+
+    # skip the required checks and validators, checking one call in ``verify``, see
+    # soap.trusted
+    trusted = False
+    verify = None
+
+    # batch loaders of Relationship values by model name, see soap.batching
+    loaders = None
+    _batch = None
+
+    # see soap.Budget
+    max_nesting = None
+    max_items = None
+    max_length = None
+    max_digits = None
+    max_nodes = None
+    timeout = None
+    _budget = None
+
     def __init__(self, *args, **kwargs):
         self.children = []
 
@@ -414,7 +931,7 @@ class SchemaNode(object):
     def required(self):
         return self.missing is null
 
-    def deserialize(self, value, mapping=None, node=None, model=None):
+    def deserialize(self, value, mapping=None, node=None, model=None, **options):
         """ Method for deserialization of a specific value of type ``_type``.  This method
             optionally excepts a ``mapping``, a ``node``, and a ``model``.
 
@@ -445,13 +962,62 @@ class SchemaNode(object):
 
                def validator(value, mapping, node, model):
                    db = model.db
+
+            Any other keyword arguments only apply to this call, and are set on the
+            ``model`` as if they were passed into its constructor.  This is how the limits
+            of a :class:`soap.Budget` can be given per call:
+
+            .. code-block: python
+
+               payload = schema.deserialize(json, max_nodes=10000, timeout=0.5)
+
+            Passing ``records=True`` returns :mod:`soap.records` instead of dicts for every
+            :class:`soap.SchemaModel` in the value.
+
+            If the ``model`` is ``iterative``, the whole call is handed over to
+            :func:`soap.engine.deserialize`, which gives the same results without recursing.
+
+            If the ``model`` is ``trusted``, values are only converted by their types and
+            preparers, and given their ``missing`` defaults, without the required checks and
+            validators.  With ``verify=N`` as well, one call in N is checked against a full
+            deserialization, see :mod:`soap.trusted`.
         """
 
+        if model is None:
+            model = self.bind(**options) if options else self
+            if model.trusted and model.verify:
+                from soap import trusted
+                return trusted.deserialize(self, value, mapping, node, model)
+            budget = Budget.start(model)
+            if budget is not None:
+                model = model.bind(_budget=budget)
+
+            try:
+                if model.iterative:
+                    from soap import engine
+                    return engine.deserialize(self, value, mapping, node, model)
+                elif budget is not None:
+                    return self.deserialize(value, mapping, node, model)
+            except BudgetExceeded as e:
+                raise Invalid(e.msg, node if node else self)
+
         node = node if node else self
-        model = model if model else self
         mapping = mapping if mapping else value
 
+        budget = getattr(model, '_budget', None)
+        if budget is not None:
+            budget.visit(node)
+
         deserialized = self._type.deserialize(value, mapping, node, model)
+        deserialized = self._finish(deserialized, mapping, node, model)
+        if model.records and type(deserialized) is dict and isinstance(self, SchemaModel):
+            return self.record_class().from_dict(deserialized)
+        return deserialized
+
+    def _finish(self, deserialized, mapping, node, model):
+        """ Runs the preparers, the required check and the validators on a value that has
+            been deserialized by ``_type``, and returns the result.  Only the preparers run
+            if the ``model`` is ``trusted``. """
 
         # Run all preparers
         if self.preparer and type(self.preparer) is list:
@@ -460,8 +1026,11 @@ class SchemaNode(object):
         elif self.preparer:
             deserialized = self.preparer(deserialized)
 
+        if model.trusted:
+            return deserialized
+
         # Make sure the supplied value isn't a falsey value
-        if deserialized in falsey and node.required:
+        if node.required and isinstance(deserialized, falsey_types) and deserialized in falsey:
             raise Invalid('%s is required.' % node.name, node)
 
         # Run all validators
@@ -487,7 +1056,16 @@ class SchemaNode(object):
 
         return deserialized
 
-    def serialize(self, value, depth=0, mapping=None, node=None, model=None):
+    def deserialize_lazy(self, value, **options):
+        """ Checks that ``value`` is a mapping with all of its required fields, and returns a
+            :class:`soap.lazy.LazyMapping` that deserializes each field when it is first read.
+            Keyword arguments apply to this call, like for ``deserialize``.  See :mod:`soap.lazy`. """
+
+        from soap import lazy
+        model = self.bind(**options) if options else self
+        return lazy.deserialize(self, value, model)
+
+    def serialize(self, value, depth=0, mapping=None, node=None, model=None, **options):
         """ Method for serialization of a value of type ``_type``.  This method is commonly
             used to take dict-like objects, like Sqlalchemy models, and turn them into python
             dicts.
@@ -497,15 +1075,65 @@ class SchemaNode(object):
             the ``depth`` is incremented from 0 to 1.  Thus, we are at depth 1 of the relationships.
 
             All of the method definitions for ``deserialize`` still hold true for this method
-            as well.
+            as well, including keyword arguments that only apply to this call.
+
+            Passing ``normalized=True`` serializes every :class:`soap.SchemaModel` in the value
+            once, into tables of entities, with Relationships as references to them.  See
+            :mod:`soap.normalize`.  Passing a ``cache`` reuses what unchanged values
+            serialized to before, see :mod:`soap.caching`.  Passing ``loaders`` fetches the
+            values of Relationships from their keys in one batch per level, see
+            :mod:`soap.batching`.
         """
+        if model is None:
+            model = self.bind(**options) if options else self
+            if model.normalized:
+                from soap import normalize
+                return normalize.serialize(self, value, model)
+            if model.loaders and model._batch is None:
+                from soap import batching
+                return batching.serialize(self, value, depth, mapping, node, model)
+            if model.iterative and model.cache is None:
+                from soap import engine
+                return engine.serialize(self, value, depth, mapping, node, model)
+
         node = node if node else self
-        model = model if model else self
         mapping = mapping if mapping else value
 
+        if model.cache is not None and value and isinstance(self, SchemaModel):
+            from soap import caching
+            return caching.serialize(self, value, depth, mapping, node, model)
+
         serialized = self._type.serialize(value, depth, mapping, node, model)
         return serialized
 
+    def serialize_delta(self, old, new, serialized=False, **options):
+        """ Returns the list of operations that turn what ``old`` serializes to into what
+            ``new`` does, only serializing the parts of them that may have changed.  With
+            ``serialized=True``, ``old`` is what ``serialize`` returned before.  Keyword
+            arguments apply to this call, like for ``serialize``.  See :mod:`soap.delta`. """
+
+        from soap import delta
+        model = self.bind(**options) if options else self
+        return delta.serialize_delta(self, old, new, model, serialized)
+
+    def explain(self, max_depth=None, shape=None, length=10, **options):
+        """ Returns a report of the nodes this schema visits, how many times each for a value
+            of ``shape``, with lists estimated at ``length`` elements unless it says otherwise,
+            and what may make that expensive.  ``max_depth`` defaults to the model's.  Keyword
+            arguments apply to this call, like for ``serialize``.  See :mod:`soap.explain`. """
+
+        from soap import explain
+        model = self.bind(**options) if options else self
+        max_depth = model.max_depth if max_depth is None else max_depth
+        return explain.Explanation(self, model, max_depth, shape, length)
+
+    def bind(self, **options):
+        """ Returns a shallow copy of this node with ``options`` set as attributes on it. """
+        bound = self.__class__.__new__(self.__class__)
+        bound.__dict__.update(self.__dict__)
+        bound.__dict__.update(options)
+        return bound
+
     def get(self, name, default=None):
         for child in self.children:
             if child.name == name:
@@ -516,14 +1144,110 @@ class SchemaNode(object):
         return '<soap.SchemaNode named \'%s\'>' % self.name
 
 
-class SchemaModelMeta(type):
-    _models = {}
+class Registry(object):
+    """ Holds the :class:`soap.SchemaModel`s that :class:`soap.Relationship`s are resolved
+        against, by name.  Every SchemaModel registers itself in one when it is defined,
+        which by default is ``SchemaModel._models``.
+
+        A registry is never changed in place.  Registering a model copies the current dict
+        under a lock and swaps the copy in, so lookups during deserialize/serialize never
+        take a lock and never see a half-registered model, and :meth:`snapshot` can hand out
+        the current models without copying anything else.
+
+        A registry can also be used as a context manager, to register the schemas defined
+        in the ``with`` block in that registry instead, which is handy for keeping schemas
+        isolated from each other, in tests for example:
+
+        .. code-block:: python
+
+            with SchemaModel._models.scope() as registry:
+                class TestSchema(SchemaModel):
+                    child_nodes = SchemaNode(Relationship('ChildSchema'))
+
+        The scope only applies to the thread that entered it.
+    """
+
+    _scopes = _local()
+
+    def __init__(self, models=None, parent=None, frozen=False):
+        self._models = dict(models or {})
+        self._lock = allocate_lock()
+        self.parent = parent
+        self.frozen = frozen
+
+    @classmethod
+    def current(cls, default=None):
+        """ Returns the registry of the innermost ``with`` block in this thread, or
+            ``default`` if there is none. """
+        stack = getattr(cls._scopes, 'stack', None)
+        if stack:
+            return stack[-1]
+        return default
+
+    def register(self, name, model):
+        if self.frozen:
+            raise TypeError('Cannot register \'%s\' in a frozen registry.' % name)
+
+        with self._lock:
+            models = dict(self._models)
+            models[name] = model
+            self._models = models
+
+    def snapshot(self):
+        """ Returns a frozen copy of this registry, including anything it inherits from its
+            parents.  Models registered afterwards won't show up in the snapshot. """
+        models = {}
+        registry = self
+        while registry is not None:
+            for name, model in registry._models.items():
+                models.setdefault(name, model)
+            registry = registry.parent
+        return Registry(models, frozen=True)
+
+    def scope(self):
+        """ Returns a new registry that falls back to this one for names it doesn't have. """
+        return Registry(parent=self)
+
+    def __getitem__(self, name):
+        try:
+            return self._models[name]
+        except KeyError:
+            if self.parent is None:
+                raise
+            return self.parent[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        return iter(self.snapshot()._models)
+
+    def __len__(self):
+        return len(self.snapshot()._models)
 
+    def __enter__(self):
+        stack = self._scopes.__dict__.setdefault('stack', [])
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._scopes.stack.pop()
+
+    def __repr__(self):
+        return '<soap.Registry of %s>' % sorted(self)
+
+
+class SchemaModelMeta(type):
     def __init__(cls, name, bases, clsattrs):
         if any(isinstance(parent, SchemaModelMeta) for parent in bases):
             cls.children = []
             cls.name = name
-            cls._models[name] = cls
             cls._type = Mapping()
 
             # get SchemaNodes from class
@@ -541,27 +1265,80 @@ class SchemaModelMeta(type):
                         value.name = key if not value.name else value.name
                         cls.children.append(value)
 
+            if 'iterative' not in clsattrs:
+                cls.iterative = has_relationships(cls)
 
-class SchemaModel(SchemaNode):
+            # only register the class once it's complete, other threads may be looking
+            if '_models' not in clsattrs:
+                cls._models = Registry.current(cls._models)
+            cls._models.register(name, cls)
+
+
+def has_relationships(node):
+    """ Returns True if there's a :class:`soap.Relationship` or a :class:`soap.Polymorphic`
+        anywhere below ``node``, which means that the values it processes can be nested
+        arbitrarily deep. """
+
+    for child in node.children:
+        if isinstance(child._type, (Relationship, Polymorphic)) or has_relationships(child):
+            return True
+    return False
+
+
+def with_metaclass(meta, *bases):
+    """ Creates a base class with a metaclass, in a way that works on both Python 2 and 3. """
+    class metaclass(meta):
+        def __new__(cls, name, this_bases, clsattrs):
+            return meta(name, bases, clsattrs)
+    return type.__new__(metaclass, 'temporary_class', (), {})
+
+
+class SchemaModel(with_metaclass(SchemaModelMeta, SchemaNode)):
     """ A superclass of :class:`SchemaNode` that is used to represent the top
         node in a schema.  This abstraction is necessary, so we know which SchemaNodes
         to store as 'models,' and which to simply treat as regular model 'fields' """
 
-    __metaclass__ = SchemaModelMeta
-    _models = {}
+    _models = Registry()
 
     def __init__(self, *args, **kwargs):
         if args:
             self.children = []
 
             self.name = name = args[0]
-            self._models[name] = self
-
             self._type = args[1]
             self.children = list(args[2:])
 
         self.__dict__.update(kwargs)
 
+        if args:
+            if 'iterative' not in kwargs:
+                self.iterative = has_relationships(self)
+            if '_models' not in kwargs:
+                self._models = Registry.current(self._models)
+            self._models.register(name, self)
+
+    def record_class(self):
+        """ Returns the :class:`soap.records.Record` class that this model deserializes
+            into when ``records`` is set.  It's created the first time it's asked for. """
+
+        cls = self.__class__
+        if cls is SchemaModel:
+            # an imperative SchemaModel, which is its own model
+            owner, name = self.__dict__, self.name
+        else:
+            owner, name = cls.__dict__, cls.__name__
+
+        record = owner.get('_record_class')
+        if record is None:
+            from soap import records
+            record = records.record_class(name, [child.name for child in self.children])
+            # racing threads just create equivalent classes
+            if owner is self.__dict__:
+                self._record_class = record
+            else:
+                cls._record_class = record
+        return record
+
     def validate(self, value):
         return self.deserialize(value)
 
@@ -0,0 +1,177 @@
+""" Typed array output for :class:`soap.Sequence`.
+
+A Sequence created with ``Sequence(output='array')`` or ``Sequence(output='numpy')``
+deserializes into an ``array.array`` or a numpy array instead of a list.  This is only
+supported for Sequences of :class:`soap.Int`, :class:`soap.Boolean` and
+:class:`soap.DateTime`, which are stored as follows:
+
+=========  ==================  ======================
+Type       array.array         numpy
+=========  ==================  ======================
+Int        'q' (64 bit ints)   int64
+Boolean    'b' (0 or 1)        bool
+DateTime   'd' (UTC seconds)   datetime64[us] (UTC)
+=========  ==================  ======================
+
+When the child :class:`soap.SchemaNode` has no preparer or validator, and no
+:class:`soap.Budget` is being kept, the whole Sequence is converted in one pass and
+packed straight into the array.  Otherwise, or if that pass fails, every element is
+deserialized on its own, so the :class:`soap.Invalid` tree is the same as for a list,
+with the errors reported by index.  numpy is only imported once a numpy Sequence is
+deserialized.
+"""
+import array
+
+from soap import (
+    Int,
+    Boolean,
+    DateTime,
+    Invalid,
+)
+
+try:
+    array.array('q')
+    INT_TYPECODE = 'q'
+except ValueError:
+    # Python 2 has no 'q', 'l' is 64 bits on most platforms anyway
+    INT_TYPECODE = 'l'
+
+# child type -> (array.array typecode, numpy dtype)
+FORMATS = {
+    Int: (INT_TYPECODE, 'int64'),
+    Boolean: ('b', 'bool'),
+    DateTime: ('d', 'datetime64[us]'),
+}
+
+
+def format_for(node):
+    """ Returns the (typecode, dtype) pair for the child of the Sequence ``node``. """
+
+    child = node.children[0]
+    for cls in child._type.__class__.__mro__:
+        if cls in FORMATS:
+            return cls, FORMATS[cls]
+    raise TypeError('%s can only be deserialized into an array if its child is an Int, '
+                    'Boolean or DateTime, not %s' % (node.name, child._type.__class__.__name__))
+
+
+def convert(cls, validated):
+    """ Converts every value at once, the same way ``cls.deserialize`` would one at a time.
+        Any exception means that at least one of the values is invalid. """
+
+    if cls is Int:
+        return list(map(int, validated))
+    if cls is Boolean:
+        return [str(value).lower() not in ('false', '0') for value in validated]
+    # DateTime parsing is the expensive part, there's nothing to gain by batching it
+    raise TypeError
+
+
+def deserialize(sequence, validated, node, model):
+    """ Deserializes the list ``validated`` into a typed array, for the Sequence
+        ``sequence``. """
+
+    cls, (typecode, dtype) = format_for(node)
+    child = node.children[0]
+
+    # the required check that ``_finish`` can't do on an array, which is skipped like it
+    # when the model is trusted
+    if not validated and node.required and not model.trusted:
+        raise Invalid('%s is required.' % node.name, node)
+
+    values = None
+    if (model._budget is None and not child.preparer and not child.validator and
+            child._type.__class__ is cls):
+        try:
+            values = convert(cls, validated)
+        except Exception:
+            pass
+
+    if values is None:
+        exc = None
+        values = []
+        for num, value in enumerate(validated):
+            try:
+                values.append(child.deserialize(value, mapping=value, model=model))
+            except Invalid as e:
+                if exc is None:
+                    exc = Invalid('Sequence Errors', node)
+                exc.add(e, num)
+        if exc is not None:
+            raise exc
+
+    return build(sequence, values, node)
+
+
+def build(sequence, values, node):
+    """ Packs the deserialized ``values`` of the Sequence ``sequence`` into its array,
+        reporting the ones that don't fit by index. """
+
+    cls, (typecode, dtype) = format_for(node)
+    child = node.children[0]
+    if cls is DateTime:
+        values = [microseconds(value) for value in values]
+
+    try:
+        return pack(sequence.output, typecode, dtype, cls, values)
+    except OverflowError:
+        pass
+
+    # find out which of the values didn't fit
+    exc = Invalid('Sequence Errors', node)
+    for num, value in enumerate(values):
+        try:
+            pack(sequence.output, typecode, dtype, cls, [value])
+        except OverflowError:
+            exc.add(Invalid('SchemaNode is out of range.', child), num)
+    raise exc
+
+
+def pack(output, typecode, dtype, cls, values):
+    if output == 'array':
+        if cls is DateTime:
+            values = [value / 1000000.0 for value in values]
+        return array.array(typecode, values)
+
+    import numpy
+    if cls is DateTime:
+        # numpy datetimes are naive, stored as microseconds since the epoch in UTC
+        return numpy.array(values, dtype='int64').view(dtype)
+    return numpy.array(values, dtype=dtype)
+
+
+def microseconds(value):
+    """ Returns the aware datetime ``value`` as microseconds since the epoch. """
+
+    from soap import iso8601
+    import datetime
+
+    delta = value - datetime.datetime(1970, 1, 1, tzinfo=iso8601.UTC)
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def unpack(sequence, value, node):
+    """ Turns a typed array back into a list of the values its child type serializes. """
+
+    if value is None or isinstance(value, list):
+        return value
+
+    cls, (typecode, dtype) = format_for(node)
+    if sequence.output == 'numpy' and cls is DateTime:
+        value = value.astype(dtype).view('int64')
+        return [fromtimestamp(0, item) for item in value.tolist()]
+
+    items = value.tolist()
+    if cls is Boolean:
+        return [bool(item) for item in items]
+    if cls is DateTime:
+        return [fromtimestamp(item) for item in items]
+    return items
+
+
+def fromtimestamp(seconds, microseconds=0):
+    from soap import iso8601
+    import datetime
+
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=iso8601.UTC)
+    return epoch + datetime.timedelta(seconds=seconds, microseconds=microseconds)
@@ -0,0 +1,572 @@
+""" Linear-time regular expression matching, for :class:`soap.Regex` with ``linear=True``.
+
+Python's ``re`` backtracks, so some patterns take exponential time on inputs crafted
+against them, e.g. ``(a+)+$`` on ``'a' * 30 + 'b'``.  This module compiles the common
+subset of ``re`` syntax into a Thompson NFA, and matches by walking a DFA that is built
+from it lazily, one transition at a time, and cached on the :class:`Automaton`.  Every
+character of the input is looked at once, so matching takes time linear in the length of
+the input, whatever the pattern:
+
+.. code-block:: python
+
+   automaton = compile(r'(?i)^[a-z0-9._%+-]+@[a-z0-9.-]+\\.[a-z]{2,4}$')
+   automaton.match('bob@example.com')              # True
+   automaton.match('a' * 100000, max_steps=10000)  # None, out of steps
+
+Supported are literals and escapes, ``.``, character classes (``\\d``, ``\\w``, ``\\s``,
+their negations and ``[...]`` sets), groups (plain, non-capturing and named), ``|``,
+the ``*``, ``+``, ``?`` and ``{m,n}`` quantifiers (lazy ones too, which match the same
+strings), ``^``, ``$``, ``\\A`` and ``\\Z``, and the ``i``, ``s``, ``a`` and ``u`` flags.
+Backreferences, lookarounds, word boundaries, conditionals, atomic groups, possessive
+quantifiers, scoped flags and the ``m``, ``x`` and ``L`` flags raise :class:`Unsupported`.
+Matching only answers whether the pattern matches at the start of the value, like
+``re.match(...) is not None``; there are no groups.
+
+Ignoring case only folds a character to its lower and upper case, which covers
+everything but a few special Unicode foldings.
+"""
+import re
+import sys
+import unicodedata
+
+PY3 = sys.version_info[0] >= 3
+
+# the most DFA states and transitions kept per pattern, before they are all thrown away
+MAX_STATES = 10000
+MAX_TRANSITIONS = 100000
+# the most NFA states a pattern may compile to, e.g. with large {m,n} counts
+MAX_NFA = 20000
+# the most patterns compile() keeps
+MAX_CACHE = 512
+
+ESCAPES = {
+    'a': u'\a', 'f': u'\f', 'n': u'\n', 'r': u'\r', 't': u'\t', 'v': u'\v', '\\': u'\\',
+}
+HEX_ESCAPES = {'x': 2, 'u': 4, 'U': 8}
+CATEGORIES = 'dDwWsS'
+
+
+class Unsupported(ValueError):
+    """ Raised for a pattern that uses a construct the linear matcher doesn't support. """
+
+
+def category(name, char, unicode):
+    """ Returns whether ``char`` is in the category ``\\d``, ``\\w`` or ``\\s``. """
+
+    if name == 'd':
+        if unicode:
+            return unicodedata.category(text(char)) == 'Nd'
+        return '0' <= char <= '9'
+    if name == 'w':
+        if unicode:
+            return char.isalnum() or char == '_'
+        return char < u'\x80' and (char.isalnum() or char == '_')
+    if unicode:
+        return char.isspace()
+    return char in ' \t\n\r\f\v'
+
+
+def text(char):
+    if not PY3 and isinstance(char, str):
+        return char.decode('latin-1')
+    return char
+
+
+class CharSet(object):
+    """ The characters matched by one step of a pattern: ``ranges`` of code points, and
+        ``categories``, a list of (name, negated) pairs, or everything else with
+        ``negate``. """
+
+    def __init__(self, ranges=(), categories=(), negate=False, icase=False, unicode=True):
+        self.ranges = list(ranges)
+        self.categories = list(categories)
+        self.negate = negate
+        self.icase = icase
+        self.unicode = unicode
+
+    def contains(self, char):
+        code = ord(char)
+        for low, high in self.ranges:
+            if low <= code <= high:
+                return True
+        for name, negated in self.categories:
+            if category(name, char, self.unicode) != negated:
+                return True
+        return False
+
+    def matches(self, char):
+        found = self.contains(char)
+        if not found and self.icase:
+            for other in self.folds(char):
+                if other != char and self.contains(other):
+                    found = True
+                    break
+        return found != self.negate
+
+    def folds(self, char):
+        if self.unicode or char < u'\x80':
+            # a case change into more than one character, like u'\xdf' to 'SS', is never
+            # matched by ``re``
+            return [other for other in (char.lower(), char.upper()) if len(other) == 1]
+        return ()
+
+
+class Parser(object):
+    """ Parses a pattern into a tree of tuples:
+
+        ``('set', CharSet)``, ``('cat', [nodes])``, ``('alt', [nodes])``,
+        ``('rep', node, min, max)`` with ``max`` None for no limit, ``('bol',)``, and
+        ``('eol', '$')`` or ``('eol', 'Z')``. """
+
+    def __init__(self, pattern, flags):
+        if flags & (re.MULTILINE | re.VERBOSE | re.LOCALE):
+            raise Unsupported('The m, x and L flags are not supported')
+        self.pattern = pattern
+        self.position = 0
+        self.icase = bool(flags & re.IGNORECASE)
+        self.dotall = bool(flags & re.DOTALL)
+        self.unicode = bool(flags & re.UNICODE)
+
+    def parse(self):
+        node = self.alternation()
+        if self.position != len(self.pattern):
+            raise Unsupported('Unbalanced parenthesis at %s' % self.position)
+        return node
+
+    def peek(self):
+        return self.pattern[self.position:self.position + 1]
+
+    def take(self):
+        char = self.pattern[self.position]
+        self.position += 1
+        return char
+
+    def charset(self, ranges=(), categories=(), negate=False):
+        return ('set', CharSet(ranges, categories, negate, self.icase, self.unicode))
+
+    def alternation(self):
+        branches = [self.concatenation()]
+        while self.peek() == '|':
+            self.position += 1
+            branches.append(self.concatenation())
+        if len(branches) == 1:
+            return branches[0]
+        return ('alt', branches)
+
+    def concatenation(self):
+        items = []
+        while self.position < len(self.pattern) and self.peek() not in '|)':
+            atom = self.atom()
+            if atom is not None:
+                items.append(self.quantifiers(atom))
+        return ('cat', items)
+
+    def quantifiers(self, atom):
+        while True:
+            char = self.peek()
+            if char == '*':
+                low, high = 0, None
+            elif char == '+':
+                low, high = 1, None
+            elif char == '?':
+                low, high = 0, 1
+            elif char == '{':
+                bounds = self.braces()
+                if bounds is None:
+                    return atom
+                low, high = bounds
+            else:
+                return atom
+            if char != '{':
+                self.position += 1
+
+            if self.peek() == '?':
+                self.position += 1
+            elif self.peek() == '+':
+                raise Unsupported('Possessive quantifiers are not supported')
+            atom = ('rep', atom, low, high)
+
+    def braces(self):
+        """ Parses ``{m,n}`` like ``re`` does, or returns None if the brace is a literal. """
+
+        start = self.position
+        self.position += 1
+        low = high = ''
+        while self.peek().isdigit():
+            low += self.take()
+        if self.peek() == ',':
+            self.position += 1
+            while self.peek().isdigit():
+                high += self.take()
+        else:
+            high = low
+        if self.peek() != '}' or (not low and not high and self.pattern[start:self.position] == '{'):
+            self.position = start
+            return None
+        self.position += 1
+        return int(low) if low else 0, int(high) if high else None
+
+    def atom(self):
+        char = self.take()
+        if char == '(':
+            return self.group()
+        if char == '[':
+            return self.charclass()
+        if char == '.':
+            return self.charset(negate=True, ranges=() if self.dotall else [(10, 10)])
+        if char == '^':
+            return ('bol',)
+        if char == '$':
+            return ('eol', '$')
+        if char == '\\':
+            return self.escape()
+        return self.charset([(ord(char), ord(char))])
+
+    def group(self):
+        if self.peek() != '?':
+            return self.close(self.alternation())
+
+        self.position += 1
+        char = self.take()
+        if char == ':':
+            return self.close(self.alternation())
+        if char == 'P':
+            if self.peek() == '<':
+                self.position = self.pattern.index('>', self.position) + 1
+                return self.close(self.alternation())
+            raise Unsupported('Backreferences are not supported')
+        if char == '#':
+            self.position = self.pattern.index(')', self.position) + 1
+            return None
+        if char in '=!<':
+            raise Unsupported('Lookarounds are not supported')
+        if char == '(':
+            raise Unsupported('Conditional groups are not supported')
+        if char == '>':
+            raise Unsupported('Atomic groups are not supported')
+
+        # flags, which re already put in the compiled flags, unless they are scoped
+        end = self.position
+        while self.pattern[end] not in ':)':
+            end += 1
+        if self.pattern[end] == ':':
+            raise Unsupported('Scoped flags are not supported')
+        self.position = end + 1
+        return None
+
+    def close(self, node):
+        if self.peek() != ')':
+            raise Unsupported('Unbalanced parenthesis at %s' % self.position)
+        self.position += 1
+        return node
+
+    def escape(self):
+        char = self.take()
+        if char == 'A':
+            return ('bol',)
+        if char == 'Z':
+            return ('eol', 'Z')
+        if char in 'bB':
+            raise Unsupported('Word boundaries are not supported')
+        if char in CATEGORIES:
+            return self.charset(categories=[(char.lower(), char.isupper())])
+        if char in '123456789' and not self.octal(char):
+            raise Unsupported('Backreferences are not supported')
+        code = self.code(char)
+        return self.charset([(code, code)])
+
+    def octal(self, char):
+        """ Whether ``\\<char>`` starts a three digit octal escape, not a backreference. """
+        digits = char + self.pattern[self.position:self.position + 2]
+        return len(digits) == 3 and all(digit in '01234567' for digit in digits)
+
+    def code(self, char):
+        """ Returns the code point of the escape ``\\<char>``, after the backslash. """
+
+        if char in ESCAPES:
+            return ord(ESCAPES[char])
+        if char in HEX_ESCAPES:
+            digits = self.pattern[self.position:self.position + HEX_ESCAPES[char]]
+            self.position += len(digits)
+            return int(digits, 16)
+        if char == 'N':
+            end = self.pattern.index('}', self.position)
+            name = self.pattern[self.position + 1:end]
+            self.position = end + 1
+            return ord(unicodedata.lookup(name))
+        if char in '01234567':
+            digits = char
+            while len(digits) < 3 and self.peek() and self.peek() in '01234567':
+                digits += self.take()
+            return int(digits, 8)
+        return ord(char)
+
+    def charclass(self):
+        negate = self.peek() == '^'
+        if negate:
+            self.position += 1
+
+        ranges = []
+        categories = []
+        first = True
+        while first or self.peek() != ']':
+            first = False
+            char = self.take()
+            if char == '\\':
+                char = self.take()
+                if char in CATEGORIES:
+                    categories.append((char.lower(), char.isupper()))
+                    continue
+                low = 8 if char == 'b' else self.code(char)
+            else:
+                low = ord(char)
+
+            high = low
+            if self.peek() == '-' and self.pattern[self.position + 1:self.position + 2] != ']':
+                self.position += 1
+                char = self.take()
+                if char == '\\':
+                    char = self.take()
+                    high = 8 if char == 'b' else self.code(char)
+                else:
+                    high = ord(char)
+            ranges.append((low, high))
+        self.position += 1
+        return self.charset(ranges, categories, negate)
+
+
+class NFA(object):
+    """ A Thompson NFA.  State 0 is the start and state 1 accepts.  ``edges`` has the
+        (CharSet, target) pairs leaving each state, ``eps`` its epsilon moves, ``bol`` the
+        ones only taken at the start of the value, and ``eol`` the (kind, target) ones only
+        taken at its end. """
+
+    def __init__(self, node):
+        self.edges = []
+        self.eps = []
+        self.bol = []
+        self.eol = []
+        start = self.new()
+        accept = self.new()
+        self.eps[self.build(node, start)].append(accept)
+
+    def new(self):
+        if len(self.edges) >= MAX_NFA:
+            raise Unsupported('The pattern is too large')
+        self.edges.append([])
+        self.eps.append([])
+        self.bol.append([])
+        self.eol.append([])
+        return len(self.edges) - 1
+
+    def build(self, node, start):
+        """ Adds the states for ``node`` starting at ``start``, and returns the state
+            where it ends. """
+
+        kind = node[0]
+        if kind == 'set':
+            end = self.new()
+            self.edges[start].append((node[1], end))
+            return end
+        if kind == 'cat':
+            for item in node[1]:
+                start = self.build(item, start)
+            return start
+        if kind == 'alt':
+            end = self.new()
+            for branch in node[1]:
+                begin = self.new()
+                self.eps[start].append(begin)
+                self.eps[self.build(branch, begin)].append(end)
+            return end
+        if kind == 'bol':
+            end = self.new()
+            self.bol[start].append(end)
+            return end
+        if kind == 'eol':
+            end = self.new()
+            self.eol[start].append((node[1], end))
+            return end
+
+        _, item, low, high = node
+        for _ in range(low):
+            start = self.build(item, start)
+        if high is None:
+            loop = self.new()
+            self.eps[start].append(loop)
+            self.eps[self.build(item, loop)].append(loop)
+            return loop
+        end = self.new()
+        for _ in range(high - low):
+            self.eps[start].append(end)
+            start = self.build(item, start)
+        self.eps[start].append(end)
+        return end
+
+    def closure(self, states, bol=False, eol=()):
+        """ Returns the states reachable from ``states`` without consuming anything, taking
+            ``bol`` edges if ``bol``, and the ``eol`` edges of the kinds in ``eol``. """
+
+        seen = set(states)
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            targets = list(self.eps[state])
+            if bol:
+                targets.extend(self.bol[state])
+            if eol:
+                targets.extend(target for kind, target in self.eol[state] if kind in eol)
+            for target in targets:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    def keep(self, states):
+        """ Only keeps the states that consume characters, end the value or accept, which
+            is all a DFA state needs. """
+        return frozenset(state for state in states
+                         if self.edges[state] or self.eol[state] or state == 1)
+
+
+class State(object):
+    """ A DFA state: a set of NFA states, and the transitions out of it seen so far. """
+
+    __slots__ = ('nfa', 'next', 'accepting', 'stop', 'end')
+
+    def __init__(self, nfa):
+        self.nfa = nfa
+        self.next = {}
+        self.accepting = 1 in nfa
+        self.stop = self.accepting or not nfa
+        # whether the state accepts at the end of the value, once it's needed
+        self.end = None
+
+
+class Automaton(object):
+    """ A compiled pattern, with its lazily built DFA. """
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+        self.nfa = NFA(Parser(pattern, flags).parse())
+        self.dollar = any(kind == '$' for edges in self.nfa.eol for kind, _ in edges)
+        self.states = {}
+        self.transitions = 0
+        self.start = self.state(self.nfa.keep(self.nfa.closure([0], bol=True)))
+
+    def state(self, nfa):
+        state = self.states.get(nfa)
+        if state is None:
+            if len(self.states) >= MAX_STATES:
+                self.flush()
+            state = self.states.setdefault(nfa, State(nfa))
+        return state
+
+    def flush(self):
+        """ Forgets the whole DFA, for patterns whose DFA grows too large, which then
+            costs the time to build every transition again. """
+
+        for state in list(self.states.values()):
+            state.next.clear()
+        self.states.clear()
+        self.transitions = 0
+        self.states[self.start.nfa] = self.start
+
+    def step(self, states, char):
+        edges = self.nfa.edges
+        return set(target for state in states
+                   for charset, target in edges[state] if charset.matches(char))
+
+    def advance(self, state, char):
+        """ Builds the transition of ``state`` on ``char``, and returns the next state and
+            the number of NFA states it took to find it. """
+
+        targets = self.nfa.keep(self.nfa.closure(self.step(state.nfa, char)))
+        following = self.state(targets)
+        if self.transitions >= MAX_TRANSITIONS:
+            self.flush()
+        state.next[char] = following
+        self.transitions += 1
+        return following, len(state.nfa) + len(targets) + 1
+
+    def accepts_at_end(self, state):
+        if state.end is None:
+            state.end = 1 in self.nfa.closure(state.nfa, eol='$Z')
+        return state.end
+
+    def accepts_before_newline(self, state):
+        """ Whether a match can end right before a newline that ends the value, or end
+            with it after going through a ``$`` right before it, which is what ``$`` means
+            without the m flag. """
+
+        nfa = self.nfa
+        states = nfa.closure(state.nfa, eol='$')
+        if 1 in states:
+            return True
+        return 1 in nfa.closure(self.step(states, u'\n'), eol='$Z')
+
+    def match(self, value, max_steps=None):
+        """ Returns whether the pattern matches at the start of ``value``, or None if that
+            took more than ``max_steps``: one per character, plus the NFA states visited
+            whenever a DFA transition has to be built. """
+
+        if PY3 and isinstance(value, bytes):
+            value = value.decode('latin-1')
+
+        state = self.start
+        if state.accepting:
+            return True
+        tail = self.dollar and value[-1:] == u'\n'
+        if tail:
+            value = value[:-1]
+
+        budget = None
+        if max_steps is not None:
+            budget = max_steps - len(value) - tail
+            if budget < 0:
+                return None
+
+        for char in value:
+            try:
+                state = state.next[char]
+            except KeyError:
+                state, cost = self.advance(state, char)
+                if budget is not None:
+                    budget -= cost
+                    if budget < 0:
+                        return None
+            if state.stop:
+                return state.accepting
+
+        if tail:
+            if self.accepts_before_newline(state):
+                return True
+            state = self.advance(state, u'\n')[0]
+            if state.accepting:
+                return True
+        return self.accepts_at_end(state)
+
+
+_cache = {}
+
+
+def compile(pattern, flags=0):
+    """ Returns the :class:`Automaton` for ``pattern``, which may also be a compiled
+        ``re`` pattern, shared with every other caller.  Invalid patterns raise
+        ``re.error``, like ``re.compile``. """
+
+    if not isinstance(pattern, (bytes, type(u''))):
+        pattern, flags = pattern.pattern, pattern.flags
+    key = (type(pattern), pattern, flags)
+    automaton = _cache.get(key)
+    if automaton is None:
+        compiled = re.compile(pattern, flags)
+        source = compiled.pattern
+        if PY3 and isinstance(source, bytes):
+            source = source.decode('latin-1')
+        automaton = Automaton(source, compiled.flags)
+        if len(_cache) >= MAX_CACHE:
+            _cache.clear()
+        _cache[key] = automaton
+    return automaton
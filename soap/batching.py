@@ -0,0 +1,107 @@
+""" Serializing Relationships whose values are fetched in batches, like a DataLoader.
+
+When the related values come from another service or a cache, rather than from ORM
+attributes that were eagerly loaded, fetching them one parent at a time makes a request
+per row.  With ``loaders``, a dict from the names of models to batch loaders, the values
+of the Relationships to those models are their keys instead, and they are fetched a level
+at a time:
+
+.. code-block:: python
+
+   def load_users(ids):
+       return users_service.get_many(ids)      # a list in the same order, or a dict
+
+   PostSchema().serialize(posts, loaders={'UserSchema': load_users})
+
+Serializing goes breadth-first by depth: every Relationship to a model with a loader is
+left as an empty list or dict while its level is serialized, and the keys they need are
+collected.  Then each loader is called once with all of the keys of that level that it
+didn't already fetch, and the values are serialized into the lists and dicts that were
+left, which collects the keys of the next level.  That makes a call per loader and level,
+instead of one per row.
+
+A loader returns a list of values in the same order as the keys, or a dict from keys to
+values.  Keys it doesn't return a value for are left out of lists, and serialize to an
+empty dict otherwise, like a Relationship without a value.  Windows (see
+:mod:`soap.paging`) don't apply to Relationships that are batch loaded.
+"""
+
+
+class Batch(object):
+    """ The Relationships waiting to be filled in while serializing with ``loaders``. """
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self.pending = []
+        # model name -> {key: value} of everything fetched so far
+        self.loaded = {}
+        # the keys each loader was called with, in order
+        self.calls = []
+
+    def defer(self, relationship, schema_model, value, depth):
+        """ Returns the empty list or dict the value of ``relationship`` will be serialized
+            into, once the keys in ``value`` are fetched. """
+
+        if relationship.uselist:
+            placeholder = []
+            keys = list(value) if value else []
+        else:
+            placeholder = {}
+            keys = [value] if value is not None else []
+        if keys:
+            self.pending.append((relationship, schema_model, keys, placeholder, depth))
+        return placeholder
+
+    def fetch(self, name, keys):
+        """ Calls the loader of ``name`` with the ``keys`` it didn't already fetch. """
+
+        loaded = self.loaded.setdefault(name, {})
+        missing = []
+        seen = set()
+        for key in keys:
+            if key not in loaded and key not in seen:
+                seen.add(key)
+                missing.append(key)
+        if not missing:
+            return loaded
+
+        values = self.loaders[name](missing)
+        self.calls.append((name, missing))
+        if not isinstance(values, dict):
+            values = dict(zip(missing, values))
+        for key in missing:
+            loaded[key] = values.get(key)
+        return loaded
+
+    def run(self, model):
+        """ Fills in the pending Relationships a level at a time, until there are none. """
+
+        while self.pending:
+            pending, self.pending = self.pending, []
+
+            keys = {}
+            for relationship, schema_model, values, placeholder, depth in pending:
+                keys.setdefault(relationship.name, []).extend(values)
+            loaded = dict((name, self.fetch(name, keys[name])) for name in sorted(keys))
+
+            for relationship, schema_model, values, placeholder, depth in pending:
+                found = loaded[relationship.name]
+                if relationship.uselist:
+                    items = [found[key] for key in values if found[key] is not None]
+                    placeholder.extend(schema_model.serialize(items, depth, mapping=items,
+                                                              model=model))
+                else:
+                    item = found[values[0]]
+                    if item is not None:
+                        placeholder.update(schema_model.serialize(item, depth, mapping=item,
+                                                                  model=model))
+
+
+def serialize(schema, value, depth, mapping, node, model):
+    """ Serializes ``value`` with ``schema``, fetching the values of Relationships with
+        ``model.loaders``. """
+
+    batch = Batch(model.loaders)
+    serialized = model.serialize(value, depth, mapping, node, _batch=batch)
+    batch.run(model.bind(_batch=batch))
+    return serialized
@@ -0,0 +1,686 @@
+""" A compact binary encoding for values of a schema, readable as MessagePack.
+
+When both ends of a connection have the same :class:`soap.SchemaModel`, the field names
+don't need to be sent.  :func:`dumps` serializes a value into MessagePack, with every
+SchemaModel and Mapping value as a map keyed by the index of the field, in the order of
+the field names, instead of by the names.  :class:`soap.Int`, :class:`soap.Boolean` and
+:class:`soap.DateTime` values are sent as MessagePack integers, booleans and timestamps
+instead of strings:
+
+.. code-block:: python
+
+   data = dumps(UserSchema(), user)
+   user = loads(UserSchema(), data)
+
+:func:`loads` deserializes and validates in the same pass, following the schema, and
+returns what ``deserialize`` would have for the JSON ``serialize`` returns.  Values that
+already are of the right type skip their type's ``deserialize``, and anything else, like
+an Int sent as a string, goes through it, so the errors and the :class:`soap.Invalid`
+tree are the same as for JSON.  Validators see the values of the other fields of a
+SchemaModel as ``mapping``, as they were decoded.  Unknown field indexes are skipped,
+missing fields get their ``missing`` value, and corrupt data raises an Invalid for the
+whole schema.  DateTimes come back in UTC.
+
+:class:`soap.Polymorphic` values are sent as a ``[discriminator, map]`` pair.  The
+limits of a :class:`soap.Budget` aren't checked, since nothing is longer than what was
+sent.  Self-referential Relationships let the data nest as deep as the sender made it,
+and data nested deeper than the stack allows raises an Invalid for the whole schema.
+
+:func:`pack` and :func:`unpack` encode and decode plain values, without a schema.
+"""
+import datetime
+import struct
+import sys
+
+from soap import (
+    Int,
+    String,
+    Boolean,
+    DateTime,
+    Invalid,
+    SchemaModel,
+    null,
+    falsey,
+    falsey_types,
+    iso8601,
+    engine,
+)
+from soap.engine import (
+    LEAF,
+    MAPPING,
+    SEQUENCE,
+    RELATIONSHIP,
+    POLYMORPHIC,
+    OVERRIDDEN,
+)
+
+PY3 = sys.version_info[0] >= 3
+if PY3:
+    text_type = str
+    integer_types = (int,)
+else:
+    text_type = unicode
+    integer_types = (int, long)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=iso8601.UTC)
+TIMESTAMP = -1
+
+# the leaf types whose values are sent natively, and the Python types they decode to
+BOOLEAN = (bool,)
+NATIVE = {
+    Int: integer_types,
+    Boolean: BOOLEAN,
+    DateTime: (datetime.datetime,),
+}
+if PY3:
+    # on Python 2, String turns unicode into str, so it has to run
+    NATIVE[String] = (str,)
+
+
+def fields(node):
+    """ Returns a (name, child, kind, native types, checked, missing) tuple for every child
+        of the Mapping ``node``, in the order of their indexes, which is the order of their
+        names.  ``checked`` is whether the child has preparers or validators.  It's cached
+        on whatever holds the children. """
+
+    owner = node if 'children' in node.__dict__ else node.__class__
+    table = owner.__dict__.get('_binary_fields')
+    if table is None:
+        table = []
+        for child in sorted(node.children, key=lambda child: child.name):
+            kind = kind_of(child)
+            native = NATIVE.get(type(child._type)) if kind == LEAF else None
+            table.append((child.name, child, kind, native,
+                          bool(child.preparer or child.validator), child.missing))
+        setattr(owner, '_binary_fields', table)
+    return table
+
+
+def kind_of(node):
+    """ Returns how ``node`` is read and written, which is the same as how
+        :mod:`soap.engine` handles it: nodes whose class overrides ``deserialize`` or
+        ``serialize``, and types that change how they deserialize, are sent as the plain
+        values they serialize to. """
+
+    if engine.overrides(node):
+        return OVERRIDDEN
+    return engine.kind(node._type)
+
+
+#
+# Encoding
+#
+
+class Encoder(object):
+    def __init__(self, model):
+        self.model = model
+        self.buffer = bytearray()
+
+    def header(self, size, fix, small, large, huge):
+        """ Writes the header for a str, array or map of ``size``: ``fix`` is the first
+            byte of the fixed size format, if any, and the rest are for 8, 16 and 32 bit
+            sizes. """
+        buffer = self.buffer
+        if fix is not None and size < (32 if fix == 0xa0 else 16):
+            buffer.append(fix | size)
+        elif small is not None and size < 0x100:
+            buffer.append(small)
+            buffer.append(size)
+        elif size < 0x10000:
+            buffer.extend(struct.pack('>BH', large, size))
+        else:
+            buffer.extend(struct.pack('>BI', huge, size))
+
+    def pack(self, value):
+        """ Encodes a plain value. """
+
+        buffer = self.buffer
+        if value is None:
+            buffer.append(0xc0)
+        elif value is True:
+            buffer.append(0xc3)
+        elif value is False:
+            buffer.append(0xc2)
+        elif isinstance(value, integer_types):
+            self.integer(value)
+        elif isinstance(value, float):
+            buffer.extend(struct.pack('>Bd', 0xcb, value))
+        elif isinstance(value, text_type) or (not PY3 and isinstance(value, str)):
+            self.text(value)
+        elif isinstance(value, (bytes, bytearray)):
+            self.header(len(value), None, 0xc4, 0xc5, 0xc6)
+            buffer.extend(value)
+        elif isinstance(value, dict):
+            self.header(len(value), 0x80, None, 0xde, 0xdf)
+            for key, item in value.items():
+                self.pack(key)
+                self.pack(item)
+        elif isinstance(value, (list, tuple)):
+            self.header(len(value), 0x90, None, 0xdc, 0xdd)
+            for item in value:
+                self.pack(item)
+        elif isinstance(value, datetime.datetime):
+            self.timestamp(value)
+        else:
+            raise TypeError('%r can not be encoded' % (value,))
+
+    def integer(self, value):
+        buffer = self.buffer
+        if 0 <= value < 0x80:
+            buffer.append(value)
+        elif -32 <= value < 0:
+            buffer.append(value & 0xff)
+        elif value > 0:
+            if value < 0x100:
+                buffer.extend(struct.pack('>BB', 0xcc, value))
+            elif value < 0x10000:
+                buffer.extend(struct.pack('>BH', 0xcd, value))
+            elif value < 0x100000000:
+                buffer.extend(struct.pack('>BI', 0xce, value))
+            elif value < 0x10000000000000000:
+                buffer.extend(struct.pack('>BQ', 0xcf, value))
+            else:
+                raise OverflowError('%s does not fit in 64 bits' % value)
+        elif -0x80 <= value:
+            buffer.extend(struct.pack('>Bb', 0xd0, value))
+        elif -0x8000 <= value:
+            buffer.extend(struct.pack('>Bh', 0xd1, value))
+        elif -0x80000000 <= value:
+            buffer.extend(struct.pack('>Bi', 0xd2, value))
+        elif -0x8000000000000000 <= value:
+            buffer.extend(struct.pack('>Bq', 0xd3, value))
+        else:
+            raise OverflowError('%s does not fit in 64 bits' % value)
+
+    def text(self, value):
+        if isinstance(value, text_type):
+            value = value.encode('utf-8')
+        self.header(len(value), 0xa0, 0xd9, 0xda, 0xdb)
+        self.buffer.extend(value)
+
+    def timestamp(self, value, tzinfo=None):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=tzinfo or iso8601.UTC)
+        delta = value - EPOCH
+        seconds = delta.days * 86400 + delta.seconds
+        nanoseconds = delta.microseconds * 1000
+
+        buffer = self.buffer
+        if 0 <= seconds < 0x400000000:
+            if not nanoseconds and seconds < 0x100000000:
+                buffer.extend(struct.pack('>BbI', 0xd6, TIMESTAMP, seconds))
+            else:
+                buffer.extend(struct.pack('>BbQ', 0xd7, TIMESTAMP, nanoseconds << 34 | seconds))
+        else:
+            buffer.extend(struct.pack('>BBbIq', 0xc7, 12, TIMESTAMP, nanoseconds, seconds))
+
+    def node(self, node, value, depth):
+        """ Encodes what ``node`` would serialize ``value`` to. """
+
+        kind = kind_of(node)
+        if kind == OVERRIDDEN:
+            self.pack(node.serialize(value, depth, mapping=value, model=self.model))
+        elif kind == MAPPING:
+            self.mapping(node, value, depth)
+        elif kind == SEQUENCE:
+            child = node.children[0]
+            if node._type.output is not None:
+                from soap import arrays
+                value = arrays.unpack(node._type, value, node)
+            self.header(len(value), 0x90, None, 0xdc, 0xdd)
+            for item in value:
+                self.node(child, item, depth)
+        elif kind == RELATIONSHIP:
+            self.relationship(node, value, depth)
+        elif kind == POLYMORPHIC:
+            self.polymorphic(node, value, depth)
+        else:
+            self.leaf(node, value, depth)
+
+    def mapping(self, node, value, depth):
+        table = fields(node)
+        if not value:
+            self.buffer.append(0x80)
+            return
+
+        items = []
+        for index, (name, child, kind, native, _, _) in enumerate(table):
+            item = value.get(name)
+            if item is not None or native is BOOLEAN:
+                items.append((index, child, kind, item))
+        self.header(len(items), 0x80, None, 0xde, 0xdf)
+        for index, child, kind, item in items:
+            self.integer(index)
+            if kind == LEAF:
+                self.leaf(child, item, depth)
+            else:
+                self.node(child, item, depth)
+
+    def relationship(self, node, value, depth):
+        relationship = node._type
+        if depth >= self.model.max_depth:
+            self.buffer.append(0x90 if relationship.uselist else 0x80)
+            return
+
+        schema_model = relationship.resolve(node, self.model)
+        if relationship.uselist:
+            schema_model = schema_model.children[0]
+            self.header(len(value), 0x90, None, 0xdc, 0xdd)
+            for item in value:
+                self.node(schema_model, item, depth + 1)
+        else:
+            self.node(schema_model, value, depth + 1)
+
+    def polymorphic(self, node, value, depth):
+        if value is None:
+            self.buffer.append(0x80)
+            return
+
+        polymorphic = node._type
+        try:
+            schema_model = polymorphic.select(value, node, self.model)
+        except Invalid as e:
+            raise ValueError(e.msg)
+        self.buffer.append(0x92)
+        self.pack(value.get(polymorphic.discriminator))
+        self.node(schema_model, value, depth)
+
+    def leaf(self, node, value, depth):
+        datatype = node._type
+        cls = type(datatype)
+        if value is None and (cls is Int or cls is DateTime):
+            # which is what they serialize None to
+            self.buffer.append(0xc0)
+        elif cls is Int:
+            self.integer(int(value))
+        elif cls is Boolean:
+            self.buffer.append(0xc3 if value is True else 0xc2)
+        elif cls is DateTime:
+            if not isinstance(value, datetime.datetime):
+                value = datetime.datetime(value.year, value.month, value.day)
+            self.timestamp(value, datatype.default_tzinfo)
+        else:
+            self.pack(datatype.serialize(value, depth, value, node, self.model))
+
+
+def dumps(schema, value, **options):
+    """ Serializes ``value`` with ``schema`` into bytes, taking the same per call options
+        as ``serialize``. """
+
+    model = schema.bind(**options) if options else schema
+    encoder = Encoder(model)
+    encoder.node(schema, value, 0)
+    return bytes(encoder.buffer)
+
+
+def pack(value):
+    """ Encodes a plain value of dicts, lists, strings, numbers, booleans, None, bytes and
+        datetimes into MessagePack. """
+
+    encoder = Encoder(None)
+    encoder.pack(value)
+    return bytes(encoder.buffer)
+
+
+#
+# Decoding
+#
+
+class Decoder(object):
+    def __init__(self, data, model):
+        self.data = bytearray(data)
+        self.position = 0
+        self.model = model
+
+    def take(self, size):
+        start = self.position
+        end = self.position = start + size
+        if end > len(self.data):
+            raise ValueError('Truncated data')
+        return self.data[start:end]
+
+    def unpack(self, fmt, size):
+        start = self.position
+        self.position = start + size
+        return struct.unpack_from(fmt, self.data, start)[0]
+
+    def read(self):
+        """ Decodes the next plain value. """
+
+        byte = self.data[self.position]
+        self.position += 1
+        if byte < 0x80:
+            return byte
+        if 0xa0 <= byte <= 0xbf:
+            return self.take(byte & 0x1f).decode('utf-8')
+        if byte <= 0x8f:
+            return self.read_map(byte & 0x0f)
+        if byte <= 0x9f:
+            return [self.read() for _ in range(byte & 0x0f)]
+        if byte >= 0xe0:
+            return byte - 0x100
+        if byte == 0xc0:
+            return None
+        if byte == 0xc2:
+            return False
+        if byte == 0xc3:
+            return True
+
+        reader = READERS.get(byte)
+        if reader is None:
+            raise ValueError('Unknown type byte 0x%x' % byte)
+        return reader(self)
+
+    def read_map(self, size):
+        result = {}
+        for _ in range(size):
+            key = self.read()
+            if isinstance(key, (list, dict)):
+                raise ValueError('Invalid map key %r' % (key,))
+            result[key] = self.read()
+        return result
+
+    def read_ext(self, size):
+        code = self.unpack('>b', 1)
+        data = self.take(size)
+        if code != TIMESTAMP:
+            raise ValueError('Unknown extension type %s' % code)
+        if size == 4:
+            seconds, nanoseconds = struct.unpack('>I', bytes(data))[0], 0
+        elif size == 8:
+            value = struct.unpack('>Q', bytes(data))[0]
+            seconds, nanoseconds = value & 0x3ffffffff, value >> 34
+        elif size == 12:
+            nanoseconds, seconds = struct.unpack('>Iq', bytes(data))
+        else:
+            raise ValueError('Invalid timestamp of %s bytes' % size)
+        return EPOCH + datetime.timedelta(seconds=seconds, microseconds=nanoseconds // 1000)
+
+    def size(self, fix, small, large, huge):
+        """ Reads the size of a map or an array, or returns None if the next value isn't
+            one. """
+
+        byte = self.data[self.position]
+        if fix <= byte <= fix + 0x0f:
+            self.position += 1
+            return byte & 0x0f
+        if byte == large:
+            self.position += 1
+            return self.unpack('>H', 2)
+        if byte == huge:
+            self.position += 1
+            return self.unpack('>I', 4)
+        return None
+
+    def node(self, node, mapping):
+        """ Deserializes the next value with ``node``, like ``node.deserialize`` would. """
+
+        kind = kind_of(node)
+        if kind == OVERRIDDEN:
+            return node.deserialize(self.read(), mapping=mapping, model=self.model)
+        if kind == LEAF:
+            raw = self.read()
+            if mapping is None:
+                mapping = raw
+            return self.finish(node, self.leaf(node, raw, mapping), mapping)
+        if kind == MAPPING:
+            value = self.mapping(node, node, mapping)
+        elif kind == SEQUENCE:
+            value = self.sequence(node, node.children[0])
+        elif kind == RELATIONSHIP:
+            value = self.relationship(node)
+        else:
+            value = self.polymorphic(node)
+        return self.finish(node, value, value if mapping is None else mapping)
+
+    def finish(self, node, value, mapping):
+        if node.preparer or node.validator:
+            value = node._finish(value, mapping, node, self.model)
+        elif node.required and isinstance(value, falsey_types) and value in falsey:
+            raise Invalid('%s is required.' % node.name, node)
+        if self.model.records and type(value) is dict and isinstance(node, SchemaModel):
+            return node.record_class().from_dict(value)
+        return value
+
+    def leaf(self, node, raw, mapping):
+        datatype = node._type
+        native = NATIVE.get(type(datatype))
+        if native is not None and type(raw) in native:
+            return raw
+        return datatype.deserialize(raw, mapping, node, self.model)
+
+    def mapping(self, schema, node, mapping):
+        """ Reads a map of field indexes into a dict, with the children of ``schema``.
+            SchemaModels are their own ``mapping``. """
+
+        size = self.size(0x80, None, 0xde, 0xdf)
+        if size is None:
+            self.read()
+            raise Invalid('SchemaNode is not a mapping type.', node)
+
+        table = fields(schema)
+        count = len(table)
+        raw = {}
+        deserialized = {}
+        errors = None
+        if isinstance(schema, SchemaModel):
+            mapping = raw
+        # the common small integers, strings and booleans are read inline
+        data = self.data
+        end = len(data)
+        read = self.read
+        position = self.position
+        for _ in range(size):
+            index = data[position]
+            if index < 0x80:
+                position += 1
+            else:
+                self.position = position
+                index = read()
+                position = self.position
+            if type(index) is not int or not 0 <= index < count:
+                self.position = position
+                read()
+                position = self.position
+                continue
+
+            name, child, kind, native, checked, _ = table[index]
+            if kind == LEAF or kind == OVERRIDDEN:
+                byte = data[position]
+                if byte < 0x80:
+                    value = byte
+                    position += 1
+                elif 0xa0 <= byte <= 0xbf:
+                    start = position + 1
+                    position = start + (byte & 0x1f)
+                    if position > end:
+                        raise ValueError('Truncated data')
+                    value = data[start:position].decode('utf-8')
+                elif byte == 0xc3 or byte == 0xc2:
+                    value = byte == 0xc3
+                    position += 1
+                else:
+                    self.position = position
+                    value = read()
+                    position = self.position
+                raw[name] = value
+                # values of the right type, that nothing else needs to look at, are done
+                if not checked and native is not None and type(value) in native and value != '':
+                    deserialized[name] = value
+                continue
+
+            self.position = position
+            try:
+                if kind == MAPPING:
+                    raw[name] = self.mapping(child, child, mapping)
+                elif kind == SEQUENCE:
+                    raw[name] = self.sequence(child, child.children[0])
+                elif kind == RELATIONSHIP:
+                    raw[name] = self.relationship(child)
+                else:
+                    raw[name] = self.polymorphic(child)
+            except Invalid as e:
+                if errors is None:
+                    errors = {}
+                errors[name] = e
+            position = self.position
+        self.position = position
+
+        model = self.model
+        exc = None
+        for name, child, kind, native, checked, missing in table:
+            if name in deserialized:
+                continue
+            value = raw.get(name)
+            try:
+                if errors is not None and name in errors:
+                    raise errors[name]
+                if value is None:
+                    if missing is null:
+                        raise Invalid('The field named \'%s\' is missing.' % name, child)
+                    deserialized[name] = missing
+                    continue
+                if kind == OVERRIDDEN:
+                    deserialized[name] = child.deserialize(value, mapping=mapping, model=model)
+                    continue
+                if kind == LEAF and (native is None or type(value) not in native):
+                    value = child._type.deserialize(value, mapping, child, model)
+                if checked or kind != LEAF:
+                    value = self.finish(child, value, mapping)
+                elif missing is null and isinstance(value, falsey_types) and value in falsey:
+                    raise Invalid('%s is required.' % name, child)
+                deserialized[name] = value
+            except Invalid as e:
+                if exc is None:
+                    exc = Invalid('Mapping Errors', node)
+                exc.add(e)
+
+        if exc is not None:
+            raise exc
+        return deserialized
+
+    def sequence(self, node, child):
+        size = self.size(0x90, None, 0xdc, 0xdd)
+        if size is None:
+            self.read()
+            raise Invalid('SchemaNode is not an interable type.', node)
+
+        exc = None
+        deserialized = []
+        for num in range(size):
+            try:
+                deserialized.append(self.node(child, None))
+            except Invalid as e:
+                if exc is None:
+                    exc = Invalid('Sequence Errors', node)
+                exc.add(e, num)
+
+        if exc is not None:
+            raise exc
+
+        if node._type.output is not None:
+            if not deserialized and node.required:
+                raise Invalid('%s is required.' % node.name, node)
+            from soap import arrays
+            return arrays.build(node._type, deserialized, node)
+        return deserialized
+
+    def relationship(self, node):
+        relationship = node._type
+        schema_model = relationship.resolve(node, self.model)
+        if relationship.uselist:
+            return self.sequence(schema_model, schema_model.children[0])
+        return self.node(schema_model, None)
+
+    def polymorphic(self, node):
+        size = self.size(0x90, None, 0xdc, 0xdd)
+        if size != 2:
+            if size is None:
+                self.read()
+            else:
+                for _ in range(size):
+                    self.read()
+            raise Invalid('SchemaNode is not a mapping type.', node)
+
+        polymorphic = node._type
+        key = self.read()
+        try:
+            schema_model = polymorphic.select({polymorphic.discriminator: key}, node, self.model)
+        except Invalid:
+            self.read()
+            raise
+        return self.node(schema_model, None)
+
+
+def reader(fmt, size):
+    def read(decoder):
+        return decoder.unpack(fmt, size)
+    return read
+
+
+def sized(fmt, size, convert):
+    def read(decoder):
+        return convert(decoder, decoder.unpack(fmt, size))
+    return read
+
+
+READERS = {
+    0xcc: reader('>B', 1),
+    0xcd: reader('>H', 2),
+    0xce: reader('>I', 4),
+    0xcf: reader('>Q', 8),
+    0xd0: reader('>b', 1),
+    0xd1: reader('>h', 2),
+    0xd2: reader('>i', 4),
+    0xd3: reader('>q', 8),
+    0xca: reader('>f', 4),
+    0xcb: reader('>d', 8),
+    0xd9: sized('>B', 1, lambda decoder, size: decoder.take(size).decode('utf-8')),
+    0xda: sized('>H', 2, lambda decoder, size: decoder.take(size).decode('utf-8')),
+    0xdb: sized('>I', 4, lambda decoder, size: decoder.take(size).decode('utf-8')),
+    0xc4: sized('>B', 1, lambda decoder, size: bytes(decoder.take(size))),
+    0xc5: sized('>H', 2, lambda decoder, size: bytes(decoder.take(size))),
+    0xc6: sized('>I', 4, lambda decoder, size: bytes(decoder.take(size))),
+    0xdc: sized('>H', 2, lambda decoder, size: [decoder.read() for _ in range(size)]),
+    0xdd: sized('>I', 4, lambda decoder, size: [decoder.read() for _ in range(size)]),
+    0xde: sized('>H', 2, Decoder.read_map),
+    0xdf: sized('>I', 4, Decoder.read_map),
+    0xd4: lambda decoder: decoder.read_ext(1),
+    0xd5: lambda decoder: decoder.read_ext(2),
+    0xd6: lambda decoder: decoder.read_ext(4),
+    0xd7: lambda decoder: decoder.read_ext(8),
+    0xd8: lambda decoder: decoder.read_ext(16),
+    0xc7: sized('>B', 1, Decoder.read_ext),
+    0xc8: sized('>H', 2, Decoder.read_ext),
+    0xc9: sized('>I', 4, Decoder.read_ext),
+}
+
+
+def loads(schema, data, **options):
+    """ Decodes and deserializes what :func:`dumps` encoded with ``schema``, taking the
+        same per call options as ``deserialize``, and raises an Invalid like it. """
+
+    model = schema.bind(**options) if options else schema
+    decoder = Decoder(data, model)
+    try:
+        value = decoder.node(schema, None)
+        if decoder.position != len(decoder.data):
+            raise ValueError('%s bytes left over' % (len(decoder.data) - decoder.position))
+    except (IndexError, ValueError, struct.error) as e:
+        raise Invalid('Not valid binary data: %s' % e, schema)
+    except RuntimeError as e:
+        # RecursionError, from a value nested deeper than the stack allows
+        if 'recursion' not in str(e):
+            raise
+        raise Invalid('Not valid binary data: nested too deeply', schema)
+    return value
+
+
+def unpack(data):
+    """ Decodes a plain value from MessagePack. """
+
+    decoder = Decoder(data, None)
+    value = decoder.read()
+    if decoder.position != len(decoder.data):
+        raise ValueError('%s bytes left over' % (len(decoder.data) - decoder.position))
+    return value
@@ -0,0 +1,173 @@
+""" A cache of serialized values, for serializing the same objects over and over.
+
+Passing ``cache=`` to ``serialize``, or setting ``cache`` on a schema, stores what every
+:class:`soap.SchemaModel` value serializes to, including the ones behind Relationships, so
+an object that hasn't changed since it was last serialized isn't serialized again:
+
+.. code-block:: python
+
+   cache = LRUCache(maxsize=10000)
+
+   class UserSchema(SchemaModel):
+       version = 'updated_at'
+       ...
+
+   UserSchema().serialize(user, cache=cache)
+   cache.invalidate(UserSchema, user.id)
+   cache.stats()
+
+A value is cached under its model, the depth left before ``max_depth``, its identity (see
+:mod:`soap.normalize`) and its version, which is the field named by the model's
+``version``, or whatever ``version`` returns if it's a callable.  Values without an
+identity aren't cached.  Without a version, a cached value is only replaced when it's
+invalidated.  A cached value includes the Relationships under it, so a value's version has
+to change when the values it's related to do, or those have to be invalidated along with it.
+Other field sets are other models, so projections are cached apart, and values serialized
+with ``windows`` (see :mod:`soap.paging`) are cached apart for each set of windows.
+
+Cached values are shared between calls, and mustn't be changed.  Any object with the same
+``get``, ``set`` and ``invalidate`` methods as :class:`LRUCache` can be used instead, e.g.
+one backed by memcached, in which case the keys have to be turned into strings.
+"""
+from collections import OrderedDict
+import sys
+
+from soap import (
+    allocate_lock,
+    string_types,
+    SchemaModel,
+    _frozen,
+)
+
+
+def model_key(schema):
+    """ The name a model is cached under. """
+    if schema.__class__ is SchemaModel:
+        return schema.name
+    cls = schema if isinstance(schema, type) else schema.__class__
+    return '%s.%s' % (cls.__module__, cls.__name__)
+
+
+def serialize(schema, value, depth, mapping, node, model):
+    """ Serializes ``value`` with the SchemaModel ``schema`` like
+        :meth:`soap.SchemaNode.serialize` would, through ``model.cache``. """
+
+    cache = model.cache
+    identity = schema.identity
+    key = identity(value) if callable(identity) else value.get(identity)
+    if key is None:
+        return schema._type.serialize(value, depth, mapping, node, model)
+
+    version = schema.version
+    if version is not None:
+        version = version(value) if callable(version) else value.get(version)
+    key = (model_key(schema), model.max_depth - depth, key, version)
+    if model.windows:
+        # the windows of the relationships under the value change what it serializes to
+        key += (_frozen(model.windows),)
+
+    serialized = cache.get(key)
+    if serialized is None:
+        serialized = schema._type.serialize(value, depth, mapping, node, model)
+        cache.set(key, serialized)
+    return serialized
+
+
+class LRUCache(object):
+    """ An in-process cache of at most ``maxsize`` serialized values, which forgets the least
+        recently used ones first. """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        # (model, identity) -> the keys of all its cached values
+        self.objects = {}
+        self.lock = allocate_lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+            self.entries[key] = value
+            self.objects.setdefault((key[0], key[2]), set()).add(key)
+            while len(self.entries) > self.maxsize:
+                old, _ = self.entries.popitem(last=False)
+                self._forget(old)
+
+    def _forget(self, key):
+        keys = self.objects.get((key[0], key[2]))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.objects[(key[0], key[2])]
+
+    def invalidate(self, model, identity):
+        """ Removes every cached value of the object ``identity`` of ``model``, a
+            SchemaModel or its name as in :func:`model_key`. """
+
+        name = model if isinstance(model, string_types) else model_key(model)
+        with self.lock:
+            for key in self.objects.pop((name, identity), ()):
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.objects.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def memory(self):
+        """ Estimates the bytes used by the cached values.  This walks all of them, so it's
+            meant for monitoring, not for every request. """
+
+        with self.lock:
+            values = list(self.entries.values())
+        seen = set()
+        return sum(sizeof(value, seen) for value in values)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+            'memory': self.memory(),
+        }
+
+
+def sizeof(value, seen):
+    """ The size of ``value`` and everything in it, not counting what's in ``seen``. """
+
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sizeof(key, seen) + sizeof(item, seen)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += sizeof(item, seen)
+    return size
@@ -0,0 +1,213 @@
+""" The ``python -m soap`` command line.
+
+.. code-block:: console
+
+   python -m soap validate myapp.schemas:UserSchema users.ndjson \\
+       --workers 4 --valid valid.ndjson --errors errors.ndjson
+
+``validate`` deserializes every record in an NDJSON or CSV file with a
+:class:`soap.SchemaModel`, writes the valid records and the errors, as
+``{"line": ..., "errors": Invalid.asdict()}``, to separate NDJSON files, and prints the
+throughput and error counts when it's done.  The file is read in batches, and with
+``--workers`` the batches are validated by a pool of processes, with only a few batches in
+flight at a time, so memory use doesn't depend on the size of the file.  The exit status
+is 1 if any record was invalid.
+
+Empty CSV cells are treated as missing fields.
+"""
+import argparse
+import collections
+import csv
+import io
+import json
+import sys
+import time
+
+from soap import Invalid
+
+# the schema the current process validates with, see load()
+_schema = None
+
+
+def load(target):
+    """ Imports the SchemaModel named by ``target``, as ``module:SchemaName``, and makes
+        it the schema for this process. """
+
+    import importlib
+
+    global _schema
+    module, _, name = target.partition(':')
+    if not module or not name:
+        raise ValueError('%r is not of the form module:SchemaName' % target)
+
+    schema = getattr(importlib.import_module(module), name)
+    if isinstance(schema, type):
+        schema = schema()
+    _schema = schema
+    return schema
+
+
+def validate(record):
+    """ Returns None if ``record`` is valid, or the errors if it isn't. """
+    try:
+        _schema.deserialize(record)
+    except Invalid as e:
+        return e.asdict()
+    return None
+
+
+def validate_batch(batch):
+    """ Validates a list of (line, record) pairs, where a record is either the raw NDJSON
+        line or the dict of a CSV row, and returns a (line, record, errors) triple for
+        each, with the record as a line of JSON. """
+
+    results = []
+    for line, record in batch:
+        if isinstance(record, dict):
+            raw = json.dumps(record, sort_keys=True)
+        else:
+            raw = record.rstrip('\r\n')
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                results.append((line, raw, ['Not valid JSON: %s' % e]))
+                continue
+        results.append((line, raw, validate(record)))
+    return results
+
+
+def read_ndjson(path):
+    handle = sys.stdin if path == '-' else io.open(path, encoding='utf-8')
+    try:
+        for num, raw in enumerate(handle, 1):
+            if raw.strip():
+                yield num, raw
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def read_csv(path):
+    if path == '-':
+        handle = sys.stdin
+    elif sys.version_info[0] < 3:
+        handle = open(path, 'rb')
+    else:
+        handle = io.open(path, encoding='utf-8', newline='')
+    try:
+        # the header is line 1
+        for num, row in enumerate(csv.DictReader(handle), 2):
+            yield num, dict((key, value) for key, value in row.items() if value != '')
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_batches(target, batch_iter, workers):
+    """ Yields the results of every batch, in order.  With more than one worker, at most
+        two batches per worker are queued up at any time. """
+
+    if workers <= 1:
+        load(target)
+        for batch in batch_iter:
+            yield validate_batch(batch)
+        return
+
+    import multiprocessing
+
+    pool = multiprocessing.Pool(workers, load, (target,))
+    try:
+        pending = collections.deque()
+        for batch in batch_iter:
+            pending.append(pool.apply_async(validate_batch, (batch,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def open_output(path):
+    if path is None:
+        return None
+    if path == '-':
+        return sys.stdout
+    return io.open(path, 'w', encoding='utf-8')
+
+
+def command_validate(args, out=None):
+    out = out or sys.stderr
+    fmt = args.format
+    if fmt is None:
+        fmt = 'csv' if args.input.lower().endswith('.csv') else 'ndjson'
+    records = read_csv(args.input) if fmt == 'csv' else read_ndjson(args.input)
+
+    # fail early if the schema can't be loaded, rather than in every worker
+    load(args.target)
+
+    valid_out = open_output(args.valid)
+    errors_out = open_output(args.errors)
+    total = invalid = 0
+    fields = collections.Counter()
+    start = time.time()
+    try:
+        for results in run_batches(args.target, batches(records, args.batch_size), args.workers):
+            for line, raw, errors in results:
+                total += 1
+                if errors is None:
+                    if valid_out is not None:
+                        valid_out.write(u'%s\n' % raw)
+                    continue
+
+                invalid += 1
+                if isinstance(errors, dict):
+                    fields.update(errors.keys())
+                if errors_out is not None:
+                    errors_out.write(u'%s\n' % json.dumps({'line': line, 'errors': errors},
+                                                          sort_keys=True))
+    finally:
+        for handle in (valid_out, errors_out):
+            if handle is not None and handle is not sys.stdout:
+                handle.close()
+
+    elapsed = time.time() - start
+    out.write('%d records in %.2fs (%.0f records/s), %d valid, %d invalid (%.2f%%)\n' % (
+        total, elapsed, total / elapsed if elapsed else 0, total - invalid, invalid,
+        100.0 * invalid / total if total else 0))
+    for name, count in fields.most_common(10):
+        out.write('  %s: %d\n' % (name, count))
+    return 1 if invalid else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m soap')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    validate_parser = commands.add_parser(
+        'validate', help='validate an NDJSON or CSV file against a SchemaModel')
+    validate_parser.add_argument('target', help='the schema, as module:SchemaName')
+    validate_parser.add_argument('input', help='the file to validate, or - for stdin')
+    validate_parser.add_argument('--format', choices=('ndjson', 'csv'), default=None,
+                                 help='defaults to csv for .csv files, ndjson otherwise')
+    validate_parser.add_argument('--workers', type=int, default=1)
+    validate_parser.add_argument('--batch-size', type=int, default=1000)
+    validate_parser.add_argument('--valid', help='where to write the valid records')
+    validate_parser.add_argument('--errors', help='where to write the errors')
+    validate_parser.set_defaults(func=command_validate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
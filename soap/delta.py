@@ -0,0 +1,227 @@
+""" Serializing only what changed between two values.
+
+:meth:`soap.SchemaNode.serialize_delta` walks the schema over an old and a new value
+together, and returns a list of operations that turn what ``serialize`` returned for the
+old value into what it returns for the new one:
+
+.. code-block:: python
+
+   >>> TestSchema().serialize_delta(old, new)
+   [{'op': 'replace', 'path': ['name'], 'value': 'bob'},
+    {'op': 'remove', 'path': ['children', {'id': 2}]},
+    {'op': 'add', 'path': ['children', {'id': 4}], 'value': {'id': 4, 'name': 'new'}},
+    {'op': 'order', 'path': ['children'], 'key': 'id', 'value': [1, 4]}]
+
+A path is a list of field names, list indexes, and ``{field: identity}`` segments for the
+element of a list with that identity.  The elements of a :class:`soap.Relationship` list
+whose model's ``identity`` is a field name are matched by identity, so an element that
+moved isn't sent again; every other list is compared index by index, with ``add`` and
+``remove`` at its end.  ``order`` gives the identities of a list in their new order,
+whenever they changed.  :func:`apply` applies the operations to a serialized value.
+
+A subtree isn't serialized at all when it is provably unchanged: when the old and new
+values are the same object or are equal, or are values of a SchemaModel with a
+``version`` (see :mod:`soap.caching`) whose identity and version didn't change.
+Everything else is serialized on both sides, and compared.  With ``serialized=True``,
+the old value is what ``serialize`` returned earlier, and only the new value is
+serialized.
+"""
+import copy
+
+from soap import (
+    Mapping,
+    Sequence,
+    Relationship,
+    Polymorphic,
+    SchemaModel,
+)
+
+
+class Delta(object):
+    def __init__(self, model, serialized=False):
+        self.model = model
+        self.serialized = serialized
+        self.ops = []
+
+    def unchanged(self, old, new):
+        if self.serialized:
+            return False
+        try:
+            return old is new or old == new
+        except Exception:
+            return False
+
+    def replace(self, node, old, new, depth, mapping, path):
+        """ Serializes ``new``, and the old value too unless it already is, and records a
+            replace if they differ. """
+
+        serialized = node.serialize(new, depth, mapping=mapping, model=self.model)
+        if not self.serialized:
+            old = node.serialize(old, depth, mapping=mapping, model=self.model)
+        if old != serialized:
+            self.ops.append({'op': 'replace', 'path': path, 'value': serialized})
+
+    def node(self, node, old, new, depth, mapping, path):
+        if self.unchanged(old, new):
+            return
+
+        _type = node._type
+        if isinstance(_type, Mapping):
+            self.mapping(node, old, new, depth, path)
+        elif isinstance(_type, Relationship):
+            self.relationship(node, old, new, depth, mapping, path)
+        elif isinstance(_type, Polymorphic):
+            self.polymorphic(node, old, new, depth, mapping, path)
+        elif isinstance(_type, Sequence) and _type.output is None and old and new:
+            self.sequence(node, node.children[0], old, new, depth, path)
+        else:
+            self.replace(node, old, new, depth, mapping, path)
+
+    def mapping(self, node, old, new, depth, path):
+        if not old or not new:
+            self.replace(node, old, new, depth, new, path)
+            return
+        if (not self.serialized and isinstance(node, SchemaModel) and node.version is not None and
+                identify(node, old) == identify(node, new) is not None and
+                version(node, old) == version(node, new)):
+            return
+
+        for child in node.children:
+            name = child.name
+            self.node(child, old.get(name), new.get(name), depth, new, path + [name])
+
+    def sequence(self, node, child, old, new, depth, path):
+        model = self.model
+        for num in range(min(len(old), len(new))):
+            self.node(child, old[num], new[num], depth, new[num], path + [num])
+        for num in range(len(old), len(new)):
+            value = child.serialize(new[num], depth, mapping=new[num], model=model)
+            self.ops.append({'op': 'add', 'path': path + [num], 'value': value})
+        for num in range(len(old) - 1, len(new) - 1, -1):
+            self.ops.append({'op': 'remove', 'path': path + [num]})
+
+    def relationship(self, node, old, new, depth, mapping, path):
+        relationship = node._type
+        if depth >= self.model.max_depth:
+            # both serialize to an empty list or dict
+            return
+        depth += 1
+
+        schema_model = relationship.resolve(node, self.model)
+        if not relationship.uselist:
+            self.mapping(schema_model, old, new, depth, path)
+            return
+
+        child = schema_model.children[0]
+        if not old or not new:
+            self.replace(schema_model, old or [], new or [], depth, mapping, path)
+            return
+
+        key = child.identity
+        old_keys = keys(key, old)
+        new_keys = keys(key, new)
+        if old_keys is None or new_keys is None:
+            self.sequence(schema_model, child, old, new, depth, path)
+            return
+
+        model = self.model
+        old_by_key = dict(zip(old_keys, old))
+        new_set = set(new_keys)
+        for identity in old_keys:
+            if identity not in new_set:
+                self.ops.append({'op': 'remove', 'path': path + [{key: identity}]})
+        for identity, value in zip(new_keys, new):
+            segment = path + [{key: identity}]
+            if identity in old_by_key:
+                self.node(child, old_by_key[identity], value, depth, value, segment)
+            else:
+                serialized = child.serialize(value, depth, mapping=value, model=model)
+                self.ops.append({'op': 'add', 'path': segment, 'value': serialized})
+        if old_keys != new_keys:
+            self.ops.append({'op': 'order', 'path': path, 'key': key, 'value': new_keys})
+
+    def polymorphic(self, node, old, new, depth, mapping, path):
+        polymorphic = node._type
+        if old and new:
+            old_key = old.get(polymorphic.discriminator)
+            new_key = new.get(polymorphic.discriminator)
+            if old_key == new_key and new_key in polymorphic.choices:
+                schema_model = polymorphic.select(new, node, self.model)
+                self.mapping(schema_model, old, new, depth, path)
+                return
+        self.replace(node, old, new, depth, mapping, path)
+
+
+def identify(schema, value):
+    identity = schema.identity
+    return identity(value) if callable(identity) else value.get(identity)
+
+
+def version(schema, value):
+    version = schema.version
+    return version(value) if callable(version) else value.get(version)
+
+
+def keys(key, values):
+    """ Returns the identities of ``values``, or None if they can't be matched by them. """
+
+    if callable(key):
+        return None
+    identities = []
+    for value in values:
+        identity = value.get(key) if value else None
+        if identity is None:
+            return None
+        identities.append(identity)
+    if len(set(identities)) != len(identities):
+        return None
+    return identities
+
+
+def serialize_delta(schema, old, new, model, serialized=False):
+    delta = Delta(model, serialized)
+    delta.node(schema, old, new, 0, new, [])
+    return delta.ops
+
+
+def find(document, segment):
+    """ Returns the index or key in ``document`` that the path ``segment`` stands for. """
+
+    if isinstance(segment, dict):
+        (key, identity), = segment.items()
+        for num, value in enumerate(document):
+            if value.get(key) == identity:
+                return num
+        raise KeyError(segment)
+    return segment
+
+
+def apply(document, ops):
+    """ Returns a copy of the serialized value ``document`` with the operations ``ops`` of
+        :meth:`soap.SchemaNode.serialize_delta` applied to it. """
+
+    document = copy.deepcopy(document)
+    for op in ops:
+        path = op['path']
+        if not path:
+            document = copy.deepcopy(op['value'])
+            continue
+
+        parent = document
+        for segment in path[:-1]:
+            parent = parent[find(parent, segment)]
+        last = path[-1]
+        kind = op['op']
+        if kind == 'order':
+            target = parent[find(parent, last)]
+            by_key = dict((value[op['key']], value) for value in target)
+            target[:] = [by_key[identity] for identity in op['value']]
+        elif kind == 'add' and isinstance(last, dict):
+            parent.append(copy.deepcopy(op['value']))
+        elif kind == 'add' and isinstance(parent, list):
+            parent.insert(last, copy.deepcopy(op['value']))
+        elif kind == 'remove':
+            del parent[find(parent, last)]
+        else:
+            parent[find(parent, last)] = copy.deepcopy(op['value'])
+    return document
@@ -0,0 +1,455 @@
+""" A non-recursive implementation of :meth:`soap.SchemaNode.deserialize` and
+:meth:`soap.SchemaNode.serialize`.
+
+The recursive implementation goes through several Python frames for every level of
+nesting, e.g. SchemaNode.deserialize -> Relationship.deserialize -> SchemaNode.deserialize
+-> Sequence.deserialize -> SchemaModel.deserialize -> Mapping.deserialize, so deeply nested
+values run into the recursion limit.  Here the :class:`soap.Mapping`,
+:class:`soap.Sequence`, :class:`soap.Relationship` and :class:`soap.Polymorphic` types are
+unrolled into an explicit stack of frames instead, so the depth of the value doesn't
+matter, and leaves are processed without calling back into
+:meth:`soap.SchemaNode.deserialize`.
+
+The results, and the :class:`soap.Invalid` trees, are identical to the recursive
+implementation.  Any other type (including subclasses of the four above that change
+how they deserialize) is called as usual, and nodes and models whose class overrides
+``deserialize`` or ``serialize`` have the whole of their value handed to that method.
+"""
+from soap import (
+    Mapping,
+    Sequence,
+    Relationship,
+    Polymorphic,
+    SchemaNode,
+    SchemaModel,
+    Invalid,
+    null,
+    falsey,
+    falsey_types,
+)
+
+LEAF = 0
+MAPPING = 1
+SEQUENCE = 2
+RELATIONSHIP = 3
+POLYMORPHIC = 4
+# not a kind of type, but a node or model whose class overrides deserialize or serialize
+OVERRIDDEN = 5
+
+_builtin = {
+    Mapping: MAPPING,
+    Sequence: SEQUENCE,
+    Relationship: RELATIONSHIP,
+    Polymorphic: POLYMORPHIC,
+}
+_kinds = {}
+_overrides = {}
+
+
+def _function(cls, name):
+    method = getattr(cls, name)
+    return getattr(method, '__func__', method)
+
+
+def kind(_type):
+    """ Returns how the engine handles ``_type``: unrolled if it's a Mapping, Sequence,
+        Relationship or Polymorphic (or a subclass that deserializes and serializes the same
+        way), and as a leaf otherwise. """
+
+    cls = _type.__class__
+    try:
+        return _kinds[cls]
+    except KeyError:
+        pass
+
+    result = LEAF
+    for base, base_kind in _builtin.items():
+        if (issubclass(cls, base) and
+                _function(cls, 'deserialize') is _function(base, 'deserialize') and
+                _function(cls, 'serialize') is _function(base, 'serialize')):
+            result = base_kind
+    # the result only depends on the class, so it doesn't matter if threads race here
+    _kinds[cls] = result
+    return result
+
+
+def overrides(node):
+    """ Returns whether the class of ``node`` overrides ``SchemaNode.deserialize`` or
+        ``SchemaNode.serialize``, in which case the engine calls them instead of going
+        through the node itself. """
+
+    cls = node.__class__
+    try:
+        return _overrides[cls]
+    except KeyError:
+        pass
+
+    result = (_function(cls, 'deserialize') is not _function(SchemaNode, 'deserialize') or
+              _function(cls, 'serialize') is not _function(SchemaNode, 'serialize'))
+    _overrides[cls] = result
+    return result
+
+
+def deserialize(schema, value, mapping, node, model):
+    """ Deserializes ``value`` with ``schema``, like ``schema.deserialize(value, mapping,
+        node, model)`` would. """
+
+    budget = model._budget
+    records = model.records
+    kinds = _kinds
+    overridden = _overrides
+    node = node if node else schema
+    stack = []
+
+    while True:
+        # Start deserializing ``value`` with ``schema``, pretending to be ``node``.  Leaves
+        # are done straight away, the other types push a frame of
+        # [kind, schema, node, mapping, children, child, deserialized, exc, ...].
+        mapping = mapping if mapping else value
+
+        _type = schema._type
+        _kind = kinds.get(_type.__class__)
+        if _kind is None:
+            _kind = kind(_type)
+        # the first node is the one whose deserialize called the engine
+        if stack:
+            custom = overridden.get(schema.__class__)
+            if custom is None:
+                custom = overrides(schema)
+            if custom:
+                _kind = OVERRIDDEN
+
+        if budget is not None and _kind != OVERRIDDEN:
+            budget.visit(node)
+
+        frame = None
+        error = None
+        try:
+            if _kind == OVERRIDDEN:
+                # its deserialize does the preparers and validators as well
+                result = schema.deserialize(value, mapping=mapping, model=model)
+            elif _kind == LEAF or _kind == SEQUENCE and _type.output is not None:
+                result = _type.deserialize(value, mapping, node, model)
+            elif _kind == MAPPING:
+                validated = _type.validate(value, mapping, node, model)
+                frame = [MAPPING, schema, node, mapping, iter(node.children), None, {}, None,
+                         validated]
+            elif _kind == SEQUENCE:
+                validated = _type.validate(value, mapping, node, model)
+                child = node.children[0]
+                if budget is not None and budget.max_items is not None:
+                    budget.check_items(validated, node)
+                frame = [SEQUENCE, schema, node, mapping, iter(validated), child, [], None,
+                         -1, None]
+            else:
+                # relationships and polymorphics both hand their value over to a model
+                if _kind == RELATIONSHIP:
+                    schema_model = _type.resolve(node, model)
+                else:
+                    schema_model = _type.select(value, node, model)
+                if budget is not None:
+                    budget.enter(node)
+                frame = [RELATIONSHIP, schema, node, mapping, False, schema_model, None, None,
+                         value]
+        except Invalid as e:
+            error = e
+
+        # frames only go on the stack once they have a child to wait for
+        pushed = False
+
+        # Either advance the frame on top of the stack to its next child that isn't a
+        # leaf, or hand the result of the node that was just finished to its parent, until
+        # there's another child to start on.  Leaves are deserialized in place, which is
+        # the same as what SchemaNode.deserialize does, minus the function calls.
+        while True:
+            if frame is not None:
+                _kind = frame[0]
+                if _kind == MAPPING:
+                    validated = frame[8]
+                    deserialized = frame[6]
+                    parent_mapping = frame[3]
+                    for child in frame[4]:
+                        value = validated.get(child.name, None)
+                        if value is None:
+                            if child.missing is not null:
+                                deserialized[child.name] = child.missing
+                                continue
+                            error = Invalid('The field named \'%s\' is missing.' % child.name, child)
+                        else:
+                            _type = child._type
+                            _kind = kinds.get(_type.__class__)
+                            if _kind is None:
+                                _kind = kind(_type)
+                            if _kind != LEAF or overridden.get(child.__class__, True):
+                                break
+
+                            mapping = parent_mapping if parent_mapping else value
+                            if budget is not None:
+                                budget.visit(child)
+                            try:
+                                result = _type.deserialize(value, mapping, child, model)
+                                if (child.preparer or child.validator or
+                                        isinstance(result, falsey_types) and result in falsey):
+                                    result = child._finish(result, mapping, child, model)
+                                deserialized[child.name] = result
+                                continue
+                            except Invalid as e:
+                                error = e
+
+                        if frame[7] is None:
+                            frame[7] = Invalid('Mapping Errors', frame[2])
+                        frame[7].add(error)
+                        error = None
+                    else:
+                        child = None
+
+                    if child is not None:
+                        frame[5] = child
+                        schema = node = child
+                        mapping = parent_mapping
+                        break
+
+                elif _kind == SEQUENCE:
+                    child = frame[5]
+                    if frame[9] is None:
+                        # whether the children are leaves that can be done in place
+                        frame[9] = kind(child._type) == LEAF and not overrides(child)
+                    if frame[9]:
+                        _type = child._type
+                        deserialized = frame[6]
+                        num = frame[8]
+                        for value in frame[4]:
+                            num += 1
+                            if budget is not None:
+                                budget.visit(child)
+                            try:
+                                result = _type.deserialize(value, value, child, model)
+                                if (child.preparer or child.validator or
+                                        isinstance(result, falsey_types) and result in falsey):
+                                    result = child._finish(result, value, child, model)
+                                deserialized.append(result)
+                            except Invalid as e:
+                                if frame[7] is None:
+                                    frame[7] = Invalid('Sequence Errors', frame[2])
+                                frame[7].add(e, num)
+                        frame[8] = num
+                    else:
+                        for value in frame[4]:
+                            frame[8] += 1
+                            schema = node = child
+                            mapping = value
+                            break
+                        else:
+                            child = None
+                        if child is not None:
+                            break
+
+                elif not frame[4]:
+                    # a relationship that hasn't started on its model yet
+                    frame[4] = True
+                    schema = node = frame[5]
+                    value = mapping = frame[8]
+                    break
+
+                # the frame has run out of children
+                if pushed:
+                    stack.pop()
+                schema = frame[1]
+                node = frame[2]
+                mapping = frame[3]
+                if _kind == RELATIONSHIP:
+                    if budget is not None:
+                        budget.nesting -= 1
+                    result = frame[6]
+                    error = frame[7]
+                elif frame[7] is not None:
+                    error = frame[7]
+                else:
+                    result = frame[6]
+                frame = None
+
+            # ``schema`` is done, unless its type failed, run the preparers and validators
+            if _kind == OVERRIDDEN:
+                pass
+            elif error is None and (schema.preparer or schema.validator or
+                                    isinstance(result, falsey_types) and result in falsey):
+                try:
+                    result = schema._finish(result, mapping, node, model)
+                except Invalid as e:
+                    error = e
+
+            if (records and error is None and _kind != OVERRIDDEN and type(result) is dict and
+                    isinstance(schema, SchemaModel)):
+                result = schema.record_class().from_dict(result)
+
+            if not stack:
+                if error is not None:
+                    raise error
+                return result
+
+            # hand the result over to the parent
+            frame = stack[-1]
+            pushed = True
+            _kind = frame[0]
+            if _kind == RELATIONSHIP:
+                frame[6] = result if error is None else None
+                frame[7] = error
+            elif error is not None:
+                if _kind == MAPPING:
+                    if frame[7] is None:
+                        frame[7] = Invalid('Mapping Errors', frame[2])
+                    frame[7].add(error)
+                else:
+                    if frame[7] is None:
+                        frame[7] = Invalid('Sequence Errors', frame[2])
+                    frame[7].add(error, frame[8])
+            elif _kind == MAPPING:
+                frame[6][frame[5].name] = result
+            else:
+                frame[6].append(result)
+            error = None
+
+        if not pushed:
+            stack.append(frame)
+
+
+def serialize(schema, value, depth, mapping, node, model):
+    """ Serializes ``value`` with ``schema``, like ``schema.serialize(value, depth, mapping,
+        node, model)`` would. """
+
+    kinds = _kinds
+    overridden = _overrides
+    max_depth = model.max_depth
+    node = node if node else schema
+    stack = []
+    # the first node is the one whose serialize called the engine
+    first = True
+
+    while True:
+        mapping = mapping if mapping else value
+
+        _type = schema._type
+        _kind = kinds.get(_type.__class__)
+        if _kind is None:
+            _kind = kind(_type)
+        if not first:
+            custom = overridden.get(schema.__class__)
+            if custom is None:
+                custom = overrides(schema)
+            if custom:
+                _kind = OVERRIDDEN
+        first = False
+
+        if (_kind == RELATIONSHIP and depth < max_depth and (model._batch is not None or
+                _type.uselist and (_type.limit is not None or model.windows))):
+            # a windowed relationship serializes into a page, and a batch loaded one is
+            # filled in later
+            _kind = LEAF
+
+        if _kind == RELATIONSHIP and depth < max_depth:
+            # a relationship's result is whatever its model serializes to, so there's no
+            # need for a frame, just go straight on to the model
+            schema = node = _type.resolve(node, model)
+            mapping = value
+            depth += 1
+            continue
+
+        if _kind == POLYMORPHIC:
+            if value is not None:
+                try:
+                    schema = node = _type.select(value, node, model)
+                except Invalid as e:
+                    raise ValueError(e.msg)
+                mapping = value
+                continue
+            _kind = LEAF
+
+        # frames are [kind, children, child, serialized, depth, ...]
+        frame = None
+        if _kind == OVERRIDDEN:
+            result = schema.serialize(value, depth, mapping=mapping, model=model)
+        elif _kind == LEAF or _kind == SEQUENCE and _type.output is not None:
+            result = _type.serialize(value, depth, mapping, node, model)
+        elif _kind == MAPPING:
+            # 'value' is None when a non-list relationship is empty
+            if value:
+                frame = [MAPPING, iter(node.children), None, {}, depth, mapping, value]
+            else:
+                result = {}
+        elif _kind == SEQUENCE:
+            child = node.children[0]
+            frame = [SEQUENCE, iter(value), child, [], depth, None]
+        elif _type.uselist:
+            result = []
+        else:
+            result = {}
+
+        # frames only go on the stack once they have a child to wait for
+        pushed = False
+
+        while True:
+            if frame is not None:
+                _kind = frame[0]
+                if _kind == MAPPING:
+                    serialized = frame[3]
+                    parent = frame[6]
+                    parent_mapping = frame[5]
+                    depth = frame[4]
+                    for child in frame[1]:
+                        value = parent.get(child.name)
+                        _type = child._type
+                        _kind = kinds.get(_type.__class__)
+                        if _kind is None:
+                            _kind = kind(_type)
+                        if _kind != LEAF or overridden.get(child.__class__, True):
+                            break
+                        mapping = parent_mapping if parent_mapping else value
+                        serialized[child.name] = _type.serialize(value, depth, mapping, child, model)
+                    else:
+                        child = None
+
+                    if child is not None:
+                        frame[2] = child
+                        schema = node = child
+                        mapping = parent_mapping
+                        break
+                    result = serialized
+
+                elif _kind == SEQUENCE:
+                    child = frame[2]
+                    depth = frame[4]
+                    if frame[5] is None:
+                        # whether the children are leaves that can be done in place
+                        frame[5] = kind(child._type) == LEAF and not overrides(child)
+                    if frame[5]:
+                        _type = child._type
+                        serialized = frame[3]
+                        for value in frame[1]:
+                            serialized.append(_type.serialize(value, depth, value, child, model))
+                    else:
+                        for value in frame[1]:
+                            schema = node = child
+                            mapping = value
+                            break
+                        else:
+                            child = None
+                        if child is not None:
+                            break
+                    result = frame[3]
+
+                if pushed:
+                    stack.pop()
+                frame = None
+
+            if not stack:
+                return result
+
+            frame = stack[-1]
+            pushed = True
+            if frame[0] == MAPPING:
+                frame[3][frame[2].name] = result
+            else:
+                frame[3].append(result)
+
+        if not pushed:
+            stack.append(frame)
@@ -0,0 +1,252 @@
+""" A static report of what a schema does at runtime.
+
+:meth:`soap.SchemaNode.explain` walks a schema the way ``serialize`` does, without a
+value: every field of every model, after :class:`soap.SchemaModelMeta` collected them from
+the class and its bases, the models :class:`soap.Relationship` fields expand into until
+``max_depth``, and every choice of a :class:`soap.Polymorphic` field:
+
+.. code-block:: python
+
+   >>> print(UserSchema().explain(shape={'posts': 50}))
+   UserSchema: max_depth 2, about 1152 node visits
+   path                        type                         depth  validators  preparers  visits  notes
+   id                          Int                              0           0          0       1
+   posts                       Relationship(PostSchema)         0           0          0       1  fans out x50
+   posts.*.id                  Int                              1           0          0      50
+   posts.*.title               String                           1           1          0      50
+   posts.*.comments            Relationship(CommentSchema)      1           0          0      50  fans out x10
+   posts.*.comments.*.id       Int                              2           0          0     500
+   posts.*.comments.*.replies  Relationship(CommentSchema)      2           0          0     500  not expanded, max_depth
+   warning: CommentSchema expands into itself about 10 times per level through CommentSchema.replies, ...
+
+``shape`` gives the expected length of lists by path (``'posts.*.tags'``) or by field
+name, and lists that aren't in it are estimated at ``length`` elements.  ``visits`` is
+how many times a node would be processed for a value of that shape, counting every choice
+of a Polymorphic as if each one were chosen.
+
+Relationships that lead back to a model that is already being expanded are recursive,
+whether or not ``max_depth`` lets them expand.  If one expansion of the model leads to
+more than one of it again, through a list or through several relationships, the visits
+grow exponentially with ``max_depth``, and the report warns about it.  Deserializing
+isn't limited by ``max_depth``, it goes as deep as the value does.  The report also warns
+about fields of a SchemaModel base class that its subclass doesn't have, and about
+relationships that don't resolve.
+"""
+from soap import (
+    Mapping,
+    Sequence,
+    Relationship,
+    Polymorphic,
+    SchemaModel,
+)
+
+
+def label(schema):
+    """ Returns the name of the model ``schema`` is an instance of. """
+    cls = schema.__class__
+    return schema.name if cls is SchemaModel else cls.__name__
+
+
+def count(functions):
+    if not functions:
+        return 0
+    return len(functions) if type(functions) is list else 1
+
+
+def defined_in(schema, child):
+    """ Returns the name of the class of ``schema`` that defines the field ``child``. """
+
+    cls = schema.__class__
+    if cls is SchemaModel:
+        return schema.name
+    for base in cls.__mro__[1:]:
+        if any(value is child for value in base.__dict__.values()):
+            return base.__name__
+    return cls.__name__
+
+
+class Explanation(object):
+    """ The report :meth:`soap.SchemaNode.explain` returns.  ``nodes`` is a list of dicts, one
+        per node in the order they are visited, and ``warnings`` a list of strings. """
+
+    def __init__(self, schema, model, max_depth, shape, length):
+        self.name = label(schema)
+        self.model = model
+        self.max_depth = max_depth
+        self.shape = shape or {}
+        self.length = length
+        self.nodes = []
+        self.warnings = []
+        # recursive model -> {id(node): (path, growth)} of the nodes that lead back into it,
+        # growth being how many times it's expanded again per expansion
+        self.cycles = {}
+
+        self.inherited(schema)
+        self.walk(schema, [], 0, [(label(schema), 1)], 1)
+        self.check_cycles()
+
+    @property
+    def visits(self):
+        return sum(node['visits'] for node in self.nodes)
+
+    def lengthof(self, path, name):
+        key = '.'.join(path)
+        if key in self.shape:
+            return self.shape[key]
+        return self.shape.get(name, self.length)
+
+    def inherited(self, schema):
+        """ Warns about the fields of SchemaModel bases that ``schema`` lost. """
+
+        cls = schema.__class__
+        names = set(child.name for child in schema.children)
+        for base in cls.__mro__[1:]:
+            if isinstance(base, type) and issubclass(base, SchemaModel) and base is not SchemaModel:
+                lost = [child.name for child in base.children if child.name not in names]
+                if lost:
+                    self.warnings.append('%s does not have the fields %s of its base %s' % (
+                        cls.__name__, ', '.join(lost), base.__name__))
+
+    def add(self, node, path, depth, visits, **notes):
+        entry = {
+            'path': '.'.join(path),
+            'type': node._type.__class__.__name__,
+            'depth': depth,
+            'required': node.required,
+            'validators': count(node.validator),
+            'preparers': count(node.preparer),
+            'visits': visits,
+        }
+        entry.update(notes)
+        self.nodes.append(entry)
+        return entry
+
+    def walk(self, schema, path, depth, models, visits):
+        for child in schema.children:
+            entry = self.add(child, path + [child.name], depth, visits)
+            if isinstance(schema, SchemaModel):
+                entry['model'] = label(schema)
+                entry['defined_in'] = defined_in(schema, child)
+            self.node(child, entry, path + [child.name], depth, models, visits)
+
+    def node(self, node, entry, path, depth, models, visits):
+        _type = node._type
+        if isinstance(_type, Relationship):
+            self.relationship(node, entry, path, depth, models, visits)
+        elif isinstance(_type, Polymorphic):
+            self.polymorphic(node, entry, path, depth, models, visits)
+        elif isinstance(_type, Sequence):
+            length = self.lengthof(path, node.name)
+            entry['fans_out'] = length
+            element = node.children[0]
+            child_entry = self.add(element, path + ['*'], depth, visits * length)
+            self.node(element, child_entry, path + ['*'], depth, models, visits * length)
+        elif isinstance(_type, Mapping):
+            self.walk(node, path, depth, models, visits)
+
+    def recursive(self, node, entry, name, models, visits):
+        """ Returns True and notes the cycle if the model ``name`` is already being expanded,
+            ``visits`` being how often ``node`` would expand it again. """
+
+        for ancestor, ancestor_visits in reversed(models):
+            if ancestor == name:
+                edges = self.cycles.setdefault(name, {})
+                if id(node) not in edges:
+                    edges[id(node)] = ('%s.%s' % (models[-1][0], node.name),
+                                       visits / float(ancestor_visits))
+                return True
+        return False
+
+    def relationship(self, node, entry, path, depth, models, visits):
+        relationship = node._type
+        entry['type'] = 'Relationship(%s)' % relationship.name
+        try:
+            schema_model = relationship.resolve(node, self.model)
+        except KeyError:
+            self.warnings.append('%s points to %s, which is not registered' % (
+                entry['path'], relationship.name))
+            return
+
+        length = 1
+        if relationship.uselist:
+            length = self.lengthof(path, node.name)
+            if relationship.limit is not None:
+                length = min(length, relationship.limit)
+            path = path + ['*']
+            schema_model = schema_model.children[0]
+
+        # recursion is noted even past max_depth, as it only takes a bigger one to get there
+        name = label(schema_model)
+        self.recursive(node, entry, name, models, visits * length)
+        if depth >= self.max_depth:
+            entry['notes'] = 'not expanded, max_depth'
+            return
+
+        if relationship.uselist:
+            entry['fans_out'] = length
+        visits *= length
+        self.walk(schema_model, path, depth + 1, models + [(name, visits)], visits)
+
+    def polymorphic(self, node, entry, path, depth, models, visits):
+        polymorphic = node._type
+        entry['type'] = 'Polymorphic(%s)' % polymorphic.discriminator
+        for key in sorted(polymorphic.choices, key=str):
+            try:
+                schema_model = polymorphic.select({polymorphic.discriminator: key}, node,
+                                                  self.model)
+            except KeyError:
+                self.warnings.append('%s points to %s, which is not registered' % (
+                    entry['path'], polymorphic.choices[key]))
+                continue
+            name = label(schema_model)
+            if self.recursive(node, entry, name, models, visits):
+                # nothing but the value stops a polymorphic value from nesting
+                entry['notes'] = 'recursive, %s' % name
+                continue
+            self.walk(schema_model, path + ['<%s>' % key], depth, models + [(name, visits)],
+                      visits)
+
+    def check_cycles(self):
+        for name in sorted(self.cycles):
+            edges = self.cycles[name].values()
+            growth = sum(edge_growth for path, edge_growth in edges)
+            if growth > 1:
+                self.warnings.append(
+                    '%s expands into itself about %g times per level through %s, so its '
+                    'visits grow exponentially with the depth it is expanded to' % (
+                        name, growth, ', '.join(sorted(path for path, _ in edges))))
+
+    def asdict(self):
+        return {
+            'name': self.name,
+            'max_depth': self.max_depth,
+            'visits': self.visits,
+            'nodes': self.nodes,
+            'warnings': self.warnings,
+        }
+
+    def __str__(self):
+        rows = [('path', 'type', 'depth', 'validators', 'preparers', 'visits', 'notes')]
+        for node in self.nodes:
+            notes = []
+            if node.get('defined_in', node.get('model')) != node.get('model'):
+                notes.append('from %s' % node['defined_in'])
+            if 'fans_out' in node:
+                notes.append('fans out x%s' % node['fans_out'])
+            if 'notes' in node:
+                notes.append(node['notes'])
+            rows.append((node['path'], node['type'], str(node['depth']),
+                         str(node['validators']), str(node['preparers']),
+                         str(node['visits']), ', '.join(notes)))
+
+        widths = [max(len(row[num]) for row in rows) for num in range(len(rows[0]))]
+        lines = ['%s: max_depth %s, about %s node visits' % (self.name, self.max_depth,
+                                                              self.visits)]
+        for row in rows:
+            lines.append('  '.join(cell.ljust(width) if num < 2 else cell.rjust(width)
+                                   for num, (cell, width) in enumerate(zip(row, widths))
+                                   if num < 6) + ('  ' + row[6] if row[6] else ''))
+        lines.extend('warning: %s' % warning for warning in self.warnings)
+        return '\n'.join(line.rstrip() for line in lines)
+
+    __repr__ = __str__
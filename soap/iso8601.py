@@ -0,0 +1,107 @@
+""" ISO 8601 date parsing, used by :class:`soap.DateTime`.
+
+This is a drop-in replacement for the ``iso8601`` module that used to be imported
+from colander, so that soap doesn't need to import all of colander just to parse
+dates.  The public names (``parse_date``, ``ParseError``, ``Utc``, ``FixedOffset``
+and ``UTC``) match colander's, and this module is only imported once a
+:class:`soap.DateTime` is actually created.
+"""
+import datetime
+import re
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+ISO8601_REGEX = re.compile(
+    r'(?P<year>[0-9]{4})(-(?P<month>[0-9]{1,2})(-(?P<day>[0-9]{1,2})'
+    r'((?P<separator>.)(?P<hour>[0-9]{2}):(?P<minute>[0-9]{2})'
+    r'(:(?P<second>[0-9]{2})(\.(?P<fraction>[0-9]+))?)?'
+    r'(?P<timezone>Z|(([-+])([0-9]{2}):([0-9]{2})))?)?)?)?'
+)
+TIMEZONE_REGEX = re.compile(r'(?P<prefix>[+-])(?P<hours>[0-9]{2}).(?P<minutes>[0-9]{2})')
+
+ZERO = datetime.timedelta(0)
+
+
+class ParseError(Exception):
+    """ Raised when there is a problem parsing a date string. """
+
+
+class Utc(datetime.tzinfo):
+    """ The UTC timezone. """
+
+    def utcoffset(self, dt):
+        return ZERO
+
+    def tzname(self, dt):
+        return 'UTC'
+
+    def dst(self, dt):
+        return ZERO
+
+    def __repr__(self):
+        return '<soap.iso8601.Utc>'
+
+UTC = Utc()
+
+
+class FixedOffset(datetime.tzinfo):
+    """ A timezone with a fixed offset from UTC, as found at the end of an ISO 8601
+        date string, e.g. '+05:30'. """
+
+    def __init__(self, offset_hours, offset_minutes, name):
+        self.offset = datetime.timedelta(hours=offset_hours, minutes=offset_minutes)
+        self.name = name
+
+    def utcoffset(self, dt):
+        return self.offset
+
+    def tzname(self, dt):
+        return self.name
+
+    def dst(self, dt):
+        return ZERO
+
+    def __repr__(self):
+        return '<soap.iso8601.FixedOffset %r>' % self.name
+
+
+def parse_timezone(tzstring, default_timezone=UTC):
+    """ Parses an ISO 8601 timezone spec into a tzinfo object.  Like colander, 'Z' and
+        a missing timezone both resolve to ``default_timezone``. """
+
+    if tzstring is None or tzstring == 'Z':
+        return default_timezone
+
+    prefix, hours, minutes = TIMEZONE_REGEX.match(tzstring).groups()
+    hours, minutes = int(hours), int(minutes)
+    if prefix == '-':
+        hours = -hours
+        minutes = -minutes
+    return FixedOffset(hours, minutes, tzstring)
+
+
+def parse_date(datestring, default_timezone=UTC):
+    """ Parses an ISO 8601 string into a ``datetime.datetime``.  Strings that only
+        hold a date and no time raise a ``TypeError``, which is the same behavior as
+        colander's version. """
+
+    if not isinstance(datestring, string_types):
+        raise ParseError('Expecting a string %r' % datestring)
+
+    match = ISO8601_REGEX.match(datestring)
+    if not match:
+        raise ParseError('Unable to parse date string %r' % datestring)
+
+    groups = match.groupdict()
+    tz = parse_timezone(groups['timezone'], default_timezone=default_timezone)
+    if groups['fraction'] is None:
+        fraction = 0
+    else:
+        fraction = int(float('0.%s' % groups['fraction']) * 1e6)
+
+    return datetime.datetime(int(groups['year']), int(groups['month']), int(groups['day']),
+                             int(groups['hour']), int(groups['minute']), int(groups['second']),
+                             fraction, tz)
@@ -0,0 +1,259 @@
+""" Decoding JSON and deserializing it with fewer passes over the value.
+
+``schema.deserialize(json.loads(text))`` goes through ``SchemaNode.deserialize``, the
+type's ``deserialize`` and ``_finish`` for every field, even for an int that is already
+an int.  :func:`loads` decodes the text with the ``json`` module's scanner and then
+follows the schema through the value:
+
+.. code-block:: python
+
+   payload = loads(UserSchema(), request.body)
+
+Members that the schema doesn't have are never visited.  The members of SchemaModels,
+Mappings and Sequences are read straight into what ``deserialize`` returns, and leaves
+that already are of the right type and have no preparers or validators, like the ints of
+an :class:`soap.Int` or the booleans of a :class:`soap.Boolean`, are taken as they are.
+Everything else goes through its node's ``deserialize``, so the result, and the
+:class:`soap.Invalid` tree when the value isn't valid, are the same as ``deserialize``
+gives.
+
+Every Invalid in the tree has the ``offset`` of its value in the text, or of the object
+it is missing from.  The offsets are only worked out once there is an error, by scanning
+the text along the paths of the errors.  Text that isn't JSON raises an Invalid for the
+whole schema, with the offset the ``json`` module gives.
+
+A schema with a :class:`soap.Budget` limit, or with ``verify`` set, is deserialized as
+usual after decoding, and so is a value nested deeper than the stack allows for, which
+``deserialize`` handles without recursing if the schema is ``iterative``.
+"""
+import json
+import json.decoder
+import re
+
+from soap import (
+    Budget,
+    Invalid,
+    SchemaModel,
+    null,
+    falsey,
+    falsey_types,
+    engine,
+)
+from soap.binary import NATIVE
+from soap.engine import (
+    LEAF,
+    MAPPING,
+    SEQUENCE,
+    RELATIONSHIP,
+    OVERRIDDEN,
+)
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+POSITION = re.compile(r'\(char (\d+)')
+
+scanstring = json.decoder.scanstring
+# the scanner only keeps state while it runs, so one is shared by every call
+SCAN = json.decoder.JSONDecoder().scan_once
+
+
+def fields(node):
+    """ Returns a list of (name, child, kind, native types, checked, missing) tuples for
+        the children of the Mapping ``node``, cached on whatever holds the children. """
+
+    owner = node if 'children' in node.__dict__ else node.__class__
+    table = owner.__dict__.get('_json_fields')
+    if table is None:
+        table = [(child.name, child, kind_of(child), NATIVE.get(type(child._type)),
+                  bool(child.preparer or child.validator), child.missing)
+                 for child in node.children]
+        setattr(owner, '_json_fields', table)
+    return table
+
+
+def kind_of(node):
+    # nodes and models that override deserialize are leaves, that go through it
+    if engine.overrides(node):
+        return OVERRIDDEN
+    return engine.kind(node._type)
+
+
+def finish(node, value, mapping, model):
+    if node.preparer or node.validator:
+        value = node._finish(value, mapping, node, model)
+    elif (node.required and not model.trusted and isinstance(value, falsey_types) and
+            value in falsey):
+        raise Invalid('%s is required.' % node.name, node)
+    if model.records and type(value) is dict and isinstance(node, SchemaModel):
+        return node.record_class().from_dict(value)
+    return value
+
+
+def deserialize_node(node, value, mapping, model):
+    """ Deserializes the decoded ``value`` with ``node``, like ``node.deserialize``.  Nodes
+        that override ``deserialize``, or whose types do, go through ``node.deserialize``,
+        so the override runs. """
+
+    kind = kind_of(node)
+    if kind == MAPPING:
+        return finish(node, deserialize_mapping(node, value, mapping, model), mapping, model)
+    elif kind == SEQUENCE:
+        return deserialize_sequence(node, value, mapping, model)
+    elif kind == RELATIONSHIP:
+        schema_model = node._type.resolve(node, model)
+        value = deserialize_node(schema_model, value, value, model)
+        return finish(node, value, mapping, model)
+
+    if kind == LEAF and not node.preparer and not node.validator:
+        native = NATIVE.get(type(node._type))
+        if native is not None and type(value) in native and value != '':
+            return value
+    return node.deserialize(value, mapping=mapping, model=model)
+
+
+def deserialize_mapping(node, value, mapping, model):
+    if type(value) is not dict:
+        value = node._type.validate(value, mapping, node, model)
+
+    exc = None
+    deserialized = {}
+    for name, child, kind, native, checked, missing in fields(node):
+        item = value.get(name)
+        try:
+            if item is None:
+                if missing is null:
+                    raise Invalid('The field named \'%s\' is missing.' % name, child)
+                deserialized[name] = missing
+            # values of the right type, that nothing else needs to look at, are done
+            elif (kind == LEAF and native is not None and not checked and
+                    type(item) in native and item != ''):
+                deserialized[name] = item
+            elif kind == LEAF:
+                deserialized[name] = child.deserialize(item, mapping=mapping, model=model)
+            else:
+                deserialized[name] = deserialize_node(child, item, mapping, model)
+        except Invalid as e:
+            if exc is None:
+                exc = Invalid('Mapping Errors', node)
+            exc.add(e)
+
+    if exc is not None:
+        raise exc
+    return deserialized
+
+
+def deserialize_sequence(node, value, mapping, model):
+    child = node.children[0]
+    kind = kind_of(child)
+    if type(value) is not list or node._type.output is not None:
+        return node.deserialize(value, mapping=mapping, model=model)
+
+    if kind == LEAF:
+        native = NATIVE.get(type(child._type))
+        if native is None or child.preparer or child.validator:
+            return node.deserialize(value, mapping=mapping, model=model)
+        for item in value:
+            if type(item) not in native or item == '':
+                return node.deserialize(value, mapping=mapping, model=model)
+        return finish(node, list(value), mapping, model)
+
+    exc = None
+    deserialized = []
+    for num, item in enumerate(value):
+        try:
+            deserialized.append(deserialize_node(child, item, item, model))
+        except Invalid as e:
+            if exc is None:
+                exc = Invalid('Sequence Errors', node)
+            exc.add(e, num)
+
+    if exc is not None:
+        raise exc
+    return finish(node, deserialized, mapping, model)
+
+
+def space(text, idx):
+    if text[idx:idx + 1] in ' \t\n\r':
+        return WHITESPACE.match(text, idx).end()
+    return idx
+
+
+def members(text, idx):
+    """ Returns where the members of the object at ``idx`` start by name, or the elements
+        of the array at ``idx`` in a list, or None for anything else.  ``text`` has to be
+        valid JSON. """
+
+    char = text[idx:idx + 1]
+    if char == '{':
+        found, close = {}, '}'
+    elif char == '[':
+        found, close = [], ']'
+    else:
+        return None
+
+    idx = space(text, idx + 1)
+    while text[idx] != close:
+        if close == '}':
+            name, idx = scanstring(text, idx + 1)
+            idx = space(text, space(text, idx) + 1)
+            # the last of the members with the same name is the one that was decoded
+            found[name] = idx
+        else:
+            found.append(idx)
+        idx = space(text, SCAN(text, idx)[1])
+        if text[idx] == ',':
+            idx = space(text, idx + 1)
+    return found
+
+
+def locate(exc, text, idx):
+    """ Sets the ``offset`` of ``exc``, whose value starts at ``idx``, and of its children. """
+
+    exc.offset = idx
+    if not exc.children:
+        return
+
+    found = members(text, idx)
+    for child in exc.children:
+        offset = idx
+        if type(found) is dict and child.pos is None:
+            offset = found.get(child.node.name, idx)
+        elif type(found) is list and child.pos is not None:
+            try:
+                offset = found[int(child.pos)]
+            except (ValueError, IndexError):
+                pass
+        locate(child, text, offset)
+
+
+def loads(schema, text, **options):
+    """ Decodes and deserializes the JSON ``text`` with ``schema``, taking the same per call
+        options as ``deserialize``, and raises an Invalid like it. """
+
+    model = schema.bind(**options) if options else schema
+    if isinstance(text, bytes) and not isinstance(text, str):
+        text = text.decode('utf-8')
+    try:
+        value = json.loads(text)
+    except ValueError as e:
+        exc = Invalid('Not valid JSON: %s' % e, schema)
+        exc.offset = getattr(e, 'pos', None)
+        if exc.offset is None:
+            # Python 2 only has it in the message
+            match = POSITION.search(str(e))
+            exc.offset = int(match.group(1)) if match else None
+        raise exc
+
+    try:
+        try:
+            if (model.trusted and model.verify or
+                    any(getattr(model, limit) is not None for limit in Budget.limits)):
+                return schema.deserialize(value, **options)
+            return deserialize_node(schema, value, value, model)
+        except RuntimeError as e:
+            # RecursionError, from a value nested deeper than the stack allows
+            if 'recursion' not in str(e):
+                raise
+            return schema.deserialize(value, **options)
+    except Invalid as e:
+        locate(e, text, WHITESPACE.match(text).end())
+        raise
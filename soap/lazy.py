@@ -0,0 +1,183 @@
+""" Lazy deserialization, for handlers that only read a few fields of a large payload.
+
+:meth:`soap.SchemaNode.deserialize_lazy` only checks that the value is a mapping and that
+none of its required fields are missing, and returns a :class:`LazyMapping`.  Each field
+is deserialized the first time it's read, with its type, preparers and validators, and
+the result is kept:
+
+.. code-block:: python
+
+   payload = TestSchema().deserialize_lazy(json)
+   payload['name']          # deserializes and validates 'name' only
+   payload.sub_node.name    # a non-list Relationship is a LazyMapping as well
+   payload.force()          # everything, as a dict, or the whole Invalid tree
+
+Reading a field that doesn't validate raises an :class:`soap.Invalid` for it, shaped
+like the one ``deserialize`` would raise for the same value with only that error, every
+time it's read.  :meth:`LazyMapping.force` deserializes whatever wasn't yet, runs the
+preparers and validators of the SchemaModel itself, and returns what ``deserialize``
+would have, or raises an Invalid with every error in the value.
+
+The limits of a :class:`soap.Budget` aren't kept, since fields are deserialized
+whenever they are read.
+"""
+from soap import (
+    Invalid,
+    Relationship,
+    null,
+)
+
+
+def children_of(schema):
+    """ Returns a dict of the children of ``schema`` by name, cached on whatever holds
+        the children. """
+
+    owner = schema if 'children' in schema.__dict__ else schema.__class__
+    children = owner.__dict__.get('_lazy_children')
+    if children is None:
+        children = dict((child.name, child) for child in schema.children)
+        setattr(owner, '_lazy_children', children)
+    return children
+
+
+def deserialize(schema, value, model, node=None):
+    """ Checks the structure of ``value`` and returns a :class:`LazyMapping` of it. """
+
+    node = node if node else schema
+    try:
+        raw = dict(value)
+    except Exception:
+        raise Invalid('SchemaNode is not a mapping type.', node)
+
+    exc = None
+    for child in schema.children:
+        if child.missing is null and raw.get(child.name) is None:
+            if exc is None:
+                exc = Invalid('Mapping Errors', node)
+            exc.add(Invalid('The field named \'%s\' is missing.' % child.name, child))
+    if exc is not None:
+        raise exc
+    return LazyMapping(schema, node, raw, model)
+
+
+class LazyMapping(object):
+    """ A read-only mapping of the fields of a SchemaModel value, deserialized when they are
+        first read.  Fields can be read as items or attributes. """
+
+    __slots__ = ('_schema', '_node', '_raw', '_model', '_values', '_errors')
+
+    def __init__(self, schema, node, raw, model):
+        self._schema = schema
+        self._node = node
+        self._raw = raw
+        self._model = model
+        self._values = {}
+        self._errors = {}
+
+    def _load(self, name):
+        """ Returns the deserialized field ``name``, or raises its own Invalid. """
+
+        error = self._errors.get(name)
+        if error is not None:
+            raise error
+
+        child = children_of(self._schema)[name]
+        value = self._raw.get(name)
+        try:
+            if value is None:
+                # only optional fields can be missing, that was checked upfront
+                result = child.missing
+            elif (isinstance(child._type, Relationship) and not child._type.uselist and
+                    not child.preparer and not child.validator):
+                schema_model = child._type.resolve(child, self._model)
+                try:
+                    result = deserialize(schema_model, value, self._model)
+                except Invalid:
+                    # the check upfront stops at the missing fields, this raises every error
+                    result = schema_model.deserialize(value, mapping=value, model=self._model)
+            else:
+                result = child.deserialize(value, mapping=self._raw, model=self._model)
+        except Invalid as e:
+            self._errors[name] = e
+            raise
+        self._values[name] = result
+        return result
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        try:
+            return self._load(name)
+        except Invalid as e:
+            exc = Invalid('Mapping Errors', self._node)
+            exc.add(e)
+            raise exc
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [child.name for child in self._schema.children]
+
+    def values(self):
+        return [self[name] for name in self.keys()]
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._schema.children)
+
+    def __contains__(self, name):
+        return name in children_of(self._schema)
+
+    def loaded(self):
+        """ Returns the names of the fields that were deserialized so far. """
+        return sorted(self._values)
+
+    def force(self):
+        """ Deserializes every field, and returns the value ``deserialize`` would have, or
+            raises an Invalid with all of the errors. """
+
+        exc = None
+        result = {}
+        for child in self._schema.children:
+            try:
+                value = self._values.get(child.name)
+                if value is None:
+                    value = self._load(child.name)
+                if isinstance(value, LazyMapping):
+                    value = value.force()
+                result[child.name] = value
+            except Invalid as e:
+                if exc is None:
+                    exc = Invalid('Mapping Errors', self._node)
+                exc.add(e)
+        if exc is not None:
+            raise exc
+
+        schema, model = self._schema, self._model
+        result = schema._finish(result, self._raw, self._node, model)
+        if model.records:
+            return schema.record_class().from_dict(result)
+        return result
+
+    def __repr__(self):
+        return '<LazyMapping %s, loaded: %s>' % (self._node.name, ', '.join(self.loaded()))
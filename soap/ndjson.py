@@ -0,0 +1,181 @@
+""" Memory-mapped reading of newline-delimited JSON files.
+
+An :class:`NDJSONFile` maps the whole file into memory, and builds an index of where every
+line starts in one pass, with ``mmap.find``, so it's never read line by line through
+Python file objects.  With the index, any line can be read again without scanning the file,
+and the file can be split into chunks of about the same number of bytes, rather than lines,
+for parallel workers:
+
+.. code-block:: python
+
+   with NDJSONFile('export.ndjson') as export:
+       errors = [(line, e.asdict()) for line, _, e in export.validate(schema) if e]
+
+       # later, once the schema is fixed
+       still_broken = list(export.validate(schema, lines=[line for line, _ in errors]))
+
+       # in workers, which only need the path and the byte range
+       for start, stop, first in export.chunks(8):
+           pool.apply_async(work, (export.path, start, stop, first))
+
+Line numbers start at 1, and blank lines are skipped, but counted.
+"""
+import array
+import bisect
+import json
+import mmap
+
+from soap import Invalid
+
+try:
+    array.array('q')
+    OFFSET_TYPECODE = 'q'
+except ValueError:
+    OFFSET_TYPECODE = 'l'
+
+
+class NDJSONFile(object):
+    """ A memory-mapped NDJSON file at ``path``. """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can't be mapped
+            self.map = b''
+        except Exception:
+            # there's no NDJSONFile to close it
+            self.file.close()
+            raise
+        self._offsets = None
+
+    @property
+    def size(self):
+        return len(self.map)
+
+    @property
+    def offsets(self):
+        """ The offset where every line starts, plus the size of the file at the end. """
+
+        if self._offsets is None:
+            offsets = array.array(OFFSET_TYPECODE)
+            find = self.map.find
+            size = len(self.map)
+            position = 0
+            while position < size:
+                offsets.append(position)
+                end = find(b'\n', position)
+                if end == -1:
+                    break
+                position = end + 1
+            offsets.append(size)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        """ The number of lines. """
+        return len(self.offsets) - 1
+
+    def line(self, line):
+        """ Returns the raw bytes of ``line``, without the newline. """
+        offsets = self.offsets
+        if not 1 <= line < len(offsets):
+            raise IndexError(line)
+        return self.map[offsets[line - 1]:offsets[line]].rstrip(b'\r\n')
+
+    def record(self, line):
+        """ Returns the parsed JSON of ``line``. """
+        return json.loads(self.line(line).decode('utf-8'))
+
+    def records(self, start=1, stop=None):
+        """ Yields (line, raw bytes) for the lines from ``start`` up to ``stop``. """
+
+        offsets = self.offsets
+        stop = len(offsets) if stop is None else min(stop, len(offsets))
+        data = self.map
+        for line in range(start, stop):
+            raw = data[offsets[line - 1]:offsets[line]]
+            if raw.strip():
+                yield line, raw
+
+    def validate(self, schema, lines=None, start=1, stop=None):
+        """ Deserializes the lines from ``start`` up to ``stop``, or only ``lines``, with
+            ``schema``, and yields a (line, deserialized, Invalid) triple for each, with
+            either the deserialized value or the Invalid set. """
+
+        if lines is not None:
+            # blank lines are skipped here too
+            raws = ((line, raw) for line, raw in ((line, self.line(line)) for line in lines)
+                    if raw.strip())
+        else:
+            raws = self.records(start, stop)
+        return validate_raw(schema, raws)
+
+    def chunks(self, count):
+        """ Splits the file into at most ``count`` chunks of about the same number of bytes,
+            at line boundaries, and returns a (start, stop, first line) for each. """
+
+        offsets = self.offsets
+        size = len(self.map)
+        chunks = []
+        line = 0
+        for num in range(1, count + 1):
+            if line >= len(offsets) - 1:
+                break
+            target = size * num // count
+            end = max(bisect.bisect_left(offsets, target), line + 1)
+            end = min(end, len(offsets) - 1)
+            chunks.append((offsets[line], offsets[end], line + 1))
+            line = end
+        return chunks
+
+    def close(self):
+        if not isinstance(self.map, bytes):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def validate_raw(schema, raws):
+    for line, raw in raws:
+        try:
+            record = json.loads(raw.decode('utf-8'))
+        except ValueError as e:
+            yield line, None, Invalid('Not valid JSON: %s' % e, schema)
+            continue
+        try:
+            yield line, schema.deserialize(record), None
+        except Invalid as e:
+            yield line, None, e
+
+
+def validate_range(schema, path, start, stop, first):
+    """ Deserializes the lines of the file at ``path`` between the byte offsets ``start``
+        and ``stop``, the first of which is line ``first``, like
+        :meth:`NDJSONFile.validate`.  This is what a worker does with a chunk, without
+        building an index of the whole file. """
+
+    with NDJSONFile(path) as ndjson:
+        data = ndjson.map
+
+        def raws():
+            line = first
+            position = start
+            while position < stop:
+                end = data.find(b'\n', position, stop)
+                end = stop if end == -1 else end + 1
+                raw = data[position:end]
+                if raw.strip():
+                    yield line, raw
+                line += 1
+                position = end
+
+        for result in validate_raw(schema, raws()):
+            yield result
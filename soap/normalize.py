@@ -0,0 +1,93 @@
+""" Normalized serialization of relationship graphs.
+
+Regular serialization inlines the related value at every occurrence of a
+:class:`soap.Relationship`, down to ``max_depth``, so the same entity is serialized over and
+over, and the output grows exponentially with the depth.  With ``normalized=True``, every
+:class:`soap.SchemaModel` value is serialized once, into a table per model keyed by its
+identity, and Relationships serialize to the identities of their values instead:
+
+.. code-block:: python
+
+   >>> TestSchema().serialize(value, normalized=True)
+   {'result': 0,
+    'entities': {'TestSchema': {0: {'id': 0, 'children': [1, 2]}},
+                 'ChildSchema': {1: {'id': 1, 'parent': 0},
+                                 2: {'id': 2, 'parent': 0}}}}
+
+Each model's table is named after the model, the way Relationships name it.  The identity
+of a value is its field named by the model's ``identity``, ``'id'`` by default, or whatever
+``identity`` returns if it's a callable.  Values without one are identified by ``id()``,
+which is only meaningful within the output it appears in.  The graph is walked with a
+queue, and every entity only once, so cycles need no depth cutoff, and ``max_depth`` doesn't
+apply.  Relationships nested in a Mapping or Sequence field, rather than being fields of a
+model themselves, are serialized as usual.
+"""
+from collections import deque
+
+from soap import (
+    Relationship,
+    SchemaModel,
+)
+
+
+def model_name(schema):
+    """ The name of the table for ``schema``. """
+    if schema.__class__ is SchemaModel:
+        return schema.name
+    return schema.__class__.__name__
+
+
+def identify(schema, value):
+    identity = schema.identity
+    if callable(identity):
+        key = identity(value)
+    else:
+        key = value.get(identity)
+    return id(value) if key is None else key
+
+
+def serialize(schema, value, model):
+    """ Serializes ``value`` with ``schema`` into a dict of the ``result``, the identity of
+        ``value``, and the ``entities``. """
+
+    entities = {}
+    models = {}
+    queue = deque()
+
+    def reference(name, value):
+        target = models.get(name)
+        if target is None:
+            target = model._models[name]
+            target = models[name] = target if isinstance(target, SchemaModel) else target()
+        key = identify(target, value)
+        table = entities.setdefault(name, {})
+        if key not in table:
+            # claim the slot, so the value is only queued once
+            table[key] = None
+            queue.append((target, table, key, value))
+        return key
+
+    result = None
+    if value is not None:
+        models[model_name(schema)] = model
+        result = reference(model_name(schema), value)
+
+    while queue:
+        target, table, key, value = queue.popleft()
+        serialized = {}
+        for child in target.children:
+            item = value.get(child.name)
+            _type = child._type
+            if isinstance(_type, Relationship):
+                if _type.uselist:
+                    serialized[child.name] = [reference(_type.name, related)
+                                              for related in item or ()]
+                elif item:
+                    serialized[child.name] = reference(_type.name, item)
+                else:
+                    serialized[child.name] = None
+            else:
+                serialized[child.name] = child.serialize(item, 0, mapping=value, model=model)
+        table[key] = serialized
+
+    return {'result': result, 'entities': entities}
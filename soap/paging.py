@@ -0,0 +1,111 @@
+""" Serializing a window of a list :class:`soap.Relationship`, instead of all of it.
+
+A window is set on the relationship, or per call with ``windows``, keyed by the name of
+the relationship's node, which takes precedence:
+
+.. code-block:: python
+
+   class UserSchema(SchemaModel):
+       posts = SchemaNode(Relationship('PostSchema', limit=20))
+
+   UserSchema().serialize(user, windows={'posts': {'cursor': cursor, 'total': True}})
+
+A windowed relationship serializes into a page, rather than a list:
+
+.. code-block:: python
+
+   {'items': [...], 'offset': 20, 'limit': 20, 'total': 50000, 'next': 'NDA'}
+
+Its options are ``limit``, ``offset``, ``cursor`` (a ``next`` value from an earlier page,
+instead of an offset) and ``total``, to count the whole collection.  ``next`` is None on
+the last page.
+
+The window is taken by slicing the collection, so a query object that supports slicing
+(SQLAlchemy's ``Query``, Django's ``QuerySet``) only loads the rows in it.  One more row
+than ``limit`` is asked for, to tell whether there is a next page without counting.
+Collections that can't be sliced are iterated up to the end of the window.  The total
+is taken from ``count()`` when the collection has it, and ``len()`` otherwise, and a
+collection that has neither is read into a list to count it.
+"""
+import base64
+import itertools
+
+
+def window(relationship, node, model):
+    """ Returns the window options of ``relationship`` for ``node``, or None to serialize
+        all of it. """
+
+    windows = model.windows
+    options = windows.get(node.name) if windows else None
+    if options is None and relationship.limit is None:
+        return None
+
+    result = {'limit': relationship.limit, 'total': relationship.total}
+    if options:
+        result.update(options)
+    return result
+
+
+def encode(offset):
+    return base64.urlsafe_b64encode(str(offset).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode(cursor):
+    try:
+        data = str(cursor)
+        offset = int(base64.urlsafe_b64decode((data + '=' * (-len(data) % 4)).encode('ascii')))
+    except Exception:
+        offset = -1
+    if offset < 0:
+        raise ValueError('Not a valid cursor: %r' % (cursor,))
+    return offset
+
+
+def take(value, offset, stop):
+    """ Returns the elements of ``value`` from ``offset`` up to ``stop`` as a list. """
+
+    if value is None:
+        return []
+    if hasattr(value, '__getitem__'):
+        try:
+            return list(value[offset:stop])
+        except (TypeError, KeyError):
+            pass
+    return list(itertools.islice(value, offset, stop))
+
+
+def count(value):
+    if value is None:
+        return 0
+    if not isinstance(value, (list, tuple)) and callable(getattr(value, 'count', None)):
+        return value.count()
+    return len(value)
+
+
+def serialize(schema, value, options, depth, model):
+    """ Serializes the window ``options`` of the collection ``value`` with ``schema``, the
+        Sequence of a relationship, into a page. """
+
+    limit = options.get('limit')
+    cursor = options.get('cursor')
+    offset = decode(cursor) if cursor is not None else options.get('offset') or 0
+
+    if (options.get('total') and value is not None and not hasattr(value, '__len__') and
+            not callable(getattr(value, 'count', None))):
+        # an iterable can only be counted by reading all of it
+        value = list(value)
+
+    items = take(value, offset, offset + limit + 1 if limit is not None else None)
+    more = limit is not None and len(items) > limit
+    if more:
+        del items[limit:]
+
+    page = {
+        'items': schema.serialize(items, depth, mapping=items, model=model),
+        'offset': offset,
+        'limit': limit,
+        'next': encode(offset + limit) if more else None,
+    }
+    if options.get('total'):
+        page['total'] = count(value)
+    return page
@@ -0,0 +1,124 @@
+""" Slotted record classes for :class:`soap.SchemaModel`s.
+
+When a schema is deserialized with ``records=True``, set either on the schema or passed to
+``deserialize`` for a single call, every :class:`soap.SchemaModel` in the value, including
+the ones behind :class:`soap.Relationship`s, comes back as an instance of a record class
+instead of a dict:
+
+.. code-block:: python
+
+   payload = TestSchema().deserialize(json, records=True)
+   payload.sub_node.name
+   payload.asdict()
+
+Each SchemaModel gets its own record class, generated the first time it's needed, with a
+slot for every field and no ``__dict__``, so a record takes a fraction of the memory of a
+dict and its attributes are read as fast as those of any other object.  Records have
+``get``, ``keys`` and item access as well, so they can be serialized by the schema they
+came from like a dict would be.  Values that were never deserialized, like a ``missing``
+value for a Relationship, are left as they are.
+"""
+import keyword
+import re
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class Record(object):
+    """ The base class of all record classes.  ``_fields`` holds the names of the slots,
+        in the order of the SchemaModel's children. """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, **fields):
+        for name in self._fields:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError('%s has no fields named %s'
+                            % (self.__class__.__name__, ', '.join(sorted(fields))))
+
+    @classmethod
+    def from_dict(cls, value):
+        """ Creates a record out of the deserialized dict ``value``. """
+        record = cls.__new__(cls)
+        get = value.get
+        for name in cls._fields:
+            setattr(record, name, get(name))
+        return record
+
+    def asdict(self):
+        """ Returns the record as a dict, turning any records in it, or in lists in it,
+            into dicts as well. """
+        return dict((name, _asdict(getattr(self, name))) for name in self._fields)
+
+    def get(self, name, default=None):
+        if name in self._fields:
+            return getattr(self, name)
+        return default
+
+    def keys(self):
+        return list(self._fields)
+
+    def __getitem__(self, name):
+        if name in self._fields:
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, name):
+        return name in self._fields
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self._fields == other._fields and all(
+                getattr(self, name) == getattr(other, name) for name in self._fields)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    # records can be changed, like the dicts they replace
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for name in self._fields))
+
+
+def _asdict(value):
+    if isinstance(value, Record):
+        return value.asdict()
+    if isinstance(value, list):
+        return [_asdict(item) for item in value]
+    return value
+
+
+def record_class(name, fields, check=True):
+    """ Creates the record class for a SchemaModel called ``name`` with ``fields``, which
+        are checked to be valid attribute names unless ``check`` is False. """
+
+    fields = tuple(fields)
+    for field in fields if check else ():
+        if not IDENTIFIER.match(field) or keyword.iskeyword(field) or field in Record.__dict__:
+            raise ValueError('%s can\'t be deserialized into a record, %r can\'t be the name '
+                             'of an attribute' % (name, field))
+    cls = type(str('%sRecord' % name), (Record,), {'__slots__': fields, '_fields': fields})
+
+    # from_dict is called for every record that's deserialized, so spell it out for the
+    # fields, like collections.namedtuple does, instead of looping over them
+    source = ['def from_dict(cls, value):',
+              '    record = new(cls)',
+              '    get = value.get']
+    source.extend('    record.%s = get(%r)' % (field, field) for field in fields)
+    source.append('    return record')
+    namespace = {'new': object.__new__}
+    exec('\n'.join(source), namespace)
+    cls.from_dict = classmethod(namespace['from_dict'])
+    return cls
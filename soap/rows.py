@@ -0,0 +1,92 @@
+""" Serialization straight from DB-API cursor rows.
+
+:meth:`soap.Mapping.serialize` reads every field with ``value.get(name)``, so the rows of a
+raw SQL query have to be turned into dicts or ORM objects before a schema can serialize
+them.  A :class:`RowSerializer` is bound to a cursor's ``description`` once instead, works
+out which column each field of the schema comes from, and then serializes the rows as the
+plain tuples ``fetchmany()`` returns:
+
+.. code-block:: python
+
+   cursor.execute('SELECT id, name FROM users')
+   serializer = RowSerializer(UserSchema(), cursor.description)
+   for payload in serializer.iter_cursor(cursor):
+       ...
+
+or, in one go, with :func:`serialize_cursor`.  Fields are matched to columns by name, and
+fields that aren't one of the columns, like Relationships, are left out of the result.
+"""
+import json
+
+from soap import engine
+
+
+class RowSerializer(object):
+    """ Serializes rows with the fields of ``schema``, a :class:`soap.SchemaModel`, that
+        match one of the columns in ``description``. """
+
+    def __init__(self, schema, description):
+        if isinstance(schema, type):
+            schema = schema()
+        self.schema = schema
+        self.columns = [column[0] for column in description]
+
+        indexes = dict((name, index) for index, name in enumerate(self.columns))
+        self.fields = []
+        for child in schema.children:
+            if child.name in indexes:
+                leaf = engine.kind(child._type) == engine.LEAF
+                self.fields.append((child.name, indexes[child.name], child, leaf))
+
+    def serialize(self, row):
+        """ Returns the serialized dict for a single ``row``. """
+
+        model = self.schema
+        serialized = {}
+        for name, index, child, leaf in self.fields:
+            value = row[index]
+            if leaf:
+                serialized[name] = child._type.serialize(value, 0, row, child, model)
+            else:
+                serialized[name] = child.serialize(value, 0, mapping=row, model=model)
+        return serialized
+
+    def serialize_many(self, rows):
+        """ Returns a list of the serialized dicts for ``rows``. """
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+    def iter_cursor(self, cursor, size=None):
+        """ Yields a serialized dict for every row left in ``cursor``, fetching ``size``
+            rows at a time, or ``cursor.arraysize`` if not given. """
+
+        size = size or cursor.arraysize
+        serialize = self.serialize
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                yield serialize(row)
+
+    def iter_json(self, cursor, size=None, **kwargs):
+        """ Like :meth:`iter_cursor`, but yields every row encoded as JSON, by a
+            ``json.JSONEncoder`` created with ``kwargs``. """
+
+        encode = json.JSONEncoder(**kwargs).encode
+        for serialized in self.iter_cursor(cursor, size):
+            yield encode(serialized)
+
+    def dumps(self, cursor, size=None, **kwargs):
+        """ Returns the rows left in ``cursor`` as a JSON array. """
+        return '[%s]' % ', '.join(self.iter_json(cursor, size, **kwargs))
+
+
+def serialize_cursor(schema, cursor, size=None, encode=False):
+    """ Binds a :class:`RowSerializer` for ``schema`` to ``cursor``, and yields the
+        serialized dicts, or JSON strings if ``encode`` is set, of its rows. """
+
+    serializer = RowSerializer(schema, cursor.description)
+    if encode:
+        return serializer.iter_json(cursor, size)
+    return serializer.iter_cursor(cursor, size)
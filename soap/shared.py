@@ -0,0 +1,303 @@
+""" Shared memory transport of validated columns, for validating across processes.
+
+Pickling validated dicts back from worker processes can cost more than validating them
+did.  For flat schemas, whose fields are all :class:`soap.Int`, :class:`soap.Boolean`,
+:class:`soap.DateTime` or :class:`soap.String`, a worker can write the deserialized values
+into a ``multiprocessing.shared_memory`` block instead, as one column per field, and only
+send back the small, picklable :class:`SharedResult` that describes it:
+
+.. code-block:: python
+
+   def work(chunk):
+       return validate_shared(UserSchema(), chunk)
+
+   for result, errors in pool.imap(work, chunks):
+       with result.open() as columns:
+           total = columns.numpy('id').sum()   # a zero-copy numpy view
+           first = columns[0]                  # a dict, built when it's asked for
+       result.unlink()
+
+Ints are stored as 64 bit integers, Booleans as bytes, DateTimes as 64 bit microseconds
+since the epoch in UTC, and Strings as UTF-8 in a single arena, with a column of offsets
+into it.  Values that can't be stored that way, Ints that don't fit in 64 bits, strings
+with lone surrogates and naive datetimes, are errors like values that don't validate.
+Every column has a mask of which values are None.  The parent owns the block once it has
+the result, and has to :meth:`SharedResult.unlink` it.  numpy views have to be dropped,
+or copied, before the columns are closed.  Requires Python 3.8.
+"""
+import array
+
+from soap import (
+    Int,
+    Boolean,
+    DateTime,
+    String,
+    Invalid,
+)
+from soap.arrays import INT_TYPECODE, microseconds, fromtimestamp
+
+# type -> (kind, typecode)
+KINDS = (
+    (Boolean, 'bool', 'b'),
+    (Int, 'int', INT_TYPECODE),
+    (DateTime, 'datetime', INT_TYPECODE),
+    (String, 'string', INT_TYPECODE),
+)
+INT_MIN, INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def columns_for(schema):
+    """ Returns the (name, kind, typecode) of each field of the flat ``schema``. """
+
+    columns = []
+    for child in schema.children:
+        for cls, kind, typecode in KINDS:
+            if isinstance(child._type, cls):
+                columns.append((child.name, kind, typecode))
+                break
+        else:
+            raise TypeError('%s can\'t be stored in shared memory, %s is a %s' % (
+                schema.name, child.name, child._type.__class__.__name__))
+    return columns
+
+
+class ColumnWriter(object):
+    """ Collects deserialized values for ``schema``, and writes them out column by column. """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.columns = columns_for(schema)
+        self.fields = [(child, column[1]) for child, column in zip(schema.children, self.columns)]
+        # the values of every row as they are stored, in the order of the columns
+        self.rows = []
+        self.positions = array.array(INT_TYPECODE)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def append(self, deserialized, position):
+        """ Adds a deserialized value, which was at ``position`` in the input.  Raises an
+            Invalid for the fields whose values can't be stored. """
+
+        row = []
+        exc = None
+        for child, kind in self.fields:
+            value = deserialized.get(child.name)
+            if value is not None:
+                try:
+                    value = self.store(child, kind, value)
+                except Invalid as e:
+                    if exc is None:
+                        exc = Invalid('Mapping Errors', self.schema)
+                    exc.add(e)
+            row.append(value)
+        if exc is not None:
+            raise exc
+
+        self.rows.append(row)
+        self.positions.append(position)
+
+    def store(self, child, kind, value):
+        """ Returns ``value`` as it's stored in a column of ``kind``. """
+
+        if kind == 'int':
+            if not INT_MIN <= value <= INT_MAX:
+                raise Invalid('SchemaNode is out of range.', child)
+        elif kind == 'string':
+            try:
+                return value.encode('utf-8')
+            except UnicodeError:
+                raise Invalid('SchemaNode is not valid unicode.', child)
+        elif kind == 'datetime':
+            if value.utcoffset() is None:
+                raise Invalid('SchemaNode has no timezone.', child)
+            return microseconds(value)
+        return value
+
+    def pack(self, index, name, kind, typecode):
+        """ Returns the buffers of the column ``name``, the ``index``-th: its values, its
+            nulls and, for Strings, its arena. """
+
+        values = [row[index] for row in self.rows]
+        nulls = bytearray(value is None for value in values)
+        if kind == 'string':
+            encoded = [b'' if value is None else value for value in values]
+            offsets = array.array(typecode, [0])
+            offset = 0
+            for item in encoded:
+                offset += len(item)
+                offsets.append(offset)
+            return [(name, offsets), (name + '.nulls', nulls),
+                    (name + '.arena', bytearray(b''.join(encoded)))]
+
+        if any(nulls):
+            values = [0 if value is None else value for value in values]
+        return [(name, array.array(typecode, values)), (name + '.nulls', nulls)]
+
+    def finish(self):
+        """ Copies the columns into a new shared memory block, and returns the
+            :class:`SharedResult` for it. """
+
+        from multiprocessing import shared_memory
+
+        buffers = [('positions', self.positions)]
+        for index, (name, kind, typecode) in enumerate(self.columns):
+            buffers.extend(self.pack(index, name, kind, typecode))
+        buffers = [(key, memoryview(buf).cast('B')) for key, buf in buffers]
+
+        layout = {}
+        offset = 0
+        for key, buf in buffers:
+            # keep the 64 bit columns aligned
+            offset += -offset % 8
+            layout[key] = (offset, buf.nbytes)
+            offset += buf.nbytes
+
+        block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for key, buf in buffers:
+                start, nbytes = layout[key]
+                block.buf[start:start + nbytes] = buf
+            return SharedResult(block.name, len(self), self.columns, layout)
+        finally:
+            block.close()
+
+
+class SharedResult(object):
+    """ A picklable description of a shared memory block written by a
+        :class:`ColumnWriter`. """
+
+    def __init__(self, name, count, columns, layout):
+        self.name = name
+        self.count = count
+        self.columns = columns
+        self.layout = layout
+
+    def open(self):
+        """ Returns the :class:`SharedColumns` in the block. """
+        return SharedColumns(self)
+
+    def unlink(self):
+        """ Frees the block, once nothing needs it anymore. """
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(name=self.name)
+        block.close()
+        block.unlink()
+
+
+class SharedColumns(object):
+    """ Zero-copy access to the columns of a :class:`SharedResult`. """
+
+    def __init__(self, result):
+        from multiprocessing import shared_memory
+        self.result = result
+        self.block = shared_memory.SharedMemory(name=result.name)
+        self.kinds = dict((name, (kind, typecode)) for name, kind, typecode in result.columns)
+        self._views = {}
+
+    def raw(self, key, typecode='B'):
+        view = self._views.get(key)
+        if view is None:
+            start, nbytes = self.result.layout[key]
+            view = self._views[key] = self.block.buf[start:start + nbytes].cast(typecode)
+        return view
+
+    @property
+    def positions(self):
+        """ The position in the input of every value. """
+        return self.raw('positions', INT_TYPECODE)
+
+    def column(self, name):
+        """ Returns a memoryview of the raw values of ``name``.  For Strings these are the
+            offsets into the arena, and there's one more of them than there are values. """
+        return self.raw(name, self.kinds[name][1])
+
+    def nulls(self, name):
+        return self.raw(name + '.nulls', 'b')
+
+    def numpy(self, name):
+        """ Returns a numpy view of ``name``.  DateTimes are datetime64[us], and Strings
+            aren't supported. """
+
+        import numpy
+        kind, _ = self.kinds[name]
+        if kind == 'string':
+            raise TypeError('%s is a String column, use values() instead' % name)
+        dtype = {'bool': 'bool', 'int': 'int64', 'datetime': 'datetime64[us]'}[kind]
+        start, nbytes = self.result.layout[name]
+        return numpy.frombuffer(self.block.buf, dtype='int8' if kind == 'bool' else 'int64',
+                                count=self.result.count, offset=start).view(dtype)
+
+    def values(self, name):
+        """ Returns a list of the Python values of ``name``. """
+        kind, _ = self.kinds[name]
+        nulls = self.nulls(name)
+        values = self.column(name)
+        if kind == 'string':
+            arena = self.raw(name + '.arena')
+            return [None if nulls[num] else
+                    arena[values[num]:values[num + 1]].tobytes().decode('utf-8')
+                    for num in range(self.result.count)]
+        if kind == 'datetime':
+            return [None if nulls[num] else fromtimestamp(0, values[num])
+                    for num in range(self.result.count)]
+        if kind == 'bool':
+            return [None if nulls[num] else bool(values[num]) for num in range(self.result.count)]
+        return [None if nulls[num] else values[num] for num in range(self.result.count)]
+
+    def __len__(self):
+        return self.result.count
+
+    def __getitem__(self, num):
+        """ Builds the dict of the value at ``num``. """
+
+        if not 0 <= num < self.result.count:
+            raise IndexError(num)
+        record = {}
+        for name, kind, typecode in self.result.columns:
+            if self.nulls(name)[num]:
+                record[name] = None
+                continue
+            values = self.column(name)
+            if kind == 'string':
+                arena = self.raw(name + '.arena')
+                record[name] = arena[values[num]:values[num + 1]].tobytes().decode('utf-8')
+            elif kind == 'datetime':
+                record[name] = fromtimestamp(0, values[num])
+            elif kind == 'bool':
+                record[name] = bool(values[num])
+            else:
+                record[name] = values[num]
+        return record
+
+    def __iter__(self):
+        for num in range(self.result.count):
+            yield self[num]
+
+    def close(self):
+        # the block can only be closed once every view of it is released, which includes
+        # the numpy views
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self.block.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def validate_shared(schema, records):
+    """ Deserializes ``records`` with ``schema``, and returns a :class:`SharedResult` of
+        the valid ones, and a list of (position, ``Invalid.asdict()``) for the others. """
+
+    writer = ColumnWriter(schema)
+    errors = []
+    for position, record in enumerate(records):
+        try:
+            writer.append(schema.deserialize(record), position)
+        except Invalid as e:
+            errors.append((position, e.asdict()))
+    return writer.finish(), errors
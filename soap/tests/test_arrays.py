@@ -0,0 +1,135 @@
+import array
+import unittest
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from soap import (
+    Int,
+    Boolean,
+    DateTime,
+    String,
+    Sequence,
+    SchemaNode,
+    SchemaModel,
+    Relationship,
+    Registry,
+    Invalid,
+)
+
+
+def positive(value, mapping, node, model):
+    if value < 0:
+        raise Invalid('Negative.', node)
+
+
+class TestArrays(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+    def schema(self, output, **kwargs):
+        class TestSchema(SchemaModel):
+            ids = SchemaNode(Sequence(output=output), SchemaNode(Int()), missing=[])
+            checked = SchemaNode(Sequence(output=output), SchemaNode(Int(), validator=positive),
+                                 missing=[])
+            flags = SchemaNode(Sequence(output=output), SchemaNode(Boolean()), missing=[])
+            dates = SchemaNode(Sequence(output=output), SchemaNode(DateTime()), missing=[])
+            child_nodes = SchemaNode(Relationship('TestSchema'), missing=[])
+
+        return TestSchema(**kwargs)
+
+    def test_output(self):
+        self.assertRaises(ValueError, Sequence, output='tuple')
+        schema = SchemaNode(Sequence(output='array'), SchemaNode(String()), name='names')
+        self.assertRaises(TypeError, schema.deserialize, ['a'])
+
+    def test_array(self):
+        result = self.schema('array').deserialize({
+            'ids': ['1', 2, 3.0],
+            'checked': [0, '5'],
+            'flags': ['true', 'false', 0, 1],
+            'dates': ['1970-01-01T00:00:01.5Z', '2007-01-25']
+        })
+        self.assertEqual(result['ids'], array.array(result['ids'].typecode, [1, 2, 3]))
+        self.assertEqual(result['checked'].tolist(), [0, 5])
+        self.assertEqual(result['flags'], array.array('b', [1, 0, 0, 1]))
+        self.assertEqual(result['dates'], array.array('d', [1.5, 1169683200.0]))
+
+    def test_errors(self):
+        for output, iterative in (('array', False), ('array', True), ('numpy', True)):
+            if output == 'numpy' and numpy is None:
+                continue
+            schema = self.schema(output, iterative=iterative)
+            try:
+                schema.deserialize({
+                    'ids': ['1', 'two', 3, 2 ** 70],
+                    'checked': [1, -1],
+                    'dates': ['blah', '2007-01-25'],
+                    'child_nodes': [{'ids': [0, 'one']}]
+                })
+            except Invalid as e:
+                self.assertEqual(e.asdict(), {
+                    'ids': {'1': ['SchemaNode is not an integer.']},
+                    'checked': {'1': ['Negative.']},
+                    'dates': {'0': ['SchemaNode is not a datetime']},
+                    'child_nodes': {'0': {'ids': {'1': ['SchemaNode is not an integer.']}}}
+                })
+            else:
+                self.fail('Invalid not raised')
+
+    def test_out_of_range(self):
+        schema = self.schema('array')
+        try:
+            schema.deserialize({'ids': [1, 2 ** 70, 2, -2 ** 70]})
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'ids': {
+                '1': ['SchemaNode is out of range.'],
+                '3': ['SchemaNode is out of range.']
+            }})
+        else:
+            self.fail('Invalid not raised')
+
+    def test_required(self):
+        schema = SchemaNode(Sequence(output='array'), SchemaNode(Int()), name='ids')
+        self.assertRaises(Invalid, schema.deserialize, [])
+        self.assertEqual(schema.deserialize([], trusted=True).tolist(), [])
+
+    def test_serialize(self):
+        for output in ('array', 'numpy'):
+            if output == 'numpy' and numpy is None:
+                continue
+            schema = self.schema(output, iterative=False)
+            json = {
+                'ids': [1, 2],
+                'flags': ['true', 'false'],
+                'dates': ['2007-01-25T12:00:00.000001Z'],
+                'child_nodes': [{'ids': [3]}]
+            }
+            deserialized = schema.deserialize(json)
+            serialized = schema.serialize(deserialized)
+            self.assertEqual(serialized['ids'], [1, 2])
+            self.assertEqual(serialized['flags'], ['true', False])
+            self.assertEqual(serialized['child_nodes'][0]['ids'], [3])
+
+            # the same as serializing lists
+            listed = self.schema(None).deserialize(json)
+            self.assertEqual(serialized['dates'], self.schema(None).serialize(listed)['dates'])
+
+            # and the iterative engine gives the same result
+            self.assertEqual(self.schema(output, iterative=True).serialize(deserialized), serialized)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        result = self.schema('numpy').deserialize({
+            'ids': ['1', 2, 3.0],
+            'flags': ['true', 'false'],
+            'dates': ['2007-01-25T12:00:00.000001Z']
+        })
+        self.assertEqual(result['ids'].dtype, numpy.int64)
+        self.assertEqual(result['ids'].tolist(), [1, 2, 3])
+        self.assertEqual(result['flags'].tolist(), [True, False])
+        self.assertEqual(result['dates'].dtype, numpy.dtype('datetime64[us]'))
+        self.assertEqual(result['dates'].tolist(), [datetime(2007, 1, 25, 12, 0, 0, 1)])
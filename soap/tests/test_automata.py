@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+import sys
+import unittest
+from soap import (
+    Invalid,
+    Regex,
+    Email,
+    String,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap import automata
+
+
+PATTERNS = [
+    r'(?i)^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}$',
+    r'(a+)+$',
+    r'a|b$',
+    r'a$\n',
+    r'\d{3}-\d{2}\Z',
+    r'[^\W\d]+$',
+    r'x{2,}y?',
+    r'(?:ab|a)*?c',
+    r'(?s).b',
+    r'a{,2}b{1}$',
+    r'[\]a-]+',
+    r'a{',
+    u'\\x41\xe9',
+    r'(?P<name>ab)+',
+    r'(?#comment)^ab\s',
+    r'^$',
+]
+ALPHABET = u'abcAB@.-x\n\xe9\xdf 019y'
+
+
+class TestAutomata(unittest.TestCase):
+    def test_same_as_re(self):
+        generator = random.Random(0)
+        for pattern in PATTERNS:
+            compiled = re.compile(pattern)
+            automaton = automata.compile(compiled)
+            for _ in range(500):
+                value = u''.join(generator.choice(ALPHABET) for _ in range(generator.randint(0, 8)))
+                self.assertEqual(automaton.match(value), compiled.match(value) is not None,
+                                 (pattern, value))
+
+    def test_unsupported(self):
+        for pattern in [r'(a)\1', r'(?=a)', r'(?<!a)b', r'\bab', r'(?m)^a']:
+            self.assertRaises(automata.Unsupported, automata.compile, pattern)
+        if sys.version_info >= (3, 6):
+            self.assertRaises(automata.Unsupported, automata.compile, r'(?i:a)b')
+        self.assertRaises(re.error, automata.compile, r'(a')
+
+    def test_cached(self):
+        self.assertTrue(automata.compile(r'ab+') is automata.compile(r'ab+'))
+        automaton = automata.compile(r'[a-c]+$')
+        automaton.match('abcabc')
+        self.assertEqual(len(automaton.states), 2)
+        self.assertEqual(list(automaton.start.next), ['a'])
+
+    def test_pathological(self):
+        automaton = automata.compile(r'(a+)+$')
+        self.assertFalse(automaton.match('a' * 10000 + 'b'))
+
+        # every transition has to be built, so the DFA is flushed every MAX_STATES
+        automaton = automata.compile(r'(a|b)*a(a|b){15}$')
+        generator = random.Random(0)
+        value = ''.join(generator.choice('ab') for _ in range(30000))
+        self.assertEqual(automaton.match(value), re.match(r'(a|b)*a(a|b){15}$', value) is not None)
+        self.assertTrue(len(automaton.states) <= automata.MAX_STATES)
+
+    def test_steps(self):
+        automaton = automata.compile(r'a+$')
+        self.assertTrue(automaton.match('a' * 100, max_steps=200))
+        self.assertEqual(automaton.match('a' * 100, max_steps=50), None)
+
+
+class TestRegex(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+    def test_linear(self):
+        class TestSchema(SchemaModel):
+            code = SchemaNode(String(), validator=Regex(r'(a+)+$', linear=True, max_steps=1000))
+            email = SchemaNode(String(), validator=Email(linear=True), missing=None)
+
+        schema = TestSchema()
+        self.assertEqual(schema.deserialize({'code': 'aaa', 'email': 'bob@example.com'}),
+                         {'code': 'aaa', 'email': 'bob@example.com'})
+        try:
+            schema.deserialize({'code': 'a' * 30 + 'b', 'email': 'bob@'})
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {
+                'code': ['String does not match expected pattern'],
+                'email': ['Invalid email address'],
+            })
+        else:
+            self.fail()
+
+        # u'\xdf'.upper() is 'SS', which can't match a single character
+        self.assertRaises(Invalid, Email(linear=True), u'stra\xdfe@example.com', None, None, None)
+
+        try:
+            schema.deserialize({'code': 'a' * 2000})
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'code': ['String is too long to match the expected pattern']})
+        else:
+            self.fail()
+
+    def test_fallback(self):
+        self.assertRaises(ValueError, Regex, r'(a)\1', linear=True)
+        regex = Regex(r'(a)\1', linear=True, fallback=True)
+        self.assertTrue(regex.automaton is None)
+        regex('aa', None, None, None)
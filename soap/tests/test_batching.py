@@ -0,0 +1,101 @@
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+
+
+class FakeLoader(object):
+    """ An in-process loader, which records every batch of keys it's called with. """
+
+    def __init__(self, rows, as_dict=False):
+        self.rows = rows
+        self.as_dict = as_dict
+        self.calls = []
+
+    def __call__(self, keys):
+        self.calls.append(list(keys))
+        if self.as_dict:
+            return dict((key, self.rows[key]) for key in keys if key in self.rows)
+        return [self.rows.get(key) for key in keys]
+
+
+class TestBatching(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class UserSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            friends = SchemaNode(Relationship('UserSchema'), missing=[])
+
+        class CommentSchema(SchemaModel):
+            id = SchemaNode(Int())
+            author = SchemaNode(Relationship('UserSchema', uselist=False), missing={})
+
+        class PostSchema(SchemaModel):
+            id = SchemaNode(Int())
+            author = SchemaNode(Relationship('UserSchema', uselist=False), missing={})
+            comments = SchemaNode(Relationship('CommentSchema'), missing=[])
+
+        class FeedSchema(SchemaModel):
+            posts = SchemaNode(Relationship('PostSchema'), missing=[])
+
+        self.schema = PostSchema
+        self.feed = FeedSchema
+        self.users = FakeLoader(dict((num, {'id': num, 'name': 'user%s' % num,
+                                            'friends': [(num + 1) % 5]}) for num in range(5)))
+        self.comments = FakeLoader(dict((num, {'id': num, 'author': num % 5})
+                                        for num in range(20)), as_dict=True)
+        self.loaders = {'UserSchema': self.users, 'CommentSchema': self.comments}
+        self.posts = [{'id': num, 'author': num % 3, 'comments': [num * 2, num * 2 + 1]}
+                      for num in range(10)]
+
+    def eager(self):
+        """ The same posts, with everything loaded upfront. """
+
+        users = self.users.rows
+
+        def user(key):
+            return dict(users[key], friends=[users[friend] for friend in users[key]['friends']])
+
+        return [{'id': post['id'], 'author': user(post['author']),
+                 'comments': [{'id': comment, 'author': user(comment % 5)}
+                              for comment in post['comments']]} for post in self.posts]
+
+    def test_levels(self):
+        for iterative in (True, False):
+            self.users.calls[:] = []
+            self.comments.calls[:] = []
+            # posts are already loaded, only their relationships are batched
+            feed = self.feed(iterative=iterative, max_depth=3)
+            serialized = feed.serialize({'posts': self.posts}, loaders=self.loaders)
+            self.assertEqual(serialized, feed.serialize({'posts': self.eager()}))
+
+            # depth 2 needs the authors and comments of the posts, and depth 3 the friends of
+            # those authors and the authors of the comments, some of which were fetched already
+            self.assertEqual(len(self.comments.calls), 1)
+            self.assertEqual(sorted(self.comments.calls[0]), list(range(20)))
+            self.assertEqual(len(self.users.calls), 2)
+            self.assertEqual(sorted(self.users.calls[0]), [0, 1, 2])
+            self.assertEqual(sorted(self.users.calls[1]), [3, 4])
+
+    def test_single(self):
+        serialized = self.schema().serialize(self.posts[0], loaders=self.loaders)
+        self.assertEqual(serialized, self.schema().serialize(self.eager()[0]))
+
+    def test_missing_keys(self):
+        post = {'id': 0, 'author': 99, 'comments': [0, 99]}
+        serialized = self.schema().serialize(post, loaders=self.loaders)
+        self.assertEqual(serialized['author'], {})
+        self.assertEqual([comment['id'] for comment in serialized['comments']], [0])
+
+    def test_no_value(self):
+        post = {'id': 0, 'author': None, 'comments': None}
+        self.assertEqual(self.schema().serialize(post, loaders=self.loaders),
+                         {'id': 0, 'author': {}, 'comments': []})
+        self.assertEqual(self.users.calls, [])
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from datetime import datetime
+from soap import (
+    Invalid,
+    Relationship,
+    Polymorphic,
+    Mapping,
+    Sequence,
+    String,
+    Int,
+    Boolean,
+    DateTime,
+    Range,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    iso8601,
+)
+from soap.binary import dumps, loads, pack, unpack
+
+
+class TestPack(unittest.TestCase):
+    def test_msgpack(self):
+        # from the MessagePack spec
+        self.assertEqual(pack({u'compact': True, u'schema': 0}) in (
+            b'\x82\xa7compact\xc3\xa6schema\x00', b'\x82\xa6schema\x00\xa7compact\xc3'), True)
+        self.assertEqual(pack([1, -1, 200, -200, 70000, 2 ** 40, None, False, 1.5]),
+                         b'\x99\x01\xff\xcc\xc8\xd1\xff\x38\xce\x00\x01\x11\x70'
+                         b'\xcf\x00\x00\x01\x00\x00\x00\x00\x00\xc0\xc2'
+                         b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00')
+        self.assertEqual(pack(datetime(1970, 1, 1, 0, 0, 1, tzinfo=iso8601.UTC)),
+                         b'\xd6\xff\x00\x00\x00\x01')
+
+    def test_round_trip(self):
+        values = [
+            0, 127, 128, -32, -33, 2 ** 63 - 1, -2 ** 63, u'', u'x' * 40, u'y' * 70000,
+            u'été', b'\x00\x01', [], list(range(20)), {u'a': [1, {u'b': None}]},
+            dict((str(num), num) for num in range(20)),
+            datetime(2007, 1, 25, 12, 0, 0, 1, tzinfo=iso8601.UTC),
+            datetime(1900, 1, 1, tzinfo=iso8601.UTC),
+            datetime(2500, 1, 1, 0, 0, 0, 5, tzinfo=iso8601.UTC),
+        ]
+        for value in values:
+            self.assertEqual(unpack(pack(value)), value)
+        self.assertRaises(OverflowError, pack, 2 ** 64)
+        self.assertRaises(ValueError, unpack, b'\x01\x02')
+        # a map with an array for a key
+        self.assertRaises(ValueError, unpack, b'\x81\x90\x00')
+
+
+class TestBinary(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int(), validator=Range(0, 1000))
+            name = SchemaNode(String())
+            booly = SchemaNode(Boolean())
+            datey = SchemaNode(DateTime())
+            tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+            extra = SchemaNode(Mapping(), SchemaNode(Int(), name='count'), missing=None)
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema()
+        self.child_schema = ChildSchema
+        self.value = {
+            'id': 5,
+            'name': u'blah',
+            'booly': True,
+            'datey': datetime(2007, 1, 25, 12, 0, tzinfo=iso8601.UTC),
+            'tags': [u'a', u'b'],
+            'extra': {'count': 3},
+            'sub_node': {'id': 1, 'name': u'sub'},
+            'sub_seq_nodes': [{'id': num, 'name': u'bob%s' % num} for num in range(3)],
+        }
+
+    def test_round_trip(self):
+        # the same as going through JSON, except for DateTime
+        data = dumps(self.schema, self.value)
+        serialized = self.schema.serialize(self.value)
+        serialized['datey'] = '2007-01-25T12:00:00Z'
+        expected = self.schema.deserialize(json.loads(json.dumps(serialized)))
+        self.assertEqual(loads(self.schema, data), expected)
+        self.assertTrue(len(data) < len(json.dumps(serialized)) / 2)
+
+    def test_plain_msgpack(self):
+        # fields are keyed by the index of their sorted names
+        names = sorted(child.name for child in self.schema.children)
+        value = unpack(dumps(self.schema, self.value))
+        self.assertEqual(value[names.index('id')], 5)
+        self.assertEqual(value[names.index('booly')], True)
+        self.assertEqual(value[names.index('datey')], self.value['datey'])
+        self.assertEqual(value[names.index('tags')], [u'a', u'b'])
+
+    def test_invalid(self):
+        names = sorted(child.name for child in self.schema.children)
+        raw = unpack(dumps(self.schema, self.value))
+        raw[names.index('id')] = u'five'
+        del raw[names.index('name')]
+        raw[names.index('sub_seq_nodes')][1] = {0: u'x', 1: u'bob'}
+        raw[99] = u'unknown fields are skipped'
+
+        try:
+            loads(self.schema, pack(raw))
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {
+                'id': ['SchemaNode is not an integer.'],
+                'name': ['The field named \'name\' is missing.'],
+                'sub_seq_nodes': {'1': {'id': ['SchemaNode is not an integer.']}},
+            })
+        else:
+            self.fail()
+
+        # coerced like deserialize would, then validated
+        raw = unpack(dumps(self.schema, self.value))
+        raw[names.index('id')] = u'5000'
+        try:
+            loads(self.schema, pack(raw))
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'id': ['Greater than maximum value of 1000']})
+        else:
+            self.fail()
+
+        self.assertRaises(Invalid, loads, self.schema, dumps(self.schema, self.value)[:-3])
+        self.assertRaises(Invalid, loads, self.schema, b'\x01')
+        self.assertRaises(Invalid, loads, self.schema, b'\x81\x81\x90\x00\x00')
+
+    def test_none(self):
+        class CountsSchema(SchemaModel):
+            counts = SchemaNode(Sequence(), SchemaNode(Int()))
+            dates = SchemaNode(Sequence(), SchemaNode(DateTime()))
+
+        schema = CountsSchema()
+        value = {'counts': [1, None], 'dates': [None]}
+        self.assertEqual(unpack(dumps(schema, value)), {0: [1, None], 1: [None]})
+        self.assertEqual(schema.serialize(value), {'counts': [1, None], 'dates': [None]})
+
+    def test_overridden(self):
+        class Up(Mapping):
+            def deserialize(self, value, mapping, node, model):
+                deserialized = super(Up, self).deserialize(value, mapping, node, model)
+                deserialized['extra'] = 1
+                return deserialized
+
+        class UpperNode(SchemaNode):
+            def deserialize(self, value, mapping=None, node=None, model=None, **options):
+                return super(UpperNode, self).deserialize(value, mapping, node, model).upper()
+
+        class KindSchema(SchemaModel):
+            name = SchemaNode(String())
+
+            def serialize(self, value, depth=0, mapping=None, node=None, model=None, **options):
+                serialized = super(KindSchema, self).serialize(value, depth, mapping, node, model)
+                serialized['name'] += u'!'
+                return serialized
+
+        class OverriddenSchema(SchemaModel):
+            up = SchemaNode(Up(), SchemaNode(Int(), name='a', missing=None))
+            name = UpperNode(String())
+            names = SchemaNode(Sequence(), UpperNode(String()))
+            kind_node = SchemaNode(Relationship('KindSchema', uselist=False))
+            kind_nodes = SchemaNode(Relationship('KindSchema'))
+
+        schema = OverriddenSchema()
+        value = {'up': {'a': 1}, 'name': u'abc', 'names': [u'd'], 'kind_node': {'name': u'e'},
+                 'kind_nodes': [{'name': u'f'}]}
+        self.assertEqual(loads(schema, dumps(schema, value)),
+                         schema.deserialize(schema.serialize(value)))
+        self.assertEqual(loads(schema, dumps(schema, value)), {
+            'up': {'a': 1, 'extra': 1}, 'name': u'ABC', 'names': [u'D'],
+            'kind_node': {'name': u'e!'}, 'kind_nodes': [{'name': u'f!'}],
+        })
+
+    def test_max_depth(self):
+        names = sorted(child.name for child in self.schema.children)
+        value = unpack(dumps(self.schema, self.value, max_depth=0))
+        self.assertEqual(value[names.index('sub_seq_nodes')], [])
+        self.assertEqual(value[names.index('sub_node')], {})
+
+    def test_polymorphic(self):
+        class EventSchema(SchemaModel):
+            event = SchemaNode(Polymorphic('kind', {'child': 'ChildSchema'}))
+
+        schema = EventSchema()
+        value = {'event': {'kind': 'child', 'id': 1, 'name': u'bob'}}
+        self.assertEqual(loads(schema, dumps(schema, value)),
+                         {'event': {'id': 1, 'name': u'bob'}})
+
+        try:
+            loads(schema, pack({0: [u'other', {}]}))
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'event': ['\'other\' is not one of child.']})
+        else:
+            self.fail()
+
+    def test_records(self):
+        result = loads(self.schema, dumps(self.schema, self.value), records=True)
+        self.assertEqual(result.sub_seq_nodes[2].name, u'bob2')
+        self.assertEqual(result.asdict()['id'], 5)
@@ -0,0 +1,106 @@
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap.caching import LRUCache
+
+
+class TestCaching(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+        calls = self.calls = []
+
+        class Counted(String):
+            def serialize(self, value, depth, mapping, node, model):
+                calls.append(value)
+                return value
+
+        class ChildSchema(SchemaModel):
+            version = 'version'
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted())
+            parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+        class TestSchema(SchemaModel):
+            version = 'version'
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted())
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+        self.child_schema = ChildSchema
+        self.value = {'id': 0, 'name': 'blah', 'version': 1, 'sub_seq_nodes': [
+            {'id': num, 'name': 'bob%s' % num, 'version': 1, 'parent_node': None}
+            for num in range(1, 4)
+        ]}
+
+    def test_hits(self):
+        cache = LRUCache()
+        expected = self.schema().serialize(self.value)
+        del self.calls[:]
+
+        self.assertEqual(self.schema().serialize(self.value, cache=cache), expected)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(self.schema().serialize(self.value, cache=cache), expected)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+        # a child that was serialized on its own is reused in its parent, and the other
+        # way around
+        other = dict(self.value, id=10)
+        self.assertEqual(self.schema().serialize(other, cache=cache)['sub_seq_nodes'],
+                         expected['sub_seq_nodes'])
+        self.assertEqual(len(self.calls), 5)
+
+    def test_version(self):
+        cache = LRUCache()
+        self.schema().serialize(self.value, cache=cache)
+        self.value['sub_seq_nodes'][0]['name'] = 'changed'
+        self.value['sub_seq_nodes'][0]['version'] = 2
+        self.value['version'] = 2
+        serialized = self.schema().serialize(self.value, cache=cache)
+        self.assertEqual(serialized['sub_seq_nodes'][0]['name'], 'changed')
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        self.schema().serialize(self.value, cache=cache)
+        self.value['name'] = 'changed'
+        self.assertEqual(self.schema().serialize(self.value, cache=cache)['name'], 'blah')
+
+        cache.invalidate(self.schema, 0)
+        self.assertEqual(self.schema().serialize(self.value, cache=cache)['name'], 'changed')
+        self.assertEqual(len(cache), 4)
+
+    def test_max_depth(self):
+        cache = LRUCache()
+        shallow = self.schema(max_depth=0).serialize(self.value, cache=cache)
+        self.assertEqual(shallow['sub_seq_nodes'], [])
+        deep = self.schema().serialize(self.value, cache=cache)
+        self.assertEqual(len(deep['sub_seq_nodes']), 3)
+
+    def test_maxsize_and_stats(self):
+        cache = LRUCache(maxsize=2)
+        self.schema().serialize(self.value, cache=cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(cache.objects), 2)
+
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hit_ratio'], 0.0)
+        self.assertTrue(stats['memory'] > 0)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_schema_cache(self):
+        cache = LRUCache()
+        schema = self.schema(cache=cache)
+        schema.serialize(self.value)
+        schema.serialize(self.value)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(self.schema().cache is None)
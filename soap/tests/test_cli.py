@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+)
+from soap import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CliChildSchema(SchemaModel):
+    id = SchemaNode(Int())
+
+
+class CliSchema(SchemaModel):
+    id = SchemaNode(Int())
+    name = SchemaNode(String())
+    child_nodes = SchemaNode(Relationship('CliChildSchema'), missing=[])
+
+
+class TestCli(unittest.TestCase):
+    target = 'soap.tests.test_cli:CliSchema'
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, lines):
+        with io.open(self.path(name), 'w', encoding='utf-8') as handle:
+            for line in lines:
+                handle.write(u'%s\n' % line)
+        return self.path(name)
+
+    def read(self, name):
+        with io.open(self.path(name), encoding='utf-8') as handle:
+            return [json.loads(line) for line in handle]
+
+    def validate(self, filename, *extra):
+        argv = ['validate', self.target, self.path(filename),
+                '--valid', self.path('valid.ndjson'), '--errors', self.path('errors.ndjson')]
+        return cli.main(argv + list(extra))
+
+    def test_ndjson(self):
+        lines = [json.dumps({'id': num, 'name': 'blah', 'child_nodes': [{'id': 1}]})
+                 for num in range(10)]
+        lines[3] = json.dumps({'id': 'three', 'name': 'blah', 'child_nodes': [{'id': 'x'}]})
+        lines[5] = '{not json'
+        self.write('input.ndjson', lines)
+
+        for workers in ('1', '2'):
+            self.assertEqual(self.validate('input.ndjson', '--workers', workers,
+                                           '--batch-size', '3'), 1)
+            valid = self.read('valid.ndjson')
+            self.assertEqual([record['id'] for record in valid], [0, 1, 2, 4, 6, 7, 8, 9])
+            errors = self.read('errors.ndjson')
+            self.assertEqual(errors[0], {'line': 4, 'errors': {
+                'id': ['SchemaNode is not an integer.'],
+                'child_nodes': {'0': {'id': ['SchemaNode is not an integer.']}}
+            }})
+            self.assertEqual(errors[1]['line'], 6)
+            self.assertTrue(errors[1]['errors'][0].startswith('Not valid JSON'))
+
+    def test_csv(self):
+        self.write('input.csv', ['id,name', '1,blah', 'x,'])
+        self.assertEqual(self.validate('input.csv'), 1)
+        self.assertEqual(self.read('valid.ndjson'), [{'id': '1', 'name': 'blah'}])
+        self.assertEqual(self.read('errors.ndjson'), [{'line': 3, 'errors': {
+            'id': ['SchemaNode is not an integer.'],
+            'name': ["The field named 'name' is missing."]
+        }}])
+
+    def test_all_valid(self):
+        self.write('input.ndjson', [json.dumps({'id': 1, 'name': 'blah'})])
+        self.assertEqual(self.validate('input.ndjson'), 0)
+
+    def test_bad_target(self):
+        self.assertRaises(ValueError, cli.load, 'soap.tests.test_cli')
+
+    def test_main_module(self):
+        self.write('input.ndjson', [json.dumps({'id': 1, 'name': 'blah'}), '{}'])
+        proc = subprocess.Popen([sys.executable, '-m', 'soap', 'validate', self.target,
+                                 self.path('input.ndjson')], cwd=ROOT, stderr=subprocess.PIPE)
+        _, err = proc.communicate()
+        self.assertEqual(proc.returncode, 1)
+        self.assertTrue(b'2 records' in err)
+        self.assertTrue(b'1 invalid' in err)
@@ -0,0 +1,136 @@
+import copy
+import unittest
+from soap import (
+    Relationship,
+    Polymorphic,
+    Sequence,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap.delta import apply
+
+
+class TestDelta(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+        calls = self.calls = []
+
+        class Counted(String):
+            def serialize(self, value, depth, mapping, node, model):
+                calls.append(value)
+                return value
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted())
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted())
+            tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema()
+        self.old = {
+            'id': 0,
+            'name': 'blah',
+            'tags': ['a', 'b', 'c'],
+            'sub_node': {'id': 10, 'name': 'sub'},
+            'sub_seq_nodes': [{'id': num, 'name': 'bob%s' % num} for num in range(1, 4)],
+        }
+
+    def check(self, new, **options):
+        ops = self.schema.serialize_delta(self.old, new, **options)
+        # only count what serialize_delta serialized
+        calls = list(self.calls)
+        self.assertEqual(apply(self.schema.serialize(self.old, **options), ops),
+                         self.schema.serialize(new, **options))
+        self.calls[:] = calls
+        return ops
+
+    def test_unchanged(self):
+        self.assertEqual(self.check(copy.deepcopy(self.old)), [])
+        self.assertEqual(self.calls, [])
+
+    def test_fields(self):
+        new = copy.deepcopy(self.old)
+        new['name'] = 'changed'
+        new['tags'] = ['a', 'x']
+        new['sub_node']['name'] = 'changed sub'
+        ops = self.check(new)
+        self.assertEqual(sorted(ops, key=lambda op: op['path']), [
+            {'op': 'replace', 'path': ['name'], 'value': 'changed'},
+            {'op': 'replace', 'path': ['sub_node', 'name'], 'value': 'changed sub'},
+            {'op': 'replace', 'path': ['tags', 1], 'value': 'x'},
+            {'op': 'remove', 'path': ['tags', 2]},
+        ])
+        # only the changed names were serialized
+        self.assertEqual(sorted(self.calls), ['blah', 'changed', 'changed sub', 'sub'])
+
+    def test_identity_lists(self):
+        new = copy.deepcopy(self.old)
+        first, second, third = new['sub_seq_nodes']
+        second['name'] = 'renamed'
+        new['sub_seq_nodes'] = [third, second, {'id': 4, 'name': 'new'}]
+        ops = self.check(new)
+        self.assertEqual(ops, [
+            {'op': 'remove', 'path': ['sub_seq_nodes', {'id': 1}]},
+            {'op': 'replace', 'path': ['sub_seq_nodes', {'id': 2}, 'name'], 'value': 'renamed'},
+            {'op': 'add', 'path': ['sub_seq_nodes', {'id': 4}], 'value': {'id': 4, 'name': 'new'}},
+            {'op': 'order', 'path': ['sub_seq_nodes'], 'key': 'id', 'value': [3, 2, 4]},
+        ])
+
+        # without identities, lists are compared by index
+        for value in new['sub_seq_nodes']:
+            del value['id']
+        self.check(new)
+
+    def test_version(self):
+        self.schema.__class__.version = 'version'
+        self.old['version'] = 1
+        new = copy.deepcopy(self.old)
+        new['name'] = 'changed'
+        # same identity and version, so the change isn't even looked at
+        self.assertEqual(self.schema.serialize_delta(self.old, new), [])
+        new['version'] = 2
+        self.assertEqual(len(self.schema.serialize_delta(self.old, new)), 1)
+
+    def test_serialized(self):
+        new = copy.deepcopy(self.old)
+        new['sub_seq_nodes'].append({'id': 5, 'name': 'five'})
+        serialized = self.schema.serialize(self.old)
+        ops = self.schema.serialize_delta(serialized, new, serialized=True)
+        self.assertEqual(apply(serialized, ops), self.schema.serialize(new))
+        self.assertEqual(ops[0], {'op': 'add', 'path': ['sub_seq_nodes', {'id': 5}],
+                                  'value': {'id': 5, 'name': 'five'}})
+
+    def test_max_depth(self):
+        new = copy.deepcopy(self.old)
+        new['sub_node']['name'] = 'changed sub'
+        self.assertEqual(self.check(new, max_depth=0), [])
+
+    def test_replace_whole(self):
+        new = copy.deepcopy(self.old)
+        new['sub_node'] = None
+        self.assertEqual(self.check(new), [{'op': 'replace', 'path': ['sub_node'], 'value': {}}])
+
+    def test_polymorphic(self):
+        class EventSchema(SchemaModel):
+            kind = SchemaNode(String())
+            name = SchemaNode(String())
+
+        class HolderSchema(SchemaModel):
+            event = SchemaNode(Polymorphic('kind', {'event': 'EventSchema', 'child': 'ChildSchema'}))
+
+        schema = HolderSchema()
+        old = {'event': {'kind': 'event', 'name': 'a'}}
+        new = {'event': {'kind': 'event', 'name': 'b'}}
+        self.assertEqual(schema.serialize_delta(old, new),
+                         [{'op': 'replace', 'path': ['event', 'name'], 'value': 'b'}])
+        new = {'event': {'kind': 'child', 'id': 1, 'name': 'b'}}
+        self.assertEqual(schema.serialize_delta(old, new),
+                         [{'op': 'replace', 'path': ['event'], 'value': {'id': 1, 'name': 'b'}}])
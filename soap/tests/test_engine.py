@@ -0,0 +1,267 @@
+import sys
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    Boolean,
+    Mapping,
+    Sequence,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    Invalid,
+)
+
+
+def starts_with_b(value, mapping, node, model):
+    if not value.startswith('b'):
+        raise Invalid('This is an error.', node)
+
+
+def is_blah(value, mapping, node, model):
+    if value != 'blah':
+        raise Invalid('This is an error too.', node)
+
+
+class Upper(object):
+    """ A custom type, which the engine treats as a leaf. """
+
+    def deserialize(self, value, mapping, node, model):
+        return str(value).upper()
+
+    def serialize(self, value, depth, mapping, node, model):
+        return value.lower()
+
+
+class StrictMapping(Mapping):
+    def validate(self, value, mapping, node, model):
+        if not isinstance(value, dict):
+            raise Invalid('Not a dict.', node)
+        return value
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String(), validator=starts_with_b, preparer=lambda v: v.strip())
+            shout = SchemaNode(Upper(), missing='')
+            parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String(), validator=[starts_with_b, is_blah])
+            booly = SchemaNode(Boolean(), missing=False)
+            extra = SchemaNode(StrictMapping(),
+                               SchemaNode(Int(), name='sub_id'),
+                               SchemaNode(Sequence(), SchemaNode(String()), name='tags', missing=[]),
+                               missing={})
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+
+    def both(self, method, value, **kwargs):
+        """ Returns the result (or the Invalid.asdict()) of both implementations. """
+        results = []
+        for iterative in (True, False):
+            schema = self.schema(iterative=iterative, **kwargs)
+            try:
+                results.append(getattr(schema, method)(value))
+            except Invalid as e:
+                results.append(('Invalid', e.asdict()))
+        return results
+
+    def test_default(self):
+        self.assertTrue(self.schema.iterative)
+        self.assertFalse(SchemaModel('Flat', Mapping(), SchemaNode(Int(), name='id')).iterative)
+        self.assertTrue(SchemaModel('Forced', Mapping(), iterative=True).iterative)
+
+    def test_deserialize(self):
+        json = {
+            'id': '0',
+            'name': 'blah',
+            'extra': {'sub_id': '1', 'tags': ['a', 2]},
+            'sub_node': {'id': 0, 'name': ' bob ', 'shout': 'hey'},
+            'sub_seq_nodes': [{
+                'id': '1',
+                'name': 'bill',
+                'parent_node': {'id': 0, 'name': 'blah', 'booly': 'false'},
+                'del_key': 'this key should be removed'
+            }, {
+                'id': 2,
+                'name': 'ben'
+            }]
+        }
+        iterative, recursive = self.both('deserialize', json)
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative['sub_node'], {'id': 0, 'name': 'bob', 'shout': 'HEY', 'parent_node': {}})
+        self.assertEqual(iterative['sub_seq_nodes'][0]['parent_node']['sub_seq_nodes'], [])
+
+    def test_deserialize_errors(self):
+        json = {
+            'id': 'zero',
+            'name': 'dlah',
+            'extra': ['not', 'a', 'dict'],
+            'sub_node': {'id': 0, 'name': {}},
+            'sub_seq_nodes': [{
+                'id': 0,
+                'name': 'eaaa',
+                'parent_node': {'id': 0, 'name': 'dlah', 'extra': {'tags': 'ab'}}
+            }, {
+                'id': 1,
+                'name': 'bill'
+            }, 'not a mapping', {
+                'name': 'bob'
+            }]
+        }
+        iterative, recursive = self.both('deserialize', json)
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative, ('Invalid', {
+            'id': ['SchemaNode is not an integer.'],
+            'name': ['This is an error.', 'This is an error too.'],
+            'extra': ['Not a dict.'],
+            'sub_node': {'name': ['This is an error.']},
+            'sub_seq_nodes': {
+                '0': {
+                    'name': ['This is an error.'],
+                    'parent_node': {
+                        'name': ['This is an error.', 'This is an error too.'],
+                        'extra': {'sub_id': ["The field named 'sub_id' is missing."]}
+                    }
+                },
+                '2': ['SchemaNode is not a mapping type.'],
+                '3': {'id': ["The field named 'id' is missing."]}
+            }
+        }))
+
+    def test_deserialize_relationship_errors(self):
+        # the model of a relationship fails before it gets to any of its fields
+        json = {'id': 0, 'name': 'blah', 'sub_node': 'not a mapping'}
+        iterative, recursive = self.both('deserialize', json)
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative, ('Invalid', {'sub_node': ['SchemaNode is not a mapping type.']}))
+
+    def test_deserialize_required(self):
+        self.assertEqual(*self.both('deserialize', {'id': 0, 'name': ''}))
+        self.assertEqual(*self.both('deserialize', {'id': 0, 'name': 'blah', 'sub_seq_nodes': []}))
+
+    def test_deserialize_budget(self):
+        json = {'id': 0, 'name': 'blah', 'sub_node': {'id': 0, 'name': 'bob', 'parent_node': {
+            'id': 0, 'name': 'blah', 'sub_node': {'id': 0, 'name': 'bob'}}}}
+        iterative, recursive = self.both('deserialize', json, max_nesting=2)
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative, ('Invalid', {
+            'sub_node': {'parent_node': {'sub_node': ['Nested deeper than the maximum of 2.']}}
+        }))
+        iterative, recursive = self.both('deserialize', json, max_nodes=5)
+        self.assertEqual(iterative, recursive)
+
+    def test_deserialize_deep(self):
+        class DeepSchema(SchemaModel):
+            id = SchemaNode(Int())
+            parent = SchemaNode(Relationship('DeepSchema', uselist=False), missing={})
+
+        depth = sys.getrecursionlimit() * 2
+        json = {'id': 0}
+        for num in range(depth):
+            json = {'id': str(num + 1), 'parent': json}
+
+        payload = DeepSchema().deserialize(json)
+        for num in range(depth, 0, -1):
+            self.assertEqual(payload['id'], num)
+            payload = payload['parent']
+        self.assertEqual(payload, {'id': 0, 'parent': {}})
+
+        self.assertRaises(RuntimeError, DeepSchema(iterative=False).deserialize, json)
+
+    def test_deserialize_deep_errors(self):
+        class DeepSchema(SchemaModel):
+            id = SchemaNode(Int())
+            parent = SchemaNode(Relationship('DeepSchema', uselist=False), missing={})
+
+        depth = sys.getrecursionlimit() * 2
+        json = {'id': 'x'}
+        for num in range(depth):
+            json = {'id': num, 'parent': json}
+
+        try:
+            DeepSchema().deserialize(json)
+            self.fail('deserialize did not raise')
+        except Invalid as e:
+            errors = e.asdict()
+            str(e)
+        for num in range(depth):
+            errors = errors['parent']
+        self.assertEqual(errors, {'id': ['SchemaNode is not an integer.']})
+
+    def test_overridden_nodes(self):
+        class UpperNode(SchemaNode):
+            def deserialize(self, value, mapping=None, node=None, model=None, **options):
+                return super(UpperNode, self).deserialize(value, mapping, node, model).upper()
+
+        class KindSchema(SchemaModel):
+            name = SchemaNode(String())
+
+            def serialize(self, value, depth=0, mapping=None, node=None, model=None, **options):
+                serialized = super(KindSchema, self).serialize(value, depth, mapping, node, model)
+                serialized['kind'] = 'kind'
+                return serialized
+
+        class OverriddenSchema(SchemaModel):
+            name = UpperNode(String())
+            names = SchemaNode(Sequence(), UpperNode(String()), missing=[])
+            kind_node = SchemaNode(Relationship('KindSchema', uselist=False), missing={})
+            kind_nodes = SchemaNode(Relationship('KindSchema'), missing=[])
+
+        self.schema = OverriddenSchema
+        iterative, recursive = self.both('deserialize', {'name': 'abc', 'names': ['d', 'e']})
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative, {'name': 'ABC', 'names': ['D', 'E'], 'kind_node': {},
+                                     'kind_nodes': []})
+
+        value = {'name': 'abc', 'names': [], 'kind_node': {'name': 'a'},
+                 'kind_nodes': [{'name': 'b'}]}
+        iterative, recursive = self.both('serialize', value)
+        self.assertEqual(iterative, recursive)
+        self.assertEqual(iterative['kind_node'], {'name': 'a', 'kind': 'kind'})
+        self.assertEqual(iterative['kind_nodes'], [{'name': 'b', 'kind': 'kind'}])
+
+    def test_serialize(self):
+        value = {
+            'id': 0,
+            'name': 'blah',
+            'booly': True,
+            'extra': {'sub_id': 1, 'tags': ['a', 'b']},
+            'sub_node': None,
+            'sub_seq_nodes': [{'id': num, 'name': 'bob', 'shout': 'HEY', 'parent_node': None}
+                              for num in range(3)]
+        }
+        value['sub_seq_nodes'][0]['parent_node'] = value
+        for max_depth in range(4):
+            iterative, recursive = self.both('serialize', value, max_depth=max_depth)
+            self.assertEqual(iterative, recursive)
+
+        self.assertEqual(iterative['sub_seq_nodes'][1], {
+            'id': 1, 'name': 'bob', 'shout': 'hey', 'parent_node': {}
+        })
+        self.assertEqual(iterative['extra'], {'sub_id': 1, 'tags': ['a', 'b']})
+
+    def test_serialize_deep(self):
+        class DeepSchema(SchemaModel):
+            id = SchemaNode(Int())
+            parent = SchemaNode(Relationship('DeepSchema', uselist=False), missing={})
+
+        depth = sys.getrecursionlimit() * 2
+        value = {'id': 0, 'parent': None}
+        for num in range(depth):
+            value = {'id': num + 1, 'parent': value}
+
+        serialized = DeepSchema(max_depth=depth).serialize(value)
+        for num in range(depth, 0, -1):
+            self.assertEqual(serialized['id'], num)
+            serialized = serialized['parent']
+        self.assertEqual(serialized, {'id': 0, 'parent': {}})
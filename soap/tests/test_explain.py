@@ -0,0 +1,95 @@
+import unittest
+from soap import (
+    Relationship,
+    Polymorphic,
+    Sequence,
+    String,
+    Int,
+    Range,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+
+
+class TestExplain(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class BaseSchema(SchemaModel):
+            id = SchemaNode(Int())
+
+        class Mixin(object):
+            created = SchemaNode(Int(), missing=None)
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int(), validator=Range(1))
+            name = SchemaNode(String(), preparer=[lambda value: value.strip(),
+                                                  lambda value: value.lower()])
+            child_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        class TestSchema(BaseSchema, Mixin):
+            name = SchemaNode(String())
+            tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema()
+
+    def nodes(self, explanation):
+        return dict((node['path'], node) for node in explanation.nodes)
+
+    def test_nodes(self):
+        explanation = self.schema.explain(shape={'tags': 3, 'sub_seq_nodes': 5}, length=2)
+        nodes = self.nodes(explanation)
+        self.assertEqual(nodes['created']['defined_in'], 'Mixin')
+        self.assertEqual(nodes['tags']['fans_out'], 3)
+        self.assertEqual(nodes['tags.*']['visits'], 3)
+        self.assertEqual(nodes['sub_node.name']['preparers'], 2)
+        self.assertEqual(nodes['sub_node.id']['validators'], 1)
+        self.assertEqual(nodes['sub_seq_nodes.*.child_nodes.*.id']['visits'], 10)
+        self.assertEqual(nodes['sub_seq_nodes.*.child_nodes.*.id']['depth'], 2)
+        self.assertEqual(nodes['sub_seq_nodes.*.child_nodes.*.child_nodes']['notes'],
+                         'not expanded, max_depth')
+        self.assertFalse('sub_seq_nodes.*.child_nodes.*.child_nodes.*.id' in nodes)
+        self.assertEqual(explanation.visits, sum(node['visits'] for node in explanation.nodes))
+
+        nodes = self.nodes(self.schema.explain(max_depth=1))
+        self.assertFalse('sub_seq_nodes.*.child_nodes.*.id' in nodes)
+        self.assertEqual(self.schema.explain(max_depth=1).asdict()['max_depth'], 1)
+
+    def test_warnings(self):
+        warnings = self.schema.explain().warnings
+        self.assertTrue('TestSchema does not have the fields id of its base BaseSchema' in warnings)
+        self.assertEqual(len([warning for warning in warnings
+                              if warning.startswith('ChildSchema expands into itself about 10 times')]), 1)
+        self.assertTrue('warning: ChildSchema expands' in str(self.schema.explain()))
+
+    def test_linear_recursion(self):
+        class LinkSchema(SchemaModel):
+            id = SchemaNode(Int())
+            next_node = SchemaNode(Relationship('LinkSchema', uselist=False), missing={})
+
+        class EventSchema(SchemaModel):
+            kind = SchemaNode(String())
+            event = SchemaNode(Polymorphic('kind', {'event': 'EventSchema'}), missing=None)
+
+        # one nested model per level isn't exponential
+        self.assertEqual(LinkSchema().explain(max_depth=5).warnings, [])
+        explanation = EventSchema().explain()
+        self.assertEqual(explanation.warnings, [])
+        self.assertEqual(self.nodes(explanation)['event']['notes'], 'recursive, EventSchema')
+
+        # two of them are
+        class TreeSchema(SchemaModel):
+            left = SchemaNode(Relationship('TreeSchema', uselist=False), missing={})
+            right = SchemaNode(Relationship('TreeSchema', uselist=False), missing={})
+
+        self.assertEqual(len(TreeSchema().explain().warnings), 1)
+
+    def test_unregistered(self):
+        class BrokenSchema(SchemaModel):
+            missing_node = SchemaNode(Relationship('MissingSchema'), missing=[])
+
+        self.assertEqual(BrokenSchema().explain().warnings,
+                         ['missing_node points to MissingSchema, which is not registered'])
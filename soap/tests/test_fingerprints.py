@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    DateTime,
+    Sequence,
+    Mapping,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    Length,
+    Regex,
+    Choice,
+    UniqueBy,
+)
+from soap.fingerprints import check, fingerprint
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def strip(value):
+    return value.strip()
+
+
+class TestFingerprints(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+    def define(self, max_length=10):
+        with SchemaModel._models.scope():
+            class ChildSchema(SchemaModel):
+                id = SchemaNode(Int())
+                parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+            class TestSchema(SchemaModel):
+                id = SchemaNode(Int())
+                name = SchemaNode(String(), validator=Length(_max=max_length), preparer=strip)
+                datey = SchemaNode(DateTime(), missing=None)
+                tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+                sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        return TestSchema
+
+    def test_fingerprint(self):
+        first, second = self.define(), self.define()
+        self.assertEqual(fingerprint(first()), fingerprint(second()))
+        self.assertNotEqual(fingerprint(first()), fingerprint(self.define(max_length=11)()))
+
+    def test_fingerprint_is_stable_across_processes(self):
+        code = ('from soap import SchemaModel, SchemaNode, Mapping, Int, Length, SubsetOf\n'
+                'from soap.fingerprints import fingerprint\n'
+                'schema = SchemaModel("TestSchema", Mapping(),\n'
+                '                     SchemaNode(Int(), name="id", validator=Length(1),\n'
+                '                                preparer=lambda value: value + 1),\n'
+                '                     SchemaNode(Int(), name="code",\n'
+                '                                validator=SubsetOf(["a", "b", "c", "d"])))\n'
+                'print(fingerprint(schema))\n')
+        results = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                    stdout=subprocess.PIPE)
+            out, _ = proc.communicate()
+            results.add(out.strip())
+        self.assertEqual(len(results), 1)
+
+    def test_fingerprint_functions(self):
+        def define(preparer, validator=None):
+            return SchemaModel('TestSchema', Mapping(),
+                               SchemaNode(String(), name='name', preparer=preparer,
+                                          validator=validator))
+
+        self.assertEqual(fingerprint(define(lambda value: value.strip())),
+                         fingerprint(define(lambda value: value.strip())))
+        self.assertNotEqual(fingerprint(define(lambda value: value.strip())),
+                            fingerprint(define(lambda value: value.lower())))
+        self.assertNotEqual(fingerprint(define(strip, UniqueBy('id'))),
+                            fingerprint(define(strip, UniqueBy('name'))))
+
+        def recursive(value):
+            return recursive(value[1:]) if value else value
+        self.assertEqual(fingerprint(define(recursive)), fingerprint(define(recursive)))
+
+    def test_fingerprint_values(self):
+        # keys that can't be compared with each other
+        datatypes = [Choice([1, 'a']), Choice({1: 'one', 'a': 'A'})]
+        try:
+            import enum
+        except ImportError:
+            pass
+        else:
+            datatypes.append(Choice(enum.Enum('Color', [('red', 1), ('blue', 'b')])))
+
+        for datatype in datatypes:
+            schema = SchemaModel('TestSchema', Mapping(), SchemaNode(datatype, name='choice'))
+            self.assertEqual(fingerprint(schema), fingerprint(schema))
+
+    def test_fingerprint_after_use(self):
+        schema = SchemaModel('TestSchema', Mapping(),
+                             SchemaNode(String(), name='code',
+                                        validator=Regex('[a-z]+[0-9]*', linear=True)))
+        before = fingerprint(schema)
+        schema.deserialize({'code': 'abc123'})
+        self.assertEqual(fingerprint(schema), before)
+        schema.deserialize({'code': 'abc'}, records=True)
+        self.assertEqual(fingerprint(schema), before)
+
+        other = SchemaModel('TestSchema', Mapping(),
+                            SchemaNode(String(), name='code', validator=Regex('[a-z]+[0-9]*')))
+        self.assertNotEqual(fingerprint(other), before)
+
+    def test_check(self):
+        schema = self.define()
+        check(schema._models)
+
+    def test_unresolved(self):
+        SchemaModel('Broken', Mapping(), SchemaNode(Relationship('Missing'), name='missing'))
+        self.assertRaises(KeyError, check, SchemaModel._models)
@@ -20,10 +20,9 @@ date = datetime(2007, 1, 25, 12, 0, tzinfo=iso8601.Utc())
 
 class TestFunctional(unittest.TestCase):
     def setUp(self):
-        from soap import SchemaModelMeta
+        from soap import Registry
         from soap import SchemaModel
-        SchemaModelMeta._models = {}
-        SchemaModel._models = {}
+        SchemaModel._models = Registry()
 
 
 class TestFunctionalDeclarative(TestFunctional):
@@ -0,0 +1,182 @@
+import json
+import unittest
+from soap import (
+    Invalid,
+    Relationship,
+    Polymorphic,
+    Mapping,
+    Sequence,
+    String,
+    Int,
+    Boolean,
+    DateTime,
+    Range,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap.jsonscan import loads
+
+
+class TestJsonScan(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int(), validator=Range(0, 1000))
+            name = SchemaNode(String())
+            booly = SchemaNode(Boolean())
+            datey = SchemaNode(DateTime())
+            counts = SchemaNode(Sequence(), SchemaNode(Int()), missing=[])
+            extra = SchemaNode(Mapping(), SchemaNode(Int(), name='count'), missing=None)
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema()
+        self.value = {
+            'id': 5,
+            'name': u'blah',
+            'booly': True,
+            'datey': '2007-01-25T12:00:00Z',
+            'counts': [1, '2', 3],
+            'extra': {'count': '3', 'unknown': [1, 2]},
+            'sub_node': {'id': 1, 'name': u'sub'},
+            'sub_seq_nodes': [{'id': num, 'name': u'bob%s' % num} for num in range(3)],
+            'ignored': {'x': [1, {'y': u'}]"\\'}], 'z': None},
+        }
+
+    def test_same_as_deserialize(self):
+        text = json.dumps(self.value)
+        for options in ({}, {'iterative': True}, {'records': True}, {'trusted': True}):
+            self.assertEqual(loads(self.schema, text, **options),
+                             self.schema.deserialize(json.loads(text), **options))
+        self.assertEqual(loads(self.schema, text.encode('utf-8')),
+                         self.schema.deserialize(self.value))
+
+        # missing values, and values that are converted by their type
+        value = dict(self.value, id='5', booly='false', counts=None)
+        del value['extra']
+        self.assertEqual(loads(self.schema, json.dumps(value)), self.schema.deserialize(value))
+
+    def test_invalid(self):
+        value = dict(self.value, id=5000)
+        del value['booly']
+        value['sub_seq_nodes'] = [{'id': 1, 'name': u'a'}, {'id': 'x', 'name': u'b'}]
+        text = json.dumps(value, sort_keys=True)
+        try:
+            loads(self.schema, text)
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {
+                'id': ['Greater than maximum value of 1000'],
+                'booly': ['The field named \'booly\' is missing.'],
+                'sub_seq_nodes': {'1': {'id': ['SchemaNode is not an integer.']}},
+            })
+            errors = dict((child.node.name, child) for child in e.children)
+            self.assertEqual(e.offset, 0)
+            self.assertEqual(errors['id'].offset, text.index('5000'))
+            # a missing field is at the object it's missing from
+            self.assertEqual(errors['booly'].offset, 0)
+            seq = errors['sub_seq_nodes']
+            self.assertEqual(seq.offset, text.index('[{"id": 1'))
+            self.assertEqual(seq.children[0].offset, text.index('{"id": "x"'))
+            self.assertEqual(seq.children[0].children[0].offset, text.index('"id": "x"') + 6)
+        else:
+            self.fail()
+
+    def test_not_json(self):
+        for text, offset in (('{"id" 1}', 6), ('{"id": 1} x', 10)):
+            try:
+                loads(self.schema, text)
+            except Invalid as e:
+                self.assertTrue(e.msg.startswith('Not valid JSON: '))
+                self.assertEqual(e.offset, offset)
+            else:
+                self.fail()
+
+        try:
+            loads(self.schema, ' [1]')
+        except Invalid as e:
+            self.assertEqual(e.asdict(), ['SchemaNode is not a mapping type.'])
+            self.assertEqual(e.offset, 1)
+        else:
+            self.fail()
+
+    def test_overridden_types(self):
+        class Up(Mapping):
+            def deserialize(self, value, mapping, node, model):
+                deserialized = super(Up, self).deserialize(value, mapping, node, model)
+                deserialized['extra'] = 1
+                return deserialized
+
+        class Reversed(Sequence):
+            def deserialize(self, value, mapping, node, model):
+                return super(Reversed, self).deserialize(value, mapping, node, model)[::-1]
+
+        class UpperNode(SchemaNode):
+            def deserialize(self, value, mapping=None, node=None, model=None, **options):
+                return super(UpperNode, self).deserialize(value, mapping, node, model).upper()
+
+        class UpperSchema(SchemaModel):
+            name = SchemaNode(String())
+
+            def deserialize(self, value, mapping=None, node=None, model=None, **options):
+                deserialized = super(UpperSchema, self).deserialize(value, mapping, node, model)
+                deserialized['name'] = deserialized['name'].upper()
+                return deserialized
+
+        class OverriddenSchema(SchemaModel):
+            up = SchemaNode(Up(), SchemaNode(Int(), name='a', missing=None))
+            counts = SchemaNode(Reversed(), SchemaNode(Int()))
+            name = UpperNode(String())
+            names = SchemaNode(Sequence(), UpperNode(String()))
+            upper_node = SchemaNode(Relationship('UpperSchema', uselist=False))
+
+        schema = OverriddenSchema()
+        text = ('{"up": {}, "counts": [1, 2, 3], "name": "a", "names": ["b"], '
+                '"upper_node": {"name": "c"}}')
+        self.assertEqual(loads(schema, text), schema.deserialize(json.loads(text)))
+        self.assertEqual(loads(schema, text), {'up': {'a': None, 'extra': 1},
+                                               'counts': [3, 2, 1], 'name': 'A',
+                                               'names': ['B'], 'upper_node': {'name': 'C'}})
+
+    def test_polymorphic(self):
+        class EventSchema(SchemaModel):
+            event = SchemaNode(Polymorphic('kind', {'child': 'ChildSchema'}))
+
+        schema = EventSchema()
+        text = '{"event": {"id": 1, "name": "bob", "kind": "child"}}'
+        self.assertEqual(loads(schema, text), {'event': {'id': 1, 'name': u'bob'}})
+
+        text = '{"event": {"kind": "child", "id": "x"}}'
+        try:
+            loads(schema, text)
+        except Invalid as e:
+            event = e.children[0]
+            self.assertEqual(event.offset, text.index('{"kind"'))
+            self.assertEqual(sorted(child.offset for child in event.children),
+                             [text.index('{"kind"'), text.index('"x"')])
+        else:
+            self.fail()
+
+    def test_budget(self):
+        # deserialized as usual, so that the limits are kept, and the errors still located
+        text = json.dumps(self.value)
+        try:
+            loads(self.schema, text, max_nodes=5)
+        except Invalid as e:
+            self.assertEqual(e.asdict(), ['Exceeded the maximum of 5 nodes.'])
+            self.assertEqual(e.offset, 0)
+        else:
+            self.fail()
+
+        try:
+            loads(self.schema, text.replace('blah', 'blahblah'), max_length=5)
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'name': ['Longer than the maximum length of 5.']})
+            self.assertEqual(e.children[0].offset, text.index('"blah'))
+        else:
+            self.fail()
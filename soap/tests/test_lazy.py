@@ -0,0 +1,129 @@
+import unittest
+from soap import (
+    Invalid,
+    Relationship,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    Length,
+)
+from soap.lazy import LazyMapping
+
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+        calls = self.calls = []
+
+        class Counted(String):
+            def deserialize(self, value, mapping, node, model):
+                calls.append(node.name)
+                return super(Counted, self).deserialize(value, mapping, node, model)
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted(), validator=Length(_max=5))
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(Counted(), validator=Length(_max=5))
+            note = SchemaNode(Counted(), missing=None)
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema()
+        self.value = {
+            'id': 1,
+            'name': 'blah',
+            'sub_node': {'id': 2, 'name': 'sub'},
+            'sub_seq_nodes': [{'id': 3, 'name': 'seq'}],
+        }
+
+    def test_on_access(self):
+        payload = self.schema.deserialize_lazy(self.value)
+        self.assertTrue(isinstance(payload, LazyMapping))
+        self.assertEqual(self.calls, [])
+
+        self.assertEqual(payload['name'], 'blah')
+        self.assertEqual(payload.name, 'blah')
+        self.assertEqual(self.calls, ['name'])
+        self.assertEqual(payload.get('note'), None)
+        self.assertEqual(payload.get('unknown', 'default'), 'default')
+        self.assertEqual(payload.loaded(), ['name', 'note'])
+        self.assertEqual(self.calls, ['name'])
+
+        sub_node = payload.sub_node
+        self.assertTrue(isinstance(sub_node, LazyMapping))
+        self.assertEqual(self.calls, ['name'])
+        self.assertEqual(sub_node.name, 'sub')
+        self.assertEqual(payload['sub_seq_nodes'], [{'id': 3, 'name': 'seq'}])
+        self.assertEqual(sorted(payload.keys()), ['id', 'name', 'note', 'sub_node', 'sub_seq_nodes'])
+        self.assertTrue('note' in payload)
+        self.assertFalse('unknown' in payload)
+        self.assertRaises(AttributeError, getattr, payload, 'unknown')
+
+    def test_force(self):
+        payload = self.schema.deserialize_lazy(self.value)
+        payload.name
+        self.assertEqual(payload.force(), self.schema.deserialize(self.value))
+        self.assertEqual(payload.force(), self.schema.deserialize(self.value))
+
+    def test_structure(self):
+        self.assertRaises(Invalid, self.schema.deserialize_lazy, 'not a mapping')
+        value = dict(self.value)
+        del value['id']
+        del value['name']
+        try:
+            self.schema.deserialize_lazy(value)
+            self.fail('missing fields were not reported')
+        except Invalid as e:
+            self.assertEqual(sorted(e.asdict()), ['id', 'name'])
+        # nothing else was looked at
+        self.assertEqual(self.calls, [])
+
+    def test_invalid(self):
+        self.value['name'] = 'too long'
+        self.value['sub_node']['name'] = 'too long'
+        self.value['sub_seq_nodes'][0]['id'] = 'a'
+        payload = self.schema.deserialize_lazy(self.value)
+        self.assertEqual(payload.id, 1)
+        for _ in range(2):
+            try:
+                payload.name
+                self.fail('name was not validated')
+            except Invalid as e:
+                self.assertEqual(list(e.asdict()), ['name'])
+        self.assertEqual(self.calls, ['name'])
+
+        try:
+            payload.force()
+            self.fail('force did not raise')
+        except Invalid as lazy_error:
+            try:
+                self.schema.deserialize(self.value)
+            except Invalid as e:
+                self.assertEqual(lazy_error.asdict(), e.asdict())
+
+    def test_invalid_nested(self):
+        # a missing field of a Relationship, along with the other errors in it
+        self.value['sub_node'] = {'name': 'too long'}
+        payload = self.schema.deserialize_lazy(self.value)
+        try:
+            payload.force()
+            self.fail('force did not raise')
+        except Invalid as lazy_error:
+            try:
+                self.schema.deserialize(self.value)
+                self.fail('deserialize did not raise')
+            except Invalid as e:
+                self.assertEqual(lazy_error.asdict(), e.asdict())
+                self.assertEqual(sorted(e.asdict()['sub_node']), ['id', 'name'])
+
+    def test_records(self):
+        payload = self.schema.deserialize_lazy(self.value, records=True)
+        self.assertEqual(payload.sub_seq_nodes[0].name, 'seq')
+        record = payload.force()
+        self.assertEqual(record.sub_node.name, 'sub')
+        self.assertEqual(record.asdict(), self.schema.deserialize(self.value))
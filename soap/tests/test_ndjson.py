@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from soap import (
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap.ndjson import NDJSONFile, validate_range
+
+
+class TestNDJSON(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+
+        self.schema = TestSchema()
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'input.ndjson')
+
+        lines = [json.dumps({'id': num, 'name': 'blah' * (num % 5 + 1)}) for num in range(100)]
+        lines[10] = json.dumps({'id': 'ten', 'name': 'blah'})
+        lines[20] = ''
+        lines[30] = '{not json'
+        with open(self.path, 'w') as handle:
+            # no newline at the end of the last line
+            handle.write('\n'.join(lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_index(self):
+        with NDJSONFile(self.path) as ndjson:
+            self.assertEqual(len(ndjson), 100)
+            self.assertEqual(ndjson.offsets[-1], os.path.getsize(self.path))
+            self.assertEqual(ndjson.record(1), {'id': 0, 'name': 'blah'})
+            self.assertEqual(ndjson.record(100), {'id': 99, 'name': 'blah' * 5})
+            self.assertEqual(ndjson.line(21), b'')
+            self.assertRaises(IndexError, ndjson.line, 0)
+            self.assertRaises(IndexError, ndjson.line, 101)
+
+    def test_validate(self):
+        with NDJSONFile(self.path) as ndjson:
+            results = list(ndjson.validate(self.schema))
+            # the blank line is skipped
+            self.assertEqual(len(results), 99)
+            errors = [(line, e.asdict()) for line, _, e in results if e is not None]
+            self.assertEqual(errors[0], (11, {'id': ['SchemaNode is not an integer.']}))
+            self.assertEqual(errors[1][0], 31)
+            self.assertEqual(len(errors), 2)
+            self.assertEqual(results[0], (1, {'id': 0, 'name': 'blah'}, None))
+
+            # random access
+            again = list(ndjson.validate(self.schema, lines=[11, 21, 50]))
+            self.assertEqual([line for line, _, _ in again], [11, 50])
+            self.assertTrue(again[0][2] is not None)
+            self.assertEqual(again[1][1], {'id': 49, 'name': 'blah' * 5})
+
+            self.assertEqual([line for line, _, _ in ndjson.validate(self.schema, start=5, stop=8)],
+                             [5, 6, 7])
+
+    def test_chunks(self):
+        with NDJSONFile(self.path) as ndjson:
+            expected = [(line, value) for line, value, _ in ndjson.validate(self.schema)]
+            chunks = ndjson.chunks(4)
+            sizes = [stop - start for start, stop, _ in chunks]
+
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], os.path.getsize(self.path))
+        self.assertTrue(max(sizes) - min(sizes) < 200)
+
+        results = []
+        for chunk in chunks:
+            results.extend((line, value) for line, value, _ in
+                           validate_range(self.schema, self.path, *chunk))
+        self.assertEqual(results, expected)
+
+    def test_small_and_empty(self):
+        with NDJSONFile(self.path) as ndjson:
+            self.assertEqual(len(ndjson.chunks(1000)), 100)
+
+        empty = os.path.join(self.dir, 'empty.ndjson')
+        open(empty, 'w').close()
+        with NDJSONFile(empty) as ndjson:
+            self.assertEqual(len(ndjson), 0)
+            self.assertEqual(ndjson.chunks(4), [])
+            self.assertEqual(list(ndjson.validate(self.schema)), [])
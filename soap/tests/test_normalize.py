@@ -0,0 +1,93 @@
+import json
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    Mapping,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+
+
+class TestNormalize(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+            sibling_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+
+        parent = {'id': 0, 'name': 'blah', 'sub_node': None, 'sub_seq_nodes': []}
+        children = [{'id': num, 'name': 'bob%s' % num, 'parent_node': parent}
+                    for num in range(1, 4)]
+        for child in children:
+            child['sibling_nodes'] = [other for other in children if other is not child]
+        parent['sub_node'] = children[0]
+        parent['sub_seq_nodes'] = children
+        self.value = parent
+
+    def test_normalized(self):
+        result = self.schema().serialize(self.value, normalized=True)
+        self.assertEqual(result['result'], 0)
+        self.assertEqual(result['entities']['TestSchema'], {
+            0: {'id': 0, 'name': 'blah', 'sub_node': 1, 'sub_seq_nodes': [1, 2, 3]}
+        })
+        self.assertEqual(result['entities']['ChildSchema'][2], {
+            'id': 2, 'name': 'bob2', 'parent_node': 0, 'sibling_nodes': [1, 3]
+        })
+        self.assertEqual(sorted(result['entities']['ChildSchema']), [1, 2, 3])
+        # the JSON output has string keys, like any other
+        self.assertEqual(sorted(json.loads(json.dumps(result))['entities']['ChildSchema']),
+                         ['1', '2', '3'])
+
+    def test_smaller_than_inlined(self):
+        normalized = json.dumps(self.schema().serialize(self.value, normalized=True))
+        inlined = json.dumps(self.schema(max_depth=6).serialize(self.value))
+        self.assertTrue(len(normalized) * 10 < len(inlined))
+
+    def test_deep_cycle(self):
+        class DeepSchema(SchemaModel):
+            id = SchemaNode(Int())
+            parent = SchemaNode(Relationship('DeepSchema', uselist=False), missing={})
+
+        # a chain far longer than any max_depth, that loops back on itself
+        nodes = [{'id': num} for num in range(5000)]
+        for num, node in enumerate(nodes):
+            node['parent'] = nodes[(num + 1) % len(nodes)]
+        result = DeepSchema().serialize(nodes[0], normalized=True)
+        self.assertEqual(len(result['entities']['DeepSchema']), 5000)
+        self.assertEqual(result['entities']['DeepSchema'][4999], {'id': 4999, 'parent': 0})
+
+    def test_identity(self):
+        class KeyedSchema(SchemaModel):
+            identity = staticmethod(lambda value: value['key'].lower())
+            key = SchemaNode(String())
+            others = SchemaNode(Relationship('KeyedSchema'), missing=[])
+
+        value = {'key': 'A', 'others': [{'key': 'B'}, {'key': 'b'}]}
+        result = KeyedSchema().serialize(value, normalized=True)
+        self.assertEqual(result['result'], 'a')
+        self.assertEqual(sorted(result['entities']['KeyedSchema']), ['a', 'b'])
+
+    def test_missing_identity(self):
+        schema = SchemaModel('Anonymous', Mapping(), SchemaNode(String(), name='name'))
+        value = {'name': 'blah'}
+        self.assertEqual(schema.serialize(value, normalized=True),
+                         {'result': id(value), 'entities': {'Anonymous': {id(value): {'name': 'blah'}}}})
+
+    def test_empty(self):
+        self.assertEqual(self.schema().serialize(None, normalized=True),
+                         {'result': None, 'entities': {}})
+        self.assertFalse(self.schema().normalized)
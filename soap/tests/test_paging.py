@@ -0,0 +1,102 @@
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+
+
+class Query(object):
+    """ Stands in for a query object, which only supports slicing and count(). """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.slices = []
+
+    def __getitem__(self, index):
+        self.slices.append((index.start, index.stop))
+        return self.rows[index]
+
+    def count(self):
+        return len(self.rows)
+
+
+class TestPaging(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema', limit=2), missing=[])
+            other_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+        self.rows = [{'id': num, 'name': 'bob%s' % num} for num in range(5)]
+
+    def test_relationship_limit(self):
+        for iterative in (True, False):
+            schema = self.schema(iterative=iterative)
+            query = Query(self.rows)
+            value = {'id': 0, 'sub_seq_nodes': query, 'other_nodes': self.rows}
+            serialized = schema.serialize(value)
+            self.assertEqual(serialized['other_nodes'], self.rows)
+            page = serialized['sub_seq_nodes']
+            self.assertEqual(page['items'], self.rows[:2])
+            self.assertEqual((page['offset'], page['limit']), (0, 2))
+            self.assertFalse('total' in page)
+            # one more row than the limit is loaded, to know there's a next page
+            self.assertEqual(query.slices, [(0, 3)])
+
+            pages = [page]
+            while pages[-1]['next'] is not None:
+                windows = {'sub_seq_nodes': {'cursor': pages[-1]['next'], 'total': True}}
+                pages.append(schema.serialize(value, windows=windows)['sub_seq_nodes'])
+            self.assertEqual([row for page in pages for row in page['items']], self.rows)
+            self.assertEqual(pages[-1]['total'], 5)
+            self.assertEqual(len(pages), 3)
+
+    def test_per_call(self):
+        schema = self.schema()
+        value = {'id': 0, 'sub_seq_nodes': [], 'other_nodes': iter(self.rows)}
+        serialized = schema.serialize(value, windows={'other_nodes': {'offset': 3, 'limit': 10}})
+        self.assertEqual(serialized['other_nodes'], {'items': self.rows[3:], 'offset': 3,
+                                                     'limit': 10, 'next': None})
+        self.assertEqual(serialized['sub_seq_nodes'], {'items': [], 'offset': 0, 'limit': 2,
+                                                       'next': None})
+        # windows only apply to the call they're given to
+        value = {'id': 0, 'sub_seq_nodes': [], 'other_nodes': self.rows}
+        self.assertEqual(schema.serialize(value)['other_nodes'], self.rows)
+
+    def test_total_of_iterable(self):
+        value = {'id': 0, 'sub_seq_nodes': iter(self.rows), 'other_nodes': []}
+        page = self.schema().serialize(value, windows={'sub_seq_nodes': {'offset': 2,
+                                                                         'total': True}})
+        self.assertEqual(page['sub_seq_nodes'], {'items': self.rows[2:4], 'offset': 2,
+                                                 'limit': 2, 'total': 5, 'next': 'NA'})
+
+    def test_cache(self):
+        from soap.caching import LRUCache
+
+        class ParentSchema(SchemaModel):
+            id = SchemaNode(Int())
+            kids = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        cache = LRUCache()
+        schema = ParentSchema(cache=cache)
+        value = {'id': 0, 'kids': self.rows}
+        for limit in (1, 3, 1):
+            page = schema.serialize(value, windows={'kids': {'limit': limit}})['kids']
+            self.assertEqual(page['items'], self.rows[:limit])
+        self.assertEqual(schema.serialize(value)['kids'], self.rows)
+
+    def test_invalid_cursor(self):
+        value = {'id': 0, 'sub_seq_nodes': self.rows, 'other_nodes': []}
+        self.assertRaises(ValueError, self.schema().serialize, value,
+                          windows={'sub_seq_nodes': {'cursor': '!!'}})
@@ -0,0 +1,118 @@
+import sys
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    Mapping,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    Invalid,
+)
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            parent_node = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            sub_node = SchemaNode(Relationship('ChildSchema', uselist=False), missing={})
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+        self.json = {
+            'id': '0',
+            'name': 'blah',
+            'sub_node': {'id': 1, 'name': 'bob'},
+            'sub_seq_nodes': [{
+                'id': '2',
+                'name': 'bill',
+                'parent_node': {'id': 3, 'name': 'ben'}
+            }]
+        }
+
+    def test_deserialize(self):
+        for iterative in (True, False):
+            payload = self.schema(iterative=iterative).deserialize(self.json, records=True)
+            self.assertEqual(payload.__class__.__name__, 'TestSchemaRecord')
+            self.assertEqual(payload.id, 0)
+            self.assertEqual(payload.sub_node.name, 'bob')
+            self.assertEqual(payload.sub_node.parent_node, {})
+            self.assertEqual(payload.sub_seq_nodes[0].parent_node.id, 3)
+            self.assertTrue(payload.sub_seq_nodes[0].parent_node.__class__ is payload.__class__)
+            self.assertFalse(hasattr(payload, '__dict__'))
+
+            self.assertEqual(payload.asdict(), self.schema().deserialize(self.json))
+
+    def test_option(self):
+        schema = self.schema(records=True)
+        self.assertEqual(schema.deserialize(self.json).name, 'blah')
+
+        schema = self.schema()
+        schema.deserialize(self.json, records=True)
+        self.assertFalse(schema.records)
+        self.assertTrue(type(schema.deserialize(self.json)) is dict)
+
+    def test_errors(self):
+        self.json['sub_seq_nodes'][0]['id'] = 'two'
+        for iterative in (True, False):
+            try:
+                self.schema(iterative=iterative).deserialize(self.json, records=True)
+            except Invalid as e:
+                self.assertEqual(e.asdict(), {
+                    'sub_seq_nodes': {'0': {'id': ['SchemaNode is not an integer.']}}
+                })
+            else:
+                self.fail('Invalid not raised')
+
+    def test_serialize(self):
+        payload = self.schema().deserialize(self.json, records=True)
+        self.assertEqual(self.schema().serialize(payload),
+                         self.schema().serialize(payload.asdict()))
+        self.assertEqual(self.schema(iterative=False).serialize(payload),
+                         self.schema().serialize(payload.asdict()))
+
+    def test_record(self):
+        record = self.schema().record_class()
+        self.assertTrue(record is self.schema().record_class())
+        self.assertEqual(sorted(record._fields), ['id', 'name', 'sub_node', 'sub_seq_nodes'])
+
+        payload = record(id=0, name='blah')
+        self.assertEqual(payload.sub_node, None)
+        self.assertEqual(payload['name'], 'blah')
+        self.assertEqual(payload.get('blah', 1), 1)
+        self.assertEqual(dict(payload), payload.asdict())
+        self.assertEqual(payload, record(id=0, name='blah'))
+        self.assertNotEqual(payload, record(id=1, name='blah'))
+        self.assertTrue(repr(payload).startswith('TestSchemaRecord('))
+        self.assertTrue("name='blah'" in repr(payload))
+        self.assertRaises(TypeError, record, blah=1)
+
+        # attributes still work as usual
+        payload.name = 'bob'
+        self.assertEqual(payload.name, 'bob')
+        self.assertRaises(AttributeError, setattr, payload, 'blah', 1)
+
+    def test_imperative(self):
+        schema = SchemaModel('Imperative', Mapping(), SchemaNode(Int(), name='id'))
+        payload = schema.deserialize({'id': '1'}, records=True)
+        self.assertEqual(payload.__class__.__name__, 'ImperativeRecord')
+        self.assertEqual(payload.id, 1)
+
+    def test_bad_field_names(self):
+        schema = SchemaModel('Bad', Mapping(), SchemaNode(Int(), name='del-key'))
+        self.assertRaises(ValueError, schema.deserialize, {'del-key': 1}, records=True)
+        schema = SchemaModel('Bad', Mapping(), SchemaNode(Int(), name='keys'))
+        self.assertRaises(ValueError, schema.record_class)
+
+    def test_memory(self):
+        payload = self.schema().deserialize(self.json, records=True)
+        self.assertTrue(sys.getsizeof(payload) < sys.getsizeof(payload.asdict()))
@@ -0,0 +1,95 @@
+import json
+import sqlite3
+import unittest
+from soap import (
+    Relationship,
+    String,
+    Int,
+    Boolean,
+    Sequence,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+)
+from soap.rows import RowSerializer, serialize_cursor
+
+
+class TestRows(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            booly = SchemaNode(Boolean())
+            sub_seq_nodes = SchemaNode(Relationship('TestSchema'), missing=[])
+
+        self.schema = TestSchema
+        self.db = sqlite3.connect(':memory:')
+        self.db.execute('CREATE TABLE test (id INTEGER, name TEXT, booly INTEGER, extra TEXT)')
+        self.db.executemany('INSERT INTO test VALUES (?, ?, ?, ?)',
+                            [(num, 'blah%s' % num, num % 2 == 0, 'extra') for num in range(25)])
+
+    def tearDown(self):
+        self.db.close()
+
+    def cursor(self, sql='SELECT name, extra, booly, id FROM test ORDER BY id'):
+        cursor = self.db.cursor()
+        cursor.execute(sql)
+        return cursor
+
+    def expected(self):
+        """ What serializing the rows as dicts gives, minus the fields that aren't columns. """
+        expected = []
+        for row in self.cursor('SELECT id, name, booly FROM test ORDER BY id'):
+            value = dict(zip(('id', 'name', 'booly'), row), sub_seq_nodes=[])
+            payload = self.schema().serialize(value)
+            del payload['sub_seq_nodes']
+            expected.append(payload)
+        return expected
+
+    def test_serialize(self):
+        cursor = self.cursor()
+        serializer = RowSerializer(self.schema, cursor.description)
+        self.assertEqual(sorted(name for name, _, _, _ in serializer.fields),
+                         ['booly', 'id', 'name'])
+
+        payload = serializer.serialize(cursor.fetchone())
+        self.assertEqual(payload, {'id': 0, 'name': 'blah0', 'booly': False})
+
+    def test_iter_cursor(self):
+        fetched = []
+
+        class Cursor(object):
+            def __init__(self, cursor):
+                self.cursor = cursor
+                self.description = cursor.description
+                self.arraysize = 10
+
+            def fetchmany(self, size):
+                fetched.append(size)
+                return self.cursor.fetchmany(size)
+
+        expected = self.expected()
+        self.assertEqual(list(serialize_cursor(self.schema(), Cursor(self.cursor()))), expected)
+        self.assertEqual(fetched, [10, 10, 10, 10])
+
+        cursor = self.cursor()
+        self.assertEqual(list(serialize_cursor(self.schema(), cursor, size=7)), expected)
+
+    def test_json(self):
+        cursor = self.cursor('SELECT id, name, booly FROM test WHERE id < 3 ORDER BY id')
+        encoded = list(serialize_cursor(self.schema(), cursor, encode=True))
+        self.assertEqual([json.loads(line) for line in encoded], self.expected()[:3])
+
+        cursor = self.cursor('SELECT id, name, booly FROM test ORDER BY id')
+        serializer = RowSerializer(self.schema(), cursor.description)
+        self.assertEqual(len(json.loads(serializer.dumps(cursor))), 25)
+
+    def test_non_leaf_columns(self):
+        class TagSchema(SchemaModel):
+            id = SchemaNode(Int())
+            tags = SchemaNode(Sequence(), SchemaNode(String()))
+
+        serializer = RowSerializer(TagSchema, [('id',), ('tags',)])
+        self.assertEqual(serializer.serialize((1, ['a', 'b'])), {'id': 1, 'tags': ['a', 'b']})
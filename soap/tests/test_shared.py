@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import sys
+import unittest
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from soap import (
+    Int,
+    Boolean,
+    DateTime,
+    String,
+    Sequence,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    iso8601,
+)
+
+
+class SharedSchema(SchemaModel):
+    id = SchemaNode(Int())
+    name = SchemaNode(String(), missing=None)
+    booly = SchemaNode(Boolean(), missing=False)
+    datey = SchemaNode(DateTime(), missing=None)
+
+
+def work(records):
+    from soap.shared import validate_shared
+    return validate_shared(SharedSchema(), records)
+
+
+RECORDS = [
+    {'id': '0', 'name': u'blah', 'booly': 'true', 'datey': '2007-01-25T12:00:00.000001Z'},
+    {'id': 1, 'name': u'été'},
+    {'id': 'two'},
+    {'id': 3, 'name': u''},
+]
+
+
+@unittest.skipIf(sys.version_info < (3, 8), 'multiprocessing.shared_memory needs Python 3.8')
+class TestShared(unittest.TestCase):
+    def test_columns(self):
+        result, errors = work(RECORDS)
+        self.assertEqual(errors, [(2, {'id': ['SchemaNode is not an integer.']})])
+        try:
+            with result.open() as columns:
+                self.assertEqual(len(columns), 3)
+                self.assertEqual(list(columns.positions), [0, 1, 3])
+                self.assertEqual(list(columns.column('id')), [0, 1, 3])
+                self.assertEqual(columns.values('name'), [u'blah', u'été', u''])
+                self.assertEqual(columns.values('booly'), [True, False, False])
+                self.assertEqual(columns[0], {
+                    'id': 0, 'name': u'blah', 'booly': True,
+                    'datey': datetime(2007, 1, 25, 12, 0, 0, 1, tzinfo=iso8601.UTC)
+                })
+                self.assertEqual(columns[1]['datey'], None)
+                self.assertEqual([record['id'] for record in columns], [0, 1, 3])
+                self.assertRaises(IndexError, columns.__getitem__, 3)
+        finally:
+            result.unlink()
+
+    def test_out_of_range(self):
+        result, errors = work([{'id': 2 ** 63}, {'id': 2 ** 63 - 1}, {'id': -2 ** 63 - 1}])
+        self.assertEqual(errors, [(0, {'id': ['SchemaNode is out of range.']}),
+                                  (2, {'id': ['SchemaNode is out of range.']})])
+        try:
+            with result.open() as columns:
+                self.assertEqual(columns.values('id'), [2 ** 63 - 1])
+        finally:
+            result.unlink()
+
+    def test_not_storable(self):
+        from soap.shared import validate_shared
+
+        class StoredSchema(SchemaModel):
+            name = SchemaNode(String())
+            datey = SchemaNode(DateTime(), missing=None,
+                               preparer=lambda value: value.replace(tzinfo=None)
+                               if value.year == 2000 else value)
+
+        records = [{'name': u'a\ud800'}, {'name': u'b', 'datey': '2000-01-01T00:00:00Z'},
+                   {'name': u'c', 'datey': '2007-01-25T12:00:00Z'}]
+        result, errors = validate_shared(StoredSchema(), records)
+        self.assertEqual(errors, [(0, {'name': ['SchemaNode is not valid unicode.']}),
+                                  (1, {'datey': ['SchemaNode has no timezone.']})])
+        try:
+            with result.open() as columns:
+                self.assertEqual(list(columns.positions), [2])
+                self.assertEqual(columns[0], {
+                    'name': u'c', 'datey': datetime(2007, 1, 25, 12, tzinfo=iso8601.UTC)})
+        finally:
+            result.unlink()
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        result, _ = work(RECORDS)
+        try:
+            columns = result.open()
+            ids = columns.numpy('id')
+            self.assertEqual(ids.tolist(), [0, 1, 3])
+            self.assertEqual(columns.numpy('booly').tolist(), [True, False, False])
+            self.assertEqual(columns.numpy('datey')[0], numpy.datetime64('2007-01-25T12:00:00.000001'))
+            self.assertRaises(TypeError, columns.numpy, 'name')
+            del ids
+            columns.close()
+        finally:
+            result.unlink()
+
+    def test_processes(self):
+        chunks = [[{'id': num, 'name': u'n%s' % num} for num in range(start, start + 100)]
+                  for start in range(0, 400, 100)]
+        pool = multiprocessing.Pool(2)
+        try:
+            results = pool.map(work, chunks)
+        finally:
+            pool.close()
+            pool.join()
+
+        ids = []
+        for result, errors in results:
+            self.assertEqual(errors, [])
+            with result.open() as columns:
+                ids.extend(columns.column('id'))
+                self.assertEqual(columns.values('name')[0], u'n%s' % columns.column('id')[0])
+            result.unlink()
+        self.assertEqual(ids, list(range(400)))
+
+    def test_flat_only(self):
+        from soap.shared import ColumnWriter
+        SchemaModel._models = Registry()
+
+        class NestedSchema(SchemaModel):
+            tags = SchemaNode(Sequence(), SchemaNode(String()))
+
+        self.assertRaises(TypeError, ColumnWriter, NestedSchema())
@@ -0,0 +1,466 @@
+import os
+import subprocess
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestImport(unittest.TestCase):
+    def test_import_only_loads_soap(self):
+        # run in a fresh interpreter, so other tests can't have imported anything yet
+        code = ('import sys\n'
+                'before = set(sys.modules)\n'
+                'import soap\n'
+                'print(" ".join(sorted(name for name in set(sys.modules) - before\n'
+                '                      if sys.modules[name] is not None)))\n')
+        proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT,
+                                stdout=subprocess.PIPE)
+        out, _ = proc.communicate()
+        imported = out.decode('ascii').split()
+
+        self.assertIn('soap', imported)
+        for name in imported:
+            self.assertTrue(name == 'soap' or name in sys.builtin_module_names,
+                            '%s is imported by "import soap"' % name)
+
+
+class TestISO8601(unittest.TestCase):
+    def test_parse_date(self):
+        from soap import iso8601
+        self.assertEqual(iso8601.parse_date('2007-01-25T12:00:00Z'),
+                         datetime(2007, 1, 25, 12, 0, tzinfo=iso8601.Utc()))
+        self.assertEqual(iso8601.parse_date('2007-01-25T12:00:00.5Z'),
+                         datetime(2007, 1, 25, 12, 0, 0, 500000, tzinfo=iso8601.Utc()))
+
+    def test_parse_date_offset(self):
+        from soap import iso8601
+        result = iso8601.parse_date('2007-01-25T12:00:00-05:30')
+        self.assertEqual(result.utcoffset(), -timedelta(hours=5, minutes=30))
+        self.assertEqual(result, datetime(2007, 1, 25, 17, 30, tzinfo=iso8601.UTC))
+
+    def test_parse_date_default_timezone(self):
+        from soap import iso8601
+        tz = iso8601.FixedOffset(1, 0, '+01:00')
+        self.assertEqual(iso8601.parse_date('2007-01-25T12:00:00', default_timezone=tz).tzinfo, tz)
+
+    def test_parse_date_errors(self):
+        from soap import iso8601
+        self.assertRaises(iso8601.ParseError, iso8601.parse_date, 'blah')
+        self.assertRaises(iso8601.ParseError, iso8601.parse_date, 0)
+        # date only strings are left to soap.DateTime's fallback
+        self.assertRaises(TypeError, iso8601.parse_date, '2007-01-25')
+
+    def test_datetime_date_only(self):
+        from soap import DateTime, iso8601
+        self.assertEqual(DateTime().deserialize('2007-01-25', None, None, None),
+                         datetime(2007, 1, 25, tzinfo=iso8601.UTC))
+
+    def test_types_without_model(self):
+        from soap import Int, String, Sequence, SchemaNode
+        self.assertEqual(Int().deserialize('5', None, None, None), 5)
+        self.assertEqual(String().deserialize(5, None, None, None), '5')
+        node = SchemaNode(Sequence(), SchemaNode(Int()))
+        self.assertEqual(Sequence().deserialize(['1'], None, node, None), [1])
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        from soap import Registry
+        from soap import SchemaModel
+        SchemaModel._models = Registry()
+
+    def test_register(self):
+        from soap import Registry
+        registry = Registry()
+        models = registry._models
+        registry.register('TestSchema', 1)
+        self.assertEqual(registry['TestSchema'], 1)
+        # copy on write
+        self.assertEqual(models, {})
+        self.assertTrue('TestSchema' in registry)
+        self.assertEqual(list(registry), ['TestSchema'])
+
+    def test_snapshot(self):
+        from soap import Registry
+        registry = Registry()
+        registry.register('TestSchema', 1)
+        snapshot = registry.snapshot()
+        registry.register('ChildSchema', 2)
+        self.assertEqual(list(snapshot), ['TestSchema'])
+        self.assertRaises(TypeError, snapshot.register, 'ChildSchema', 2)
+
+    def test_scope(self):
+        from soap import SchemaModel, SchemaNode, Mapping, Int, Registry
+        with SchemaModel._models.scope() as registry:
+            class TestSchema(SchemaModel):
+                id = SchemaNode(Int())
+
+            ChildSchema = SchemaModel('ChildSchema', Mapping(), SchemaNode(Int(), name='id'))
+            self.assertTrue(Registry.current() is registry)
+
+        self.assertTrue(Registry.current() is None)
+        self.assertTrue(registry['TestSchema'] is TestSchema)
+        self.assertTrue(registry['ChildSchema'] is ChildSchema)
+        self.assertTrue(TestSchema._models is registry)
+        self.assertFalse('TestSchema' in SchemaModel._models)
+
+        # scopes fall back to their parent
+        SchemaModel('OtherSchema', Mapping())
+        self.assertTrue('OtherSchema' in registry)
+
+    def test_scoped_relationships(self):
+        from soap import SchemaModel, SchemaNode, Relationship, Int
+        schemas = []
+        for num in range(2):
+            with SchemaModel._models.scope():
+                class ChildSchema(SchemaModel):
+                    id = SchemaNode(Int(), missing=num)
+
+                class TestSchema(SchemaModel):
+                    child = SchemaNode(Relationship('ChildSchema', uselist=False))
+                schemas.append(TestSchema)
+
+        for num, schema in enumerate(schemas):
+            self.assertEqual(schema().deserialize({'child': {'blah': 0}}),
+                             {'child': {'id': num}})
+
+    def test_concurrent_definition_and_deserialization(self):
+        import threading
+        from soap import SchemaModel, SchemaNode, Relationship, Mapping, Int, String
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            parent = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+            child_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        json = {
+            'id': '0',
+            'name': 'blah',
+            'child_nodes': [{'id': str(num), 'parent': {'id': 1, 'name': 'blah'}}
+                         for num in range(10)]
+        }
+        expected = TestSchema().deserialize(json)
+        errors = []
+
+        def work(num):
+            try:
+                for i in range(20):
+                    SchemaModel('Schema%s_%s' % (num, i), Mapping(), SchemaNode(Int(), name='id'))
+                    if TestSchema().deserialize(json) != expected:
+                        errors.append('mismatch')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(num,)) for num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len([name for name in SchemaModel._models if name.startswith('Schema')]), 160)
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self):
+        from soap import Registry
+        from soap import SchemaModel, SchemaNode, Relationship, Sequence, String, Int
+        SchemaModel._models = Registry()
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String(), missing='')
+            tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[])
+            parent = SchemaNode(Relationship('TestSchema', uselist=False), missing={})
+
+        self.schema = TestSchema
+
+    def nested(self, depth):
+        json = {'id': 0}
+        for num in range(depth):
+            json = {'id': num + 1, 'parent': json}
+        return json
+
+    def test_no_limits(self):
+        from soap import Budget
+        self.assertTrue(Budget.start(self.schema()) is None)
+        self.assertEqual(self.schema().deserialize({'id': '1' * 50})['id'], int('1' * 50))
+
+    def test_max_nesting(self):
+        from soap import Invalid
+        schema = self.schema(max_nesting=3)
+        self.assertEqual(schema.deserialize(self.nested(3))['id'], 3)
+        try:
+            schema.deserialize(self.nested(4))
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {
+                'parent': {'parent': {'parent': {'parent': ['Nested deeper than the maximum of 3.']}}}
+            })
+        else:
+            self.fail('Invalid not raised')
+
+    def test_max_items(self):
+        from soap import Invalid
+        schema = self.schema()
+        schema.deserialize({'id': 0, 'tags': ['a'] * 3}, max_items=3)
+        try:
+            schema.deserialize({'id': 0, 'tags': ['a'] * 4}, max_items=3)
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'tags': ['Longer than the maximum of 3 items.']})
+        else:
+            self.fail('Invalid not raised')
+
+    def test_max_length_and_digits(self):
+        from soap import Invalid
+        schema = self.schema(max_length=5, max_digits=4)
+        self.assertEqual(schema.deserialize({'id': ' 1234 ', 'name': 'abcde'}),
+                         {'id': 1234, 'name': 'abcde', 'tags': [], 'parent': {}})
+        try:
+            schema.deserialize({'id': '12345', 'name': 'abcdef'})
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {
+                'id': ['Longer than the maximum of 4 digits.'],
+                'name': ['Longer than the maximum length of 5.']
+            })
+        else:
+            self.fail('Invalid not raised')
+
+    def test_max_nodes(self):
+        from soap import Invalid
+        schema = self.schema()
+        schema.deserialize(self.nested(2), max_nodes=100)
+        try:
+            schema.deserialize(self.nested(50), max_nodes=100)
+        except Invalid as e:
+            self.assertTrue(e.node is schema)
+            self.assertEqual(e.asdict(), ['Exceeded the maximum of 100 nodes.'])
+        else:
+            self.fail('Invalid not raised')
+
+    def test_timeout(self):
+        import time
+        from soap import Invalid, SchemaModel, SchemaNode, Sequence, Int
+
+        def slow(value, mapping, node, model):
+            time.sleep(0.01)
+
+        class SlowSchema(SchemaModel):
+            timeout = 0.05
+            ids = SchemaNode(Sequence(), SchemaNode(Int(), validator=slow))
+
+        try:
+            SlowSchema().deserialize({'ids': range(100)})
+        except Invalid as e:
+            self.assertEqual(e.asdict(), ['Exceeded the time limit of 0.05 seconds.'])
+        else:
+            self.fail('Invalid not raised')
+
+    def test_per_call_options_dont_stick(self):
+        schema = self.schema()
+        schema.deserialize({'id': 0}, max_nodes=100)
+        self.assertTrue(schema.max_nodes is None)
+        self.assertTrue(schema._budget is None)
+
+
+class TestPolymorphic(unittest.TestCase):
+    def setUp(self):
+        from soap import Registry
+        from soap import SchemaModel, SchemaNode, Polymorphic, Sequence, String, Int
+        SchemaModel._models = Registry()
+
+        class ClickEvent(SchemaModel):
+            kind = SchemaNode(String())
+            x = SchemaNode(Int())
+            y = SchemaNode(Int())
+
+        class GroupEvent(SchemaModel):
+            kind = SchemaNode(String())
+            events = SchemaNode(Sequence(), SchemaNode(Polymorphic('kind', {
+                'click': 'ClickEvent',
+                'group': 'GroupEvent',
+            })), missing=[])
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            event = SchemaNode(Polymorphic('kind', {
+                'click': ClickEvent,
+                'group': 'GroupEvent',
+            }))
+
+        self.schema = TestSchema
+
+    def test_deserialize(self):
+        json = {'id': '0', 'event': {'kind': 'group', 'events': [
+            {'kind': 'click', 'x': '1', 'y': 2},
+            {'kind': 'group'},
+        ]}}
+        for iterative in (True, False):
+            self.assertEqual(self.schema(iterative=iterative).deserialize(json), {
+                'id': 0, 'event': {'kind': 'group', 'events': [
+                    {'kind': 'click', 'x': 1, 'y': 2},
+                    {'kind': 'group', 'events': []},
+                ]}
+            })
+
+    def test_errors(self):
+        from soap import Invalid
+        json = {'id': 0, 'event': {'kind': 'group', 'events': [
+            {'kind': 'click', 'x': 'one'},
+            {'kind': 'scroll'},
+            {'x': 1},
+            'click',
+        ]}}
+        for iterative in (True, False):
+            try:
+                self.schema(iterative=iterative).deserialize(json)
+            except Invalid as e:
+                # only the errors of the chosen model
+                self.assertEqual(e.asdict(), {'event': {'events': {
+                    '0': {'x': ['SchemaNode is not an integer.'],
+                          'y': ["The field named 'y' is missing."]},
+                    '1': ["'scroll' is not one of click, group."],
+                    '2': ["The field named 'kind' is missing."],
+                    '3': ['SchemaNode is not a mapping type.'],
+                }}})
+            else:
+                self.fail('Invalid not raised')
+
+    def test_serialize(self):
+        value = {'id': 0, 'event': {'kind': 'group', 'events': [
+            {'kind': 'click', 'x': 1, 'y': 2, 'extra': 'dropped'},
+        ]}}
+        for iterative in (True, False):
+            schema = self.schema(iterative=iterative)
+            self.assertEqual(schema.serialize(value), {'id': 0, 'event': {'kind': 'group', 'events': [
+                {'kind': 'click', 'x': 1, 'y': 2},
+            ]}})
+            self.assertEqual(schema.serialize({'id': 0, 'event': None}), {'id': 0, 'event': {}})
+            self.assertRaises(ValueError, schema.serialize, {'id': 0, 'event': {'kind': 'scroll'}})
+
+    def test_deep(self):
+        import sys
+        json = {'kind': 'click', 'x': 0, 'y': 0}
+        for num in range(sys.getrecursionlimit() * 2):
+            json = {'kind': 'group', 'events': [json]}
+        self.assertEqual(self.schema().deserialize({'id': 0, 'event': json})['event']['kind'],
+                         'group')
+
+
+class TestCollectionValidators(unittest.TestCase):
+    def setUp(self):
+        from soap import Registry
+        from soap import (SchemaModel, SchemaNode, Relationship, Sequence, String, Int,
+                          Unique, UniqueBy, SubsetOf, ContainsAll)
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String())
+
+        class TestSchema(SchemaModel):
+            tags = SchemaNode(Sequence(), SchemaNode(String()), missing=[],
+                              validator=[Unique(key=lambda tag: tag.lower()),
+                                         SubsetOf(['a', 'b', 'B', 'c'])])
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[],
+                                       validator=[UniqueBy('id'),
+                                                  ContainsAll([1], key=lambda child: child['id'])])
+
+        self.schema = TestSchema
+
+    def test_valid(self):
+        json = {'tags': ['a', 'b'], 'sub_seq_nodes': [{'id': 1, 'name': 'x'}, {'id': 2, 'name': 'x'}]}
+        for iterative in (True, False):
+            self.assertEqual(self.schema(iterative=iterative).deserialize(json), json)
+
+    def test_errors(self):
+        from soap import Invalid
+        json = {'tags': ['a', 'b', 'B', 'd', 'a'],
+                'sub_seq_nodes': [{'id': 2, 'name': 'x'}, {'id': 1, 'name': 'y'}, {'id': 2, 'name': 'z'}]}
+        for iterative in (True, False):
+            try:
+                self.schema(iterative=iterative).deserialize(json)
+                self.fail('collection validators did not raise')
+            except Invalid as e:
+                self.assertEqual(e.asdict(), {
+                    'tags': {
+                        '2': ['Duplicate of the element at index 1'],
+                        '3': ['Not one of the allowed values'],
+                        '4': ['Duplicate of the element at index 0'],
+                    },
+                    'sub_seq_nodes': {'2': ['Duplicate id of the element at index 0']},
+                })
+
+        # errors without an index are reported on the node
+        try:
+            self.schema().deserialize({'sub_seq_nodes': [{'id': 2, 'name': 'x'}]})
+            self.fail('ContainsAll did not raise')
+        except Invalid as e:
+            self.assertEqual(e.asdict(), {'sub_seq_nodes': ['Missing required values: 1']})
+
+    def test_unhashable(self):
+        from soap import Invalid, Unique
+        validator = Unique()
+        validator([{'a': [1]}, {'a': [2]}], None, None, None)
+        self.assertRaises(Invalid, validator, [{'a': [1]}, {'a': [1]}], None, None, None)
+
+
+class TestChoice(unittest.TestCase):
+    def setUp(self):
+        from soap import Registry
+        from soap import SchemaModel, SchemaNode, Sequence, Choice
+        SchemaModel._models = Registry()
+
+        class TestSchema(SchemaModel):
+            status = SchemaNode(Choice({'active': 1, 'inactive': 0}, aliases={'on': 'active'}))
+            colors = SchemaNode(Sequence(), SchemaNode(Choice(['red', 'green', 'blue'])), missing=[])
+
+        self.schema = TestSchema()
+
+    def test_deserialize(self):
+        json = {'status': 'ACTIVE', 'colors': ['Red', 'blue']}
+        for iterative in (True, False):
+            self.assertEqual(self.schema.deserialize(json, iterative=iterative),
+                             {'status': 1, 'colors': ['red', 'blue']})
+        self.assertEqual(self.schema.deserialize({'status': 'on'})['status'], 1)
+        self.assertEqual(self.schema.serialize({'status': 0, 'colors': ['red']}),
+                         {'status': 'inactive', 'colors': ['red']})
+        self.assertRaises(ValueError, self.schema.serialize, {'status': 2, 'colors': []})
+
+    def test_errors(self):
+        from soap import Invalid
+        for iterative in (True, False):
+            try:
+                self.schema.deserialize({'status': 'off', 'colors': ['red', 'pink', ['red']]},
+                                        iterative=iterative)
+                self.fail('Choice did not raise')
+            except Invalid as e:
+                self.assertEqual(e.asdict(), {
+                    'status': ['SchemaNode is not one of: active, inactive'],
+                    'colors': {'1': ['SchemaNode is not one of: red, green, blue'],
+                               '2': ['SchemaNode is not one of: red, green, blue']},
+                })
+
+    def test_truncated(self):
+        from soap import Choice
+        self.assertEqual(Choice(range(25)).msg,
+                         'SchemaNode is not one of: 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ... (15 more)')
+        self.assertRaises(ValueError, Choice, ['a'], aliases={'b': 'c'})
+
+    def test_enum(self):
+        try:
+            import enum
+        except ImportError:
+            raise unittest.SkipTest('enum is not available')
+        from soap import SchemaNode, Choice
+
+        Color = enum.Enum('Color', [('RED', 'r'), ('GREEN', 'g')])
+        node = SchemaNode(Choice(Color), name='color')
+        self.assertEqual(node.deserialize('R'), Color.RED)
+        self.assertEqual(node.deserialize('green'), Color.GREEN)
+        self.assertEqual(node.serialize(Color.GREEN), 'g')
@@ -0,0 +1,91 @@
+import logging
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from soap import (
+    Invalid,
+    Relationship,
+    Sequence,
+    String,
+    Int,
+    SchemaNode,
+    SchemaModel,
+    Registry,
+    Length,
+)
+
+
+class Handler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestTrusted(unittest.TestCase):
+    def setUp(self):
+        SchemaModel._models = Registry()
+
+        class ChildSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String(), validator=Length(_max=5))
+
+        class TestSchema(SchemaModel):
+            id = SchemaNode(Int())
+            name = SchemaNode(String(), preparer=lambda value: value.strip(),
+                              validator=Length(_max=5))
+            note = SchemaNode(String(), missing='none')
+            sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+        self.schema = TestSchema
+        self.invalid = {'id': '1', 'name': ' too long ', 'sub_seq_nodes': [{'id': 2, 'name': ''}]}
+
+        self.handler = Handler()
+        logging.getLogger('soap.trusted').addHandler(self.handler)
+
+    def tearDown(self):
+        logging.getLogger('soap.trusted').removeHandler(self.handler)
+
+    def test_trusted(self):
+        self.assertRaises(Invalid, self.schema().deserialize, self.invalid)
+        expected = {'id': 1, 'name': 'too long', 'note': 'none',
+                    'sub_seq_nodes': [{'id': 2, 'name': ''}]}
+        for iterative in (True, False):
+            self.assertEqual(self.schema().deserialize(self.invalid, trusted=True,
+                                                       iterative=iterative), expected)
+        schema = self.schema(trusted=True)
+        self.assertEqual(schema.deserialize(self.invalid), expected)
+        # types still convert, so what can't be converted is still invalid
+        self.assertRaises(Invalid, schema.deserialize, {'id': 'a', 'name': 'bob'})
+
+    def test_verify(self):
+        schema = self.schema()
+        valid = {'id': 1, 'name': 'bob'}
+        for num in range(6):
+            value = self.invalid if num in (2, 4) else valid
+            self.assertEqual(schema.deserialize(value, trusted=True, verify=2)['id'], 1)
+        # only calls 0, 2 and 4 were verified, and 2 and 4 were invalid
+        self.assertEqual(len(self.handler.messages), 2)
+        self.assertTrue(self.handler.messages[0].startswith('Trusted value of TestSchema is invalid'))
+
+    def test_verify_arrays(self):
+        for output in ('array', 'numpy'):
+            if output == 'numpy' and numpy is None:
+                continue
+
+            class ArraySchema(SchemaModel):
+                ids = SchemaNode(Sequence(output=output), SchemaNode(Int()))
+                sub_seq_nodes = SchemaNode(Relationship('ChildSchema'), missing=[])
+
+            value = {'ids': [1, '2'], 'sub_seq_nodes': [{'id': 3, 'name': 'bob'}]}
+            for records in (False, True):
+                result = ArraySchema().deserialize(value, trusted=True, verify=1,
+                                                   records=records)
+                self.assertEqual(list(result['ids']), [1, 2])
+        self.assertEqual(self.handler.messages, [])
@@ -0,0 +1,82 @@
+""" Checking a sample of trusted deserializations.
+
+A ``trusted`` model, given per call or as an attribute of the schema, is for payloads
+that were already validated upstream, like the ones between services of the same
+system: values are converted by their types and preparers, and missing ones get their
+defaults, but the required checks and validators don't run.
+
+To find out when a payload isn't as trustworthy as it was thought to be, ``verify=N``
+deserializes one call in N a second time, with everything, and reports the calls where
+that fails or gives a different result to the ``soap.trusted`` logger:
+
+.. code-block:: python
+
+   payload = schema.deserialize(json, trusted=True, verify=1000)
+
+The trusted result is returned either way, so sampled calls behave like all the others,
+they only take longer.  The calls are counted per schema, across threads.
+"""
+import itertools
+import logging
+
+from soap import Invalid
+
+logger = logging.getLogger(__name__)
+
+
+def counter(schema):
+    """ Returns the counter of the calls to ``schema``, kept on whatever holds its children. """
+
+    owner = schema if 'children' in schema.__dict__ else schema.__class__
+    calls = owner.__dict__.get('_trusted_calls')
+    if calls is None:
+        calls = itertools.count()
+        setattr(owner, '_trusted_calls', calls)
+    return calls
+
+
+def same(first, second):
+    """ Returns whether the deserialized values ``first`` and ``second`` are equal.  Typed
+        arrays are compared by their items, as ``==`` on numpy arrays is elementwise. """
+
+    stack = [(first, second)]
+    while stack:
+        first, second = stack.pop()
+        if type(first) is not type(second):
+            return False
+        if hasattr(first, 'tolist'):
+            if first.tolist() != second.tolist():
+                return False
+        elif hasattr(first, 'keys'):
+            # dicts and records
+            keys = set(first.keys())
+            if keys != set(second.keys()):
+                return False
+            stack.extend((first[key], second[key]) for key in keys)
+        elif isinstance(first, list):
+            if len(first) != len(second):
+                return False
+            stack.extend(zip(first, second))
+        elif first != second:
+            return False
+    return True
+
+
+def deserialize(schema, value, mapping, node, model):
+    """ Deserializes ``value`` with ``schema`` as a trusted value, and checks it against a
+        full deserialization one call in ``model.verify``. """
+
+    result = model.deserialize(value, mapping, node, verify=None)
+    if next(counter(schema)) % model.verify:
+        return result
+
+    name = (node if node else schema).name or schema.__class__.__name__
+    try:
+        verified = model.deserialize(value, mapping, node, verify=None, trusted=False)
+    except Invalid as e:
+        logger.warning('Trusted value of %s is invalid: %s', name, e)
+    else:
+        if not same(verified, result):
+            logger.warning('Trusted value of %s deserializes to %r, instead of %r',
+                           name, result, verified)
+    return result